@@ -3,31 +3,33 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 import logging
-import sys
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from src.configs.controller import folder_router
 from src.services.controller import service_router
 from src.odbc.controller import odbc_router
 from src.email_config.controller import email_router
-from src.database.session import engine, Base
+from src.sync.controller import sync_router
+from src.metrics.controller import metrics_router
+from src.database.session import engine, Base, SessionLocal
+from src.database.migrations import add_missing_columns
+import src.database.config_version  # registers the config version bump on configuration writes
+from src.configs.service import seed_table_schedules
+from src.log_config import configure_logging
+from service_manager import API_LOG_PATH
 
 
 
-# Configure logging to help with debugging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s - %(name)s - %(funcName)s - %(lineno)d - %(threadName)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('fastapi.log')
-    ]
-)
+# One queued, rotating log for every module (see src/log_config.py)
+configure_logging(API_LOG_PATH)
 
 logger = logging.getLogger(__name__)
 
 logger.info(f'Creating app.db...')
 Base.metadata.create_all(bind=engine)
+add_missing_columns(engine, Base.metadata)
+with SessionLocal() as db:
+    seed_table_schedules(db)
 logger.info(f'Created app.db')
 
 
@@ -52,6 +54,8 @@ app.include_router(folder_router)
 app.include_router(service_router)
 app.include_router(odbc_router)
 app.include_router(email_router)
+app.include_router(sync_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 def read_root():
@@ -9,6 +9,23 @@ a = Analysis(
     datas=[
         ('src/windowsService/service.py', 'src/windowsService'),
         ('src/windowsService/scheduler.py', 'src/windowsService'),
+        ('src/windowsService/delta_store.py', 'src/windowsService'),
+        ('src/windowsService/delivery.py', 'src/windowsService'),
+        ('src/windowsService/changelog.py', 'src/windowsService'),
+        ('src/windowsService/polling.py', 'src/windowsService'),
+        ('src/windowsService/table_schedule.py', 'src/windowsService'),
+        ('src/windowsService/config_snapshot.py', 'src/windowsService'),
+        ('src/windowsService/metrics.py', 'src/windowsService'),
+        ('src/windowsService/run_history.py', 'src/windowsService'),
+        ('src/windowsService/profiling.py', 'src/windowsService'),
+        ('src/windowsService/memory.py', 'src/windowsService'),
+        ('src/windowsService/log_pipeline.py', 'src/windowsService'),
+        ('src/windowsService/tracing.py', 'src/windowsService'),
+        ('src/windowsService/converters.py', 'src/windowsService'),
+        ('src/windowsService/sync_plan.py', 'src/windowsService'),
+        ('src/windowsService/bootstrap_pool.py', 'src/windowsService'),
+        ('src/windowsService/bootstrap_progress.py', 'src/windowsService'),
+        ('src/windowsService/pipeline.py', 'src/windowsService'),
     ],
     hiddenimports=[
         'win32serviceutil',
@@ -0,0 +1,463 @@
+# benchmarks/bench_sync.py
+"""
+Offline benchmark of the sync engine (src/windowsService/service.py).
+
+Generates X3-shaped source tables in a SQLite file served through
+fake_pyodbc, then times the main stages of DatabaseSync:
+
+    bootstrap   first launch export of every table into each site's local_data.db
+    run_sync    steady-state change detection + tracking update + staging
+    csv_export  consolidated delta CSV of one site
+    delta_apply applying that CSV to the site's local_data.db, as a POS does
+
+run_sync must stage exactly the rows touched after the bootstrap, per site
+and table, or the benchmark fails. Each stage reports rows/sec and the peak
+Python memory (tracemalloc). Tracing slows Python down considerably, so
+memory is measured in a second pass and only the untraced pass is timed.
+Results can be saved as a baseline and later runs compared against it:
+
+    python benchmarks/bench_sync.py --rows 20000 --sites 3 --save-baseline
+    python benchmarks/bench_sync.py --rows 20000 --sites 3
+
+The exit code is 1 when a stage regressed by more than --tolerance.
+"""
+import argparse
+import csv
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+import types
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVICE_DIR = os.path.join(os.path.dirname(BENCH_DIR), "src", "windowsService")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+sys.path.insert(0, BENCH_DIR)
+import fake_pyodbc  # noqa: E402
+
+# Tracking columns every X3 table carries for the sync engine
+TRACKING_COLUMNS = [
+    ("UPDDATTIM_0", "DATETIME"),
+    ("ZTRANSFERT_0", "INTEGER"),
+    ("ZTRANSDATE_0", "DATETIME"),
+]
+
+# X3-shaped tables: business columns besides AUUID_0 and the tracking columns
+X3_TABLES = {
+    "ITMMASTER": [
+        ("ITMREF_0", "TEXT"), ("ITMDES1_0", "TEXT"), ("ITMDES2_0", "TEXT"), ("TCLCOD_0", "TEXT"),
+        ("STU_0", "TEXT"), ("SAU_0", "TEXT"), ("ITMWEI_0", "DECIMAL"), ("EANCOD_0", "TEXT"),
+        ("ITMSTA_0", "INTEGER"), ("CREDATTIM_0", "DATETIME"),
+    ],
+    "ITMFACILIT": [
+        ("ITMREF_0", "TEXT"), ("STOFCY_0", "TEXT"), ("SAFSTO_0", "DECIMAL"), ("REOMINQTY_0", "DECIMAL"),
+        ("DEFLOC_0", "TEXT"), ("ABCCLS_0", "INTEGER"), ("CREDATTIM_0", "DATETIME"),
+    ],
+    "STOCK": [
+        ("STOFCY_0", "TEXT"), ("ITMREF_0", "TEXT"), ("LOT_0", "TEXT"), ("LOC_0", "TEXT"),
+        ("STA_0", "TEXT"), ("QTYPCU_0", "DECIMAL"), ("QTYSTU_0", "DECIMAL"), ("CUMALLQTY_0", "DECIMAL"),
+        ("CREDATTIM_0", "DATETIME"),
+    ],
+    "BPCUSTMVT": [
+        ("BPCNUM_0", "TEXT"), ("CPY_0", "TEXT"), ("CUR_0", "TEXT"), ("ORDAMT_0", "DECIMAL"),
+        ("BLCAMT_0", "DECIMAL"), ("NIVAMT_0", "DECIMAL"), ("OSTAUZ_0", "DECIMAL"), ("CREDATTIM_0", "DATETIME"),
+    ],
+}
+
+# Mirrors PythonService._build_syncer for the generated tables
+SITE_DEPENDENT_TABLES = {"ITMFACILIT": "STOFCY_0"}
+
+STAGES = ["bootstrap", "run_sync", "csv_export", "delta_apply"]
+
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def _value(column: str, col_type: str, index: int, sites, rng: random.Random, now: datetime):
+    if column in ("STOFCY_0", "CPY_0"):
+        return sites[index % len(sites)]
+    if column == "ITMREF_0":
+        return f"ITM{index // len(sites):07d}"
+    if col_type == "DECIMAL":
+        return f"{rng.uniform(0, 10000):.4f}"
+    if col_type == "INTEGER":
+        return rng.randint(1, 5)
+    if col_type == "DATETIME":
+        return _timestamp(now - timedelta(days=rng.randint(0, 900)))
+    return f"{column[:3]}{rng.randint(0, 10 ** 8):08d}"
+
+
+def build_source(path: str, rows: int, sites, seed: int = 42):
+    """Creates the X3-shaped source tables with `rows` rows each, all never transferred."""
+    rng = random.Random(seed)
+    now = datetime.now() - timedelta(minutes=5)
+    conn = sqlite3.connect(path)
+    for table, business_columns in X3_TABLES.items():
+        columns = [("AUUID_0", "TEXT")] + business_columns + TRACKING_COLUMNS
+        columns_def = ", ".join(f'"{name}" {col_type}' for name, col_type in columns)
+        conn.execute(f'CREATE TABLE "{table}" ({columns_def}, PRIMARY KEY ("AUUID_0"))')
+
+        placeholders = ", ".join("?" for _ in columns)
+        batch = []
+        for index in range(rows):
+            values = [f"{table}-{index:010d}"]
+            values += [_value(name, col_type, index, sites, rng, now) for name, col_type in business_columns]
+            values += [_timestamp(now), 0, "1753-01-01 00:00:00.000"]
+            batch.append(values)
+            if len(batch) >= 5000:
+                conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', batch)
+                batch = []
+        if batch:
+            conn.executemany(f'INSERT INTO "{table}" VALUES ({placeholders})', batch)
+    conn.commit()
+    conn.close()
+
+
+def touch_source(path: str, fraction: float, updated_at: datetime, seed: int = 7) -> dict:
+    """
+    Marks a fraction of each table as updated at `updated_at`. Returns {table: touched row indexes}.
+
+    `updated_at` must lie between the last transfer (the bootstrap) and the sync: a
+    timestamp in the future would keep matching the delta filter after the tracking
+    update and hide rows the sync failed to read.
+    """
+    rng = random.Random(seed)
+    stamp = _timestamp(updated_at)
+    conn = sqlite3.connect(path)
+    touched = {}
+    for table in X3_TABLES:
+        total = conn.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        count = max(1, int(total * fraction))
+        touched[table] = sorted(rng.sample(range(total), count))
+        keys = [(stamp, f"{table}-{index:010d}") for index in touched[table]]
+        conn.executemany(f'UPDATE "{table}" SET UPDDATTIM_0 = ? WHERE AUUID_0 = ?', keys)
+    conn.commit()
+    conn.close()
+    return touched
+
+
+def expected_changes(touched: dict, sites) -> dict:
+    """Rows run_sync must stage per site and table for the rows of touch_source."""
+    expected = {}
+    for site in sites:
+        expected[site] = {}
+        for table, indexes in touched.items():
+            if table in SITE_DEPENDENT_TABLES:
+                # Same site assignment as _value()
+                expected[site][table] = sum(1 for index in indexes if sites[index % len(sites)] == site)
+            else:
+                expected[site][table] = len(indexes)
+    return expected
+
+
+def check_staged(syncer, touched: dict, sites, tables):
+    """Fails unless the pending store holds exactly the touched rows, per site and table."""
+    expected = expected_changes(touched, sites)
+    errors = []
+    for site in sites:
+        pending, _ = syncer.delta_store.load(site, tables)
+        for table in tables:
+            staged = len(pending[table][1]) if table in pending else 0
+            if staged != expected[site][table]:
+                errors.append(f"{site}/{table}: staged {staged}, touched {expected[site][table]}")
+    if errors:
+        raise AssertionError("run_sync did not stage the touched rows: " + "; ".join(errors))
+
+
+def import_service(workdir: str):
+    """Imports service.py against fake_pyodbc, with its folders redirected into workdir."""
+    sys.modules["pyodbc"] = fake_pyodbc
+    try:
+        import win32serviceutil  # noqa: F401
+    except ImportError:
+        # Only the service framework base class is needed to import the module off Windows
+        for name in ("win32serviceutil", "win32service", "win32event", "servicemanager"):
+            sys.modules.setdefault(name, types.ModuleType(name))
+        sys.modules["win32serviceutil"].ServiceFramework = object
+
+    sys.path.insert(0, SERVICE_DIR)
+    cwd = os.getcwd()
+    os.chdir(workdir)  # the service creates its C:\poswaza folders relative to cwd off Windows
+    try:
+        import service
+    finally:
+        os.chdir(cwd)
+
+    db_folder = os.path.join(workdir, "db")
+    service.LOCAL_DB_PATH = db_folder
+    service.DB_FOLDER = db_folder
+    service.DELTA_FOLDER = os.path.join(workdir, "delta")
+    service.ZIP_FOLDER = os.path.join(workdir, "zip")
+    service.CONFIG_DB_PATH = os.path.join(db_folder, "config.db")
+    for folder in (db_folder, service.DELTA_FOLDER, service.ZIP_FOLDER):
+        os.makedirs(folder, exist_ok=True)
+    return service
+
+
+def site_db_path(service, site: str) -> str:
+    # Same (Windows style) path as DatabaseSync._init_first_launch
+    return rf"{service.LOCAL_DB_PATH}\{site}\local_data.db"
+
+
+def apply_delta_csv(csv_path: str, sqlite_path: str, key_column: str = "AUUID_0") -> int:
+    """Applies a consolidated delta CSV to a site database: replace the rows by key."""
+    conn = sqlite3.connect(sqlite_path)
+    applied = 0
+    try:
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            columns = None
+            batch = []
+            table = None
+
+            def flush():
+                nonlocal applied
+                if not batch:
+                    return
+                key_index = columns.index(key_column)
+                conn.executemany(f'DELETE FROM "{table}" WHERE "{key_column}" = ?', [(row[key_index],) for row in batch])
+                placeholders = ", ".join("?" for _ in columns)
+                conn.executemany(f'INSERT INTO "{table}" ({", ".join(columns)}) VALUES ({placeholders})', batch)
+                applied += len(batch)
+                batch.clear()
+
+            for record in reader:
+                if record[0] == "TABLE_NAME":
+                    flush()
+                    columns = record[1:]
+                    continue
+                if record[0] != table:
+                    flush()
+                    table = record[0]
+                batch.append([value if value != "" else None for value in record[1:]])
+            flush()
+        conn.commit()
+    finally:
+        conn.close()
+    return applied
+
+
+class StageTimer:
+    """Wall time of one stage, or its tracemalloc peak when memory is being traced."""
+
+    def __init__(self, results: dict, stage: str):
+        self.results = results
+        self.stage = stage
+        self.rows = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        if exc_type is not None:
+            return False
+        if tracemalloc.is_tracing():
+            self.results[self.stage] = {"peak_mb": round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)}
+        else:
+            self.results[self.stage] = {
+                "seconds": round(seconds, 4),
+                "rows": self.rows,
+                "rows_per_sec": round(self.rows / seconds, 1) if seconds > 0 else None,
+                "bytes": self.bytes,
+            }
+        return False
+
+
+def build_syncer(service, source_path: str, sites, tables):
+    """DatabaseSync over the source database, which bootstraps every site."""
+    parameters = {
+        "sites": sites,
+        "site_dependent_tables": list(SITE_DEPENDENT_TABLES),
+        "site_keys_column": dict(SITE_DEPENDENT_TABLES),
+        "primary_key_column": "AUUID_0",
+        "all_tables": [t for t in tables if t not in SITE_DEPENDENT_TABLES],
+        "site_emails": {site: "" for site in sites},
+        "site_transports": {site: "pull" for site in sites},
+        "delivery_folder": None,
+    }
+    sql_config = {
+        "username": "bench",
+        "password": "bench",
+        "server": "localhost",
+        "database": source_path,
+        "driver": "fake",
+        "dsn": None,
+        "schema": fake_pyodbc.SCHEMA,
+    }
+    return service.DatabaseSync(
+        sql_config,
+        tables_to_sync=tables,
+        local_db_path=service.LOCAL_DB_PATH,
+        zip_folder=service.ZIP_FOLDER,
+        email_config=None,
+        parameters=parameters,
+    )
+
+
+def run_stages(rows: int, sites_count: int, changed: float, workdir: str, trace_memory: bool = False) -> dict:
+    """Runs every stage once in workdir. Returns {stage: timings} or, with trace_memory, {stage: peak}."""
+    sites = [f"S{index:02d}" for index in range(1, sites_count + 1)]
+    source_path = os.path.join(workdir, "x3_source.db")
+    build_source(source_path, rows, sites)
+
+    service = import_service(workdir)
+    tables = list(X3_TABLES)
+
+    results: dict = {}
+    # Same queued logging as the service, into the work directory
+    import log_pipeline
+    log_listener = log_pipeline.start_logging(workdir, "bench.log", console=False)
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        with StageTimer(results, "bootstrap") as stage:
+            syncer = build_syncer(service, source_path, sites, tables)
+            per_site_rows = rows * (len(tables) - len(SITE_DEPENDENT_TABLES))
+            stage.rows = sites_count * per_site_rows + rows * len(SITE_DEPENDENT_TABLES)
+
+        # Updated after the bootstrap marked every row transferred, before the sync
+        bootstrapped_at = datetime.now()
+        touched = touch_source(source_path, changed, bootstrapped_at)
+        time.sleep(0.01)
+        with StageTimer(results, "run_sync") as stage:
+            stage.rows = syncer.run_sync(tables, deliver=False)
+        check_staged(syncer, touched, sites, tables)
+
+        site = sites[0]
+        pending, _ = syncer.delta_store.load(site, tables)
+        with StageTimer(results, "csv_export") as stage:
+            csv_path = syncer._export_consolidated_csv(pending, site)
+            stage.rows = sum(len(table_rows) for _, (_, table_rows) in pending.items())
+            stage.bytes = os.path.getsize(csv_path)
+
+        with StageTimer(results, "delta_apply") as stage:
+            stage.rows = apply_delta_csv(csv_path, site_db_path(service, site))
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        log_pipeline.stop_logging(log_listener)
+
+    return results
+
+
+def run_benchmark(rows: int, sites_count: int, changed: float, memory: bool = True, keep: bool = False) -> dict:
+    results = {}
+    passes = [False, True] if memory else [False]
+    for trace_memory in passes:
+        workdir = tempfile.mkdtemp(prefix="wazapos_bench_")
+        try:
+            for stage, values in run_stages(rows, sites_count, changed, workdir, trace_memory).items():
+                results.setdefault(stage, {"peak_mb": None}).update(values)
+        finally:
+            if keep:
+                print(f"[*] Work directory kept: {workdir}")
+            else:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "rows": rows,
+        "sites": sites_count,
+        "changed": changed,
+        "stages": results,
+    }
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list:
+    """Returns the regressions of `current` against `baseline` as readable lines."""
+    regressions = []
+    if (baseline.get("rows"), baseline.get("sites"), baseline.get("changed")) != (current["rows"], current["sites"], current["changed"]):
+        print("[!] Baseline was recorded with a different size, comparison is indicative only")
+
+    for stage in STAGES:
+        now, before = current["stages"].get(stage), baseline.get("stages", {}).get(stage)
+        if not now or not before:
+            continue
+        if before.get("rows_per_sec") and now.get("rows_per_sec") is not None:
+            if now["rows_per_sec"] < before["rows_per_sec"] * (1 - tolerance):
+                regressions.append(
+                    f"{stage}: {now['rows_per_sec']:.0f} rows/s vs {before['rows_per_sec']:.0f} rows/s in the baseline"
+                )
+        if before.get("peak_mb") and now.get("peak_mb") and now["peak_mb"] > before["peak_mb"] * (1 + tolerance):
+            regressions.append(f"{stage}: peak {now['peak_mb']:.1f} MB vs {before['peak_mb']:.1f} MB in the baseline")
+    return regressions
+
+
+def print_results(report: dict, baseline: dict = None):
+    print(f"\nrows per table: {report['rows']}, sites: {report['sites']}, changed: {report['changed']:.0%}")
+    print(f"{'stage':<12} {'rows':>10} {'seconds':>9} {'rows/s':>12} {'peak MB':>9} {'vs baseline':>12}")
+    for stage in STAGES:
+        result = report["stages"].get(stage)
+        if not result:
+            continue
+        delta = ""
+        before = (baseline or {}).get("stages", {}).get(stage)
+        if before and before.get("rows_per_sec") and result.get("rows_per_sec"):
+            delta = f"{(result['rows_per_sec'] / before['rows_per_sec'] - 1):+.0%}"
+        print(
+            f"{stage:<12} {result['rows']:>10} {result['seconds']:>9.3f} "
+            f"{result['rows_per_sec'] or 0:>12.0f} {result['peak_mb'] or 0:>9.2f} {delta:>12}"
+        )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline benchmark of the WAZAPOS sync engine")
+    parser.add_argument("--rows", type=int, default=20000, help="Rows per generated table")
+    parser.add_argument("--sites", type=int, default=3, help="Number of sites")
+    parser.add_argument("--changed", type=float, default=0.05, help="Fraction of rows changed before run_sync")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown/memory growth before flagging")
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--keep", action="store_true", help="Keep the work directories for inspection")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.rows, args.sites, args.changed, memory=not args.no_memory, keep=args.keep)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_results(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[*] Baseline saved to {args.baseline}")
+        return 0
+
+    if baseline:
+        regressions = compare(report, baseline, args.tolerance)
+        if regressions:
+            print("\n[!] Regressions:")
+            for line in regressions:
+                print(f"    {line}")
+            return 1
+        print("\n[*] No regression against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+# benchmarks/check_paged_sync.py
+"""
+Checks that run_sync stages every changed row when the changes span several
+keyset pages, site-dependent tables included (ITMFACILIT here).
+
+Each page of a site-dependent table only holds part of the changed rows of a
+site; its tracking update must not mark the rows of the later pages
+transferred. Uses the bench_sync source and fake_pyodbc:
+
+    python benchmarks/check_paged_sync.py
+
+The exit code is 1 when a site or table misses rows.
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import bench_sync
+
+
+def check(rows: int, sites_count: int, changed: float, page_rows: int) -> list:
+    """Bootstraps, touches rows and syncs twice in a temporary directory. Returns the errors."""
+    sites = [f"S{index:02d}" for index in range(1, sites_count + 1)]
+    tables = list(bench_sync.X3_TABLES)
+    workdir = tempfile.mkdtemp(prefix="wazapos_paged_")
+    errors = []
+    try:
+        source_path = os.path.join(workdir, "x3_source.db")
+        bench_sync.build_source(source_path, rows, sites)
+        service = bench_sync.import_service(workdir)
+        service.EXTRACT_PAGE_ROWS = page_rows
+
+        syncer = bench_sync.build_syncer(service, source_path, sites, tables)
+        touched = bench_sync.touch_source(source_path, changed, datetime.now())
+        paged = [table for table, indexes in touched.items() if len(indexes) > page_rows]
+        if bench_sync.SITE_DEPENDENT_TABLES.keys() - set(paged):
+            errors.append(f"changes fit in one page of {page_rows} rows, raise --rows or --changed")
+        time.sleep(0.01)
+
+        syncer.run_sync(tables, deliver=False)
+        try:
+            bench_sync.check_staged(syncer, touched, sites, tables)
+        except AssertionError as e:
+            errors.append(str(e))
+
+        # Every touched row is transferred now: nothing left to stage
+        staged = syncer.run_sync(tables, deliver=False)
+        if staged:
+            errors.append(f"second run_sync staged {staged} rows, expected 0")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return errors
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="run_sync over changes spanning several pages")
+    parser.add_argument("--rows", type=int, default=400, help="rows per generated table")
+    parser.add_argument("--sites", type=int, default=2)
+    parser.add_argument("--changed", type=float, default=0.25, help="fraction of rows updated before run_sync")
+    parser.add_argument("--page-rows", type=int, default=7, help="EXTRACT_PAGE_ROWS for the check")
+    args = parser.parse_args(argv)
+
+    errors = check(args.rows, args.sites, args.changed, args.page_rows)
+    for error in errors:
+        print(f"[!] {error}")
+    if not errors:
+        print(f"[+] run_sync staged every changed row with pages of {args.page_rows} rows")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# benchmarks/fake_pyodbc.py
+"""
+Minimal pyodbc stand-in backed by a SQLite file, for benchmarking the sync
+engine without a live X3 SQL Server.
+
+Covers what DatabaseSync uses: connect/cursor/execute/fetch*/commit (on the
+connection or the cursor), the `[db].[schema].[TABLE]` naming, `SELECT TOP n`,
+`GETDATE()`, table hints, `SET ...` session statements and
+`INFORMATION_SCHEMA.TABLES`. The SQLite
+file is taken from `DATABASE=` in the connection string (or DATABASE_PATH).
+
+Column types in `cursor.description` follow the declared types of the
+source table (DATETIME, DECIMAL, INTEGER, TEXT), and values come back as
+the matching Python types, like pyodbc does.
+"""
+import datetime
+import decimal
+import re
+import sqlite3
+from typing import Dict, Optional
+
+apilevel = "2.0"
+paramstyle = "qmark"
+
+SQL_CHAR = 1
+SQL_WCHAR = -8
+
+# Fallback SQLite file when the connection string has no DATABASE=
+DATABASE_PATH: Optional[str] = None
+# Schema reported by INFORMATION_SCHEMA.TABLES
+SCHEMA = "SEED"
+
+
+class Error(Exception):
+    pass
+
+class DatabaseError(Error):
+    pass
+
+class ProgrammingError(DatabaseError):
+    pass
+
+class OperationalError(DatabaseError):
+    pass
+
+class IntegrityError(DatabaseError):
+    pass
+
+
+def _parse_datetime(value: bytes):
+    text = value.decode()
+    try:
+        return datetime.datetime.fromisoformat(text)
+    except ValueError:
+        return text
+
+
+sqlite3.register_converter("DATETIME", _parse_datetime)
+sqlite3.register_converter("DECIMAL", lambda value: decimal.Decimal(value.decode()))
+sqlite3.register_adapter(decimal.Decimal, str)
+sqlite3.register_adapter(datetime.datetime, lambda value: value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3])
+
+_TYPE_CODES = {
+    "DATETIME": datetime.datetime,
+    "DECIMAL": decimal.Decimal,
+    "INTEGER": int,
+    "TEXT": str,
+    "BLOB": bytearray,
+}
+
+_QUALIFIED_NAME = re.compile(r"\[[^\]]+\]\.\[[^\]]+\]\.\[([^\]]+)\]")
+_TABLE_HINT = re.compile(r"\s+WITH\s*\(\s*[A-Z]+(\s*,\s*[A-Z]+)*\s*\)", re.I)
+_TOP = re.compile(r"^\s*SELECT\s+TOP\s*\(?\s*(\d+)\s*\)?\s+(.*)$", re.S | re.I)
+_INFORMATION_SCHEMA = re.compile(r"INFORMATION_SCHEMA\.TABLES", re.I)
+_FROM_TABLE = re.compile(r'\bFROM\s+"([^"]+)"', re.I)
+
+
+def translate(sql: str) -> str:
+    """Rewrites the T-SQL used by the sync engine into SQLite."""
+    sql = _QUALIFIED_NAME.sub(r'"\1"', sql)
+    sql = _TABLE_HINT.sub("", sql)
+    sql = sql.replace("GETDATE()", "strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime')")
+    sql = _INFORMATION_SCHEMA.sub(
+        f"(SELECT '{SCHEMA}' AS TABLE_SCHEMA, name AS TABLE_NAME, 'BASE TABLE' AS TABLE_TYPE "
+        "FROM sqlite_master WHERE type = 'table')",
+        sql
+    )
+    match = _TOP.match(sql)
+    if match:
+        sql = f"SELECT {match.group(2).rstrip().rstrip(';')} LIMIT {match.group(1)}"
+    return sql
+
+
+class Cursor:
+    def __init__(self, connection: "Connection"):
+        self.connection = connection
+        self._cursor = connection._db.cursor()
+        self.description = None
+        self.rowcount = -1
+        self.arraysize = 1
+
+    def execute(self, sql: str, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        if sql.lstrip().upper().startswith("SET "):
+            # Session options (isolation level, lock timeout) have no SQLite equivalent
+            self.description = None
+            return self
+
+        query = translate(sql)
+        try:
+            self._cursor.execute(query, params)
+        except sqlite3.OperationalError as e:
+            if "no such table" in str(e):
+                raise ProgrammingError("42S02", f"[42S02] Invalid object name: {e}")
+            raise ProgrammingError("42000", f"{e} [query: {query}]")
+        except sqlite3.IntegrityError as e:
+            raise IntegrityError("23000", str(e))
+
+        self.rowcount = self._cursor.rowcount
+        self.description = self._describe(query) if self._cursor.description else None
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        query = translate(sql)
+        try:
+            self._cursor.executemany(query, seq_of_params)
+        except sqlite3.OperationalError as e:
+            raise ProgrammingError("42000", f"{e} [query: {query}]")
+        self.rowcount = self._cursor.rowcount
+        self.description = None
+        return self
+
+    def _describe(self, query: str):
+        match = _FROM_TABLE.search(query)
+        declared = self.connection._declared_types(match.group(1)) if match else {}
+        return [
+            (column[0], _TYPE_CODES.get(declared.get(column[0], "TEXT"), str), None, None, None, None, True)
+            for column in self._cursor.description
+        ]
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size: Optional[int] = None):
+        return self._cursor.fetchmany(size or self.arraysize)
+
+    def commit(self):
+        # pyodbc cursors commit their connection
+        self.connection.commit()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+
+class Connection:
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        self._types: Dict[str, Dict[str, str]] = {}
+        self.autocommit = False
+
+    def _declared_types(self, table: str) -> Dict[str, str]:
+        if table not in self._types:
+            rows = self._db.execute(f'PRAGMA table_info("{table}")').fetchall()
+            self._types[table] = {row[1]: (row[2] or "TEXT").upper() for row in rows}
+        return self._types[table]
+
+    def cursor(self) -> Cursor:
+        return Cursor(self)
+
+    def execute(self, sql: str, *params) -> Cursor:
+        return self.cursor().execute(sql, *params)
+
+    def setdecoding(self, *args, **kwargs):
+        pass
+
+    def setencoding(self, *args, **kwargs):
+        pass
+
+    def commit(self):
+        self._db.commit()
+
+    def rollback(self):
+        self._db.rollback()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Same as pyodbc: commit on success, the connection stays open
+        if exc_type is None:
+            self._db.commit()
+        else:
+            self._db.rollback()
+        return False
+
+
+def connect(connection_string: str = "", timeout: int = 0, autocommit: bool = False, **kwargs) -> Connection:
+    match = re.search(r"DATABASE=([^;]+)", connection_string, re.I)
+    path = match.group(1) if match else DATABASE_PATH
+    if not path:
+        raise OperationalError("08001", "No SQLite file given (DATABASE= or fake_pyodbc.DATABASE_PATH)")
+    connection = Connection(path)
+    connection.autocommit = autocommit
+    return connection
@@ -7,6 +7,7 @@ import win32net
 import win32netcon
 import os
 import sys
+import json
 import shutil
 
 
@@ -14,6 +15,28 @@ SERVICE_NAME = "WAZAPOS_TEST"
 SERVICE_DISPLAY_NAME = "WAZAPOS_TEST"
 SERVICE_DESCRIPTION = "Runs scheduled tasks for WAZAPOS App"
 
+# Modules imported by service.py that must sit next to it in the service directory
+SERVICE_MODULES = [
+    'scheduler.py',
+    'delta_store.py',
+    'delivery.py',
+    'changelog.py',
+    'polling.py',
+    'table_schedule.py',
+    'config_snapshot.py',
+    'metrics.py',
+    'run_history.py',
+    'profiling.py',
+    'memory.py',
+    'log_pipeline.py',
+    'tracing.py',
+    'converters.py',
+    'sync_plan.py',
+    'bootstrap_pool.py',
+    'bootstrap_progress.py',
+    'pipeline.py',
+]
+
 def ensure_essential_folders():
     """Ensure all required data folders exist"""
     base_dir = r"C:\poswaza\temp"
@@ -30,6 +53,8 @@ def ensure_essential_folders():
 # Initialize folders first
 BASE_DIR = ensure_essential_folders()
 API_LOG_PATH = os.path.join(BASE_DIR, "logs", "fastapi.log")
+# Written by the service after every sync cycle (see windowsService/polling.py)
+CYCLE_STATS_PATH = os.path.join(BASE_DIR, "logs", "cycle_stats.json")
 
 logging.basicConfig(
     level=logging.INFO,
@@ -99,11 +124,12 @@ def get_service_script_path():
                         logger.info(f"Found service script at: {source}")
                         shutil.copy2(source, service_script)
                         
-                        # Also copy scheduler.py if it exists
-                        scheduler_source = os.path.join(os.path.dirname(source), 'scheduler.py')
-                        if os.path.exists(scheduler_source):
-                            shutil.copy2(scheduler_source, os.path.join(permanent_dir, 'scheduler.py'))
-                            logger.info("Copied scheduler.py as well")
+                        # Also copy the modules service.py depends on
+                        for module_name in SERVICE_MODULES:
+                            module_source = os.path.join(os.path.dirname(source), module_name)
+                            if os.path.exists(module_source):
+                                shutil.copy2(module_source, os.path.join(permanent_dir, module_name))
+                                logger.info(f"Copied {module_name} as well")
                         
                         break
                 else:
@@ -420,6 +446,13 @@ def get_service_status():
             "error": str(e)
         }
 
+def get_cycle_stats():
+    """Return the polling interval and the last sync cycles reported by the service, or None if it never ran"""
+    if not os.path.exists(CYCLE_STATS_PATH):
+        return None
+    with open(CYCLE_STATS_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
 def reset_service():
     """Stop, uninstall, and delete app files + ephemeral data (keeps config.db)"""
     ensure_essential_folders()
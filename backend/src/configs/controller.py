@@ -1,10 +1,14 @@
 from typing import List
 from fastapi import APIRouter, Depends
-from .model import FolderSettings, SiteConfigModel
+from .model import FolderSettings, ProfilingConfigModel, ScheduleClassModel, SiteConfigModel, TableScheduleModel
 from sqlalchemy.orm import Session
 from ..database.session import get_db
 from ..database.models import ConfigurationsFolders
-from .service import delete_site_setting, get_site_settting, save_folder_settings_service, save_site_setting
+from .service import (
+    delete_site_setting, delete_table_schedule, get_profiling_config, get_schedule_classes, get_site_settting,
+    get_table_schedules, save_folder_settings_service, save_profiling_config, save_schedule_classes,
+    save_site_setting, save_table_schedules
+)
 
 folder_router = APIRouter(
     prefix="/config",
@@ -35,4 +39,32 @@ def get_config(db: Session = Depends(get_db)):
 
 @folder_router.delete("/delete/address/{site}")
 def delete_config(site: str, db: Session = Depends(get_db)):
-    return delete_site_setting(site, db)
\ No newline at end of file
+    return delete_site_setting(site, db)
+
+@folder_router.get("/schedule-classes", response_model=List[ScheduleClassModel])
+def get_classes(db: Session = Depends(get_db)):
+    return get_schedule_classes(db)
+
+@folder_router.post("/schedule-classes", response_model=List[ScheduleClassModel])
+def save_classes(classes: List[ScheduleClassModel], db: Session = Depends(get_db)):
+    return save_schedule_classes(classes, db)
+
+@folder_router.get("/tables", response_model=List[TableScheduleModel])
+def get_tables(db: Session = Depends(get_db)):
+    return get_table_schedules(db)
+
+@folder_router.post("/tables", response_model=List[TableScheduleModel])
+def save_tables(tables: List[TableScheduleModel], db: Session = Depends(get_db)):
+    return save_table_schedules(tables, db)
+
+@folder_router.delete("/tables/{table_name}", response_model=TableScheduleModel)
+def delete_table(table_name: str, db: Session = Depends(get_db)):
+    return delete_table_schedule(table_name, db)
+
+@folder_router.get("/profiling", response_model=ProfilingConfigModel)
+def get_profiling(db: Session = Depends(get_db)):
+    return get_profiling_config(db)
+
+@folder_router.post("/profiling", response_model=ProfilingConfigModel)
+def save_profiling(config: ProfilingConfigModel, db: Session = Depends(get_db)):
+    return save_profiling_config(config, db)
\ No newline at end of file
@@ -1,4 +1,5 @@
-from pydantic import BaseModel
+from typing import Literal
+from pydantic import BaseModel, Field
 
 
 
@@ -9,4 +10,35 @@ class FolderSettings(BaseModel):
 
 class SiteConfigModel(BaseModel):
     site: str
-    email_address: str
\ No newline at end of file
+    email_address: str
+    # 'folder' drops deltas in configurations_folders.destination/<site>/ instead of emailing them,
+    # 'pull' only records them for the POS to fetch from /sync/{site}/changes
+    transport: Literal["email", "folder", "pull"] = "email"
+
+
+class ScheduleClassModel(BaseModel):
+    name: str
+    interval_seconds: int = Field(gt=0)
+
+
+class TableScheduleModel(BaseModel):
+    table_name: str
+    schedule_class: str = "warm"
+    priority: int = 100  # lower runs first
+    enabled: bool = True
+
+
+class ProfilingConfigModel(BaseModel):
+    enabled: bool = False
+    # 'run_sync' profiles every sync run, 'bootstrap' the next syncer build,
+    # 'cycles' the next `cycles` whole sync cycles
+    target: Literal["run_sync", "bootstrap", "cycles"] = "run_sync"
+    cycles: int = Field(default=1, gt=0)
+    keep_files: int = Field(default=20, gt=0)  # newest .prof files kept in logs/profiles
+    top_n: int = Field(default=25, gt=0)  # functions kept in the summary stored with the run
+    # tracemalloc peaks per stage and top allocation sites per cycle (slows the sync down)
+    trace_memory: bool = False
+    memory_top_n: int = Field(default=10, gt=0)
+    memory_frames: int = Field(default=1, gt=0)
+    # Chrome trace-event file (logs/traces) of every cycle, open it in chrome://tracing or Perfetto
+    trace_spans: bool = False
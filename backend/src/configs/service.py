@@ -1,25 +1,71 @@
 from typing import List
 import logging
 from fastapi import Depends, HTTPException, status
-from .model import FolderSettings, SiteConfigModel
+from .model import FolderSettings, ProfilingConfigModel, ScheduleClassModel, SiteConfigModel, TableScheduleModel
 from sqlalchemy.orm import Session
 from ..database.session import get_db
-from ..database.models import ConfigurationsFolders, SiteConfig
-import sys
+from ..database.models import ConfigurationsFolders, ProfilingConfig, ScheduleClass, SiteConfig, TableSchedule
 
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s - %(name)s - %(funcName)s - %(lineno)d - %(threadName)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('fastapi.log')
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
 
+# Polling interval of each schedule class, in seconds
+DEFAULT_SCHEDULE_CLASSES = {
+    "hot": 30,
+    "warm": 300,
+    "cold": 3600,
+}
+
+# Tables synced by the service: transactional tables are hot, X3 reference tables cold
+DEFAULT_TABLE_SCHEDULES = [
+    ("STOCK", "hot", 10),
+    ("SORDER", "hot", 10),
+    ("SORDERQ", "hot", 10),
+    ("SORDERP", "hot", 10),
+    ("SDELIVERY", "hot", 10),
+    ("SDELIVERYD", "hot", 10),
+    ("BPCUSTMVT", "hot", 10),
+    ("ITMMASTER", "warm", 50),
+    ("ITMFACILIT", "warm", 50),
+    ("ITMSALES", "warm", 50),
+    ("BPARTNER", "warm", 50),
+    ("BPCUSTOMER", "warm", 50),
+    ("BPDLVCUST", "warm", 50),
+    ("BPADDRESS", "warm", 50),
+    ("SALESREP", "warm", 50),
+    ("SPRICLINK", "warm", 50),
+    ("PRICSTRUCT", "warm", 50),
+    ("SPRICCONF", "warm", 50),
+    ("SPRICLIST", "warm", 50),
+    ("PIMPL", "warm", 50),
+    ("SFOOTINV", "warm", 50),
+    ("CBLOB", "warm", 50),
+    ("ABLOB", "warm", 50),
+    ("TABSDHTYP", "cold", 90),
+    ("FACILITY", "cold", 90),
+    ("SPREASON", "cold", 90),
+    ("TABMODELIV", "cold", 90),
+    ("BPCARRIER", "cold", 90),
+    ("COMPANY", "cold", 90),
+    ("TABSOHTYP", "cold", 90),
+    ("TABVACBPR", "cold", 90),
+    ("SVCRVAT", "cold", 90),
+    ("ITMCATEG", "cold", 90),
+    ("AUTILIS", "cold", 90),
+    ("AMENUSER", "cold", 90),
+    ("TABVAT", "cold", 90),
+    ("WAREHOUSE", "cold", 90),
+    ("TABPAYTERM", "cold", 90),
+    ("TABDEPAGIO", "cold", 90),
+    ("BPCINVVAT", "cold", 90),
+    ("TABRATVAT", "cold", 90),
+    ("TABVACITM", "cold", 90),
+    ("TABVAC", "cold", 90),
+    ("TAXLINK", "cold", 90),
+]
+
+
 def save_folder_settings_service(folder_settings: FolderSettings, db: Session = get_db()) -> FolderSettings: # type: ignore
     db.query(ConfigurationsFolders).delete()
     db.commit()
@@ -44,12 +90,14 @@ def save_site_setting( configs: List[SiteConfigModel], db: Session = get_db()) -
         existing_site_config =  db.query(SiteConfig).filter(SiteConfig.site == config.site).first()
         if existing_site_config:
             existing_site_config.email_address = config.email_address
+            existing_site_config.transport = config.transport
             results.append(existing_site_config)
             db.add(existing_site_config)
         else:
             new_configs = SiteConfig(
                 site=config.site,
-                email_address=config.email_address
+                email_address=config.email_address,
+                transport=config.transport
             )
             results.append(new_configs)
             db.add(new_configs)
@@ -66,7 +114,8 @@ def get_site_settting(db: Session = Depends(get_db)) -> List[SiteConfigModel]:
     return [
         SiteConfigModel(
             site=res.site, # type: ignore
-            email_address=res.email_address # type: ignore
+            email_address=res.email_address, # type: ignore
+            transport=res.transport or "email" # type: ignore
         )
         for res in response
     ]
@@ -88,5 +137,143 @@ def delete_site_setting(site: str, db: Session = Depends(get_db)) -> SiteConfigM
     db.commit()
     return SiteConfigModel(
         email_address=config.email_address, # type: ignore
-        site=config.site # type: ignore
-    )
\ No newline at end of file
+        site=config.site, # type: ignore
+        transport=config.transport or "email" # type: ignore
+    )
+
+
+def seed_table_schedules(db: Session):
+    """Insert the default schedule classes and table schedules on a fresh config.db."""
+    if db.query(ScheduleClass).count() == 0:
+        for name, interval in DEFAULT_SCHEDULE_CLASSES.items():
+            db.add(ScheduleClass(name=name, interval_seconds=interval))
+
+    if db.query(TableSchedule).count() == 0:
+        for table_name, schedule_class, priority in DEFAULT_TABLE_SCHEDULES:
+            db.add(TableSchedule(
+                table_name=table_name,
+                schedule_class=schedule_class,
+                priority=priority,
+                enabled=True
+            ))
+
+    db.commit()
+
+
+def get_schedule_classes(db: Session) -> List[ScheduleClassModel]:
+    return [
+        ScheduleClassModel(name=res.name, interval_seconds=res.interval_seconds) # type: ignore
+        for res in db.query(ScheduleClass).order_by(ScheduleClass.interval_seconds).all()
+    ]
+
+
+def save_schedule_classes(configs: List[ScheduleClassModel], db: Session) -> List[ScheduleClassModel]:
+    for config in configs:
+        existing = db.query(ScheduleClass).filter(ScheduleClass.name == config.name).first()
+        if existing:
+            existing.interval_seconds = config.interval_seconds # type: ignore
+        else:
+            db.add(ScheduleClass(name=config.name, interval_seconds=config.interval_seconds))
+    db.commit()
+
+    return get_schedule_classes(db)
+
+
+def get_table_schedules(db: Session) -> List[TableScheduleModel]:
+    response = db.query(TableSchedule).order_by(TableSchedule.priority, TableSchedule.table_name).all()
+
+    return [
+        TableScheduleModel(
+            table_name=res.table_name, # type: ignore
+            schedule_class=res.schedule_class, # type: ignore
+            priority=res.priority if res.priority is not None else 100, # type: ignore
+            enabled=res.enabled if res.enabled is not None else True # type: ignore
+        )
+        for res in response
+    ]
+
+
+def save_table_schedules(configs: List[TableScheduleModel], db: Session) -> List[TableScheduleModel]:
+    known_classes = {res.name for res in db.query(ScheduleClass).all()}
+    for config in configs:
+        if config.schedule_class not in known_classes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown schedule class '{config.schedule_class}' for table '{config.table_name}'."
+            )
+
+    for config in configs:
+        table_name = config.table_name.strip().upper()
+        existing = db.query(TableSchedule).filter(TableSchedule.table_name == table_name).first()
+        if existing:
+            existing.schedule_class = config.schedule_class # type: ignore
+            existing.priority = config.priority # type: ignore
+            existing.enabled = config.enabled # type: ignore
+        else:
+            db.add(TableSchedule(
+                table_name=table_name,
+                schedule_class=config.schedule_class,
+                priority=config.priority,
+                enabled=config.enabled
+            ))
+    db.commit()
+
+    return get_table_schedules(db)
+
+
+def delete_table_schedule(table_name: str, db: Session) -> TableScheduleModel:
+    table_name = table_name.strip().upper()
+    config = db.query(TableSchedule).filter(TableSchedule.table_name == table_name).first()
+
+    if not config:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Schedule for table '{table_name}' not found."
+        )
+    db.delete(config)
+    db.commit()
+    return TableScheduleModel(
+        table_name=config.table_name, # type: ignore
+        schedule_class=config.schedule_class, # type: ignore
+        priority=config.priority if config.priority is not None else 100, # type: ignore
+        enabled=config.enabled if config.enabled is not None else True # type: ignore
+    )
+
+
+def get_profiling_config(db: Session) -> ProfilingConfigModel:
+    config = db.get(ProfilingConfig, 1)
+    if config is None:
+        return ProfilingConfigModel()
+
+    defaults = ProfilingConfigModel()
+    return ProfilingConfigModel(
+        enabled=bool(config.enabled),
+        target=config.target or defaults.target, # type: ignore
+        cycles=config.cycles or defaults.cycles, # type: ignore
+        keep_files=config.keep_files or defaults.keep_files, # type: ignore
+        top_n=config.top_n or defaults.top_n, # type: ignore
+        trace_memory=bool(config.trace_memory),
+        memory_top_n=config.memory_top_n or defaults.memory_top_n, # type: ignore
+        memory_frames=config.memory_frames or defaults.memory_frames, # type: ignore
+        trace_spans=bool(config.trace_spans)
+    )
+
+
+def save_profiling_config(config: ProfilingConfigModel, db: Session) -> ProfilingConfigModel:
+    """Saves the profiling settings; the service picks them up on its next cycle."""
+    existing = db.get(ProfilingConfig, 1)
+    if existing is None:
+        existing = ProfilingConfig(id=1)
+        db.add(existing)
+    existing.enabled = config.enabled # type: ignore
+    existing.target = config.target # type: ignore
+    existing.cycles = config.cycles # type: ignore
+    existing.keep_files = config.keep_files # type: ignore
+    existing.top_n = config.top_n # type: ignore
+    existing.trace_memory = config.trace_memory # type: ignore
+    existing.memory_top_n = config.memory_top_n # type: ignore
+    existing.memory_frames = config.memory_frames # type: ignore
+    existing.trace_spans = config.trace_spans # type: ignore
+    db.commit()
+
+    return get_profiling_config(db)
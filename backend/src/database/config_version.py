@@ -0,0 +1,69 @@
+# database/config_version.py
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.database.models import (
+    ConfigurationsFolders,
+    ConfigVersion,
+    DatabaseConfiguration,
+    EmailConfig,
+    ProfilingConfig,
+    ScheduleClass,
+    SiteConfig,
+    TableSchedule,
+)
+from src.database.session import SessionLocal
+
+# Tables the Windows service builds its syncer (and profiler) from
+CONFIG_MODELS = (
+    ConfigurationsFolders,
+    DatabaseConfiguration,
+    EmailConfig,
+    SiteConfig,
+    ScheduleClass,
+    TableSchedule,
+    ProfilingConfig,
+)
+
+
+def _touches_config(session: Session) -> bool:
+    return any(
+        isinstance(obj, CONFIG_MODELS)
+        for obj in (*session.new, *session.dirty, *session.deleted)
+    )
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _flag_config_flush(session, flush_context, instances):
+    if _touches_config(session):
+        session.info["config_changed"] = True
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def _flag_config_bulk(orm_execute_state):
+    # db.query(Model).delete() / .update() bypass the flush
+    if orm_execute_state.is_delete or orm_execute_state.is_update:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, CONFIG_MODELS):
+            orm_execute_state.session.info["config_changed"] = True
+
+
+@event.listens_for(SessionLocal, "before_commit")
+def _bump_config_version(session):
+    if not (session.info.pop("config_changed", False) or _touches_config(session)):
+        return
+
+    row = session.get(ConfigVersion, 1)
+    if row is None:
+        row = ConfigVersion(id=1, version=0)
+        session.add(row)
+    row.version = (row.version or 0) + 1
+    row.updated_at = datetime.now().isoformat()
+
+
+@event.listens_for(SessionLocal, "after_commit")
+@event.listens_for(SessionLocal, "after_rollback")
+def _clear_config_flag(session):
+    session.info.pop("config_changed", None)
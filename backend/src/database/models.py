@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, ForeignKey
+from sqlalchemy import Boolean, Column, Float, Index, Integer, LargeBinary, String, ForeignKey
 from sqlalchemy.orm import relationship
 from src.database.session import Base
 
@@ -50,6 +50,106 @@ class SiteConfig(Base):
     id = Column(Integer, primary_key=True, index=True)
     site = Column(String, nullable=True)
     email_address = Column(String, nullable=True)
+    transport = Column(String, nullable=True)  # 'email' (default), 'folder' or 'pull'
+
+class ScheduleClass(Base):
+    __tablename__ = "schedule_classes"
+    name = Column(String, primary_key=True, index=True)  # 'hot', 'warm', 'cold'
+    interval_seconds = Column(Integer, nullable=False)
+
+class TableSchedule(Base):
+    __tablename__ = "table_schedules"
+    id = Column(Integer, primary_key=True, index=True)
+    table_name = Column(String, unique=True, index=True)
+    schedule_class = Column(String, nullable=False)
+    priority = Column(Integer, nullable=True)  # lower runs first
+    enabled = Column(Boolean, nullable=True)
+
+class ProfilingConfig(Base):
+    # Single row (id=1) read by the Windows service (windowsService/profiling.py)
+    __tablename__ = "profiling_config"
+    id = Column(Integer, primary_key=True)
+    enabled = Column(Boolean, nullable=False, default=False)
+    target = Column(String, nullable=False, default="run_sync")  # 'run_sync', 'bootstrap' or 'cycles'
+    cycles = Column(Integer, nullable=True)  # number of cycles profiled when target is 'cycles'
+    keep_files = Column(Integer, nullable=True)
+    top_n = Column(Integer, nullable=True)
+    trace_memory = Column(Boolean, nullable=True)  # tracemalloc per stage, see windowsService/memory.py
+    memory_top_n = Column(Integer, nullable=True)  # allocation sites kept per cycle
+    memory_frames = Column(Integer, nullable=True)  # traceback depth recorded by tracemalloc
+    trace_spans = Column(Boolean, nullable=True)  # Chrome trace-event file per cycle, see windowsService/tracing.py
+
+class ConfigVersion(Base):
+    # Bumped on every configuration write (database/config_version.py), polled by the Windows service
+    __tablename__ = "config_version"
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(String, nullable=True)
+
+class ChangeSet(Base):
+    # Written by the Windows service (windowsService/changelog.py) for every shipped delta
+    __tablename__ = "sync_changelog"
+    __table_args__ = {"sqlite_autoincrement": True}
+    seq = Column(Integer, primary_key=True, autoincrement=True)
+    site = Column(String, nullable=False, index=True)
+    created_at = Column(String, nullable=False)
+    tables = Column(String, nullable=True)  # JSON {table: row count}
+    row_count = Column(Integer, nullable=True)
+    payload = Column(LargeBinary, nullable=False)  # gzip member holding one JSON line
+
+class SyncRun(Base):
+    # Written by the Windows service (windowsService/run_history.py) for every sync, bootstrap and delivery pass
+    __tablename__ = "sync_runs"
+    __table_args__ = {"sqlite_autoincrement": True}
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String, nullable=False)  # 'sync', 'bootstrap' or 'delivery'
+    started_at = Column(String, nullable=False)
+    finished_at = Column(String, nullable=True)
+    duration = Column(Float, nullable=True)
+    status = Column(String, nullable=True)  # 'success', 'partial' or 'failed'
+    changed_rows = Column(Integer, nullable=True)
+    bytes = Column(Integer, nullable=True)
+    table_errors = Column(Integer, nullable=True)
+    error = Column(String, nullable=True)
+    profile_path = Column(String, nullable=True)  # .prof file when the run was profiled
+    profile_summary = Column(String, nullable=True)  # top functions by cumulative time
+    peak_rss = Column(Integer, nullable=True)  # bytes, peak of the service process over the cycle
+    traced_peak = Column(Integer, nullable=True)  # bytes allocated by Python at the cycle peak, tracemalloc only
+    memory_top = Column(String, nullable=True)  # top allocation sites, one per line
+    trace_path = Column(String, nullable=True)  # Chrome trace-event .json of the cycle
+
+class SyncRunTable(Base):
+    __tablename__ = "sync_run_tables"
+    __table_args__ = (
+        Index("ix_sync_run_tables_site", "site", "run_id"),
+        Index("ix_sync_run_tables_table_name", "table_name", "run_id"),
+        {"sqlite_autoincrement": True},
+    )
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey("sync_runs.id"), nullable=False, index=True)
+    table_name = Column(String, nullable=False)
+    site = Column(String, nullable=False, default="")
+    rows = Column(Integer, nullable=True)
+    bytes = Column(Integer, nullable=True)
+    duration = Column(Float, nullable=True)
+    error = Column(String, nullable=True)
+    delivery_status = Column(String, nullable=True)  # 'staged', 'delivered' or 'failed'
+
+class SyncMetric(Base):
+    # Accumulated by the Windows service (windowsService/metrics.py), one row per stage/table/site
+    __tablename__ = "sync_metrics"
+    stage = Column(String, primary_key=True)
+    table_name = Column(String, primary_key=True, default="")
+    site = Column(String, primary_key=True, default="")
+    calls = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)
+    total_seconds = Column(Float, nullable=False, default=0)
+    max_seconds = Column(Float, nullable=False, default=0)
+    last_seconds = Column(Float, nullable=False, default=0)
+    rows = Column(Integer, nullable=False, default=0)
+    bytes = Column(Integer, nullable=False, default=0)
+    mem_peak_bytes = Column(Integer, nullable=False, server_default="0")  # largest traced peak, tracemalloc only
+    updated_at = Column(String, nullable=True)
 
 class Conversation(Base):
     __tablename__ = "conversations"
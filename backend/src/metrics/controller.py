@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, Query, Response
+from sqlalchemy.orm import Session
+from ..database.session import get_db
+from .model import MetricsSummary
+from .service import PROMETHEUS_CONTENT_TYPE, get_metrics_summary, render_prometheus, reset_metrics
+
+metrics_router = APIRouter(
+    prefix="/metrics",
+    tags=["metrics"]
+)
+
+
+@metrics_router.get("")
+def get_metrics(db: Session = Depends(get_db)):
+    """Sync engine stage metrics in the Prometheus text format"""
+    return Response(content=render_prometheus(db), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@metrics_router.get("/summary", response_model=MetricsSummary)
+def get_summary(
+    top: int = Query(10, ge=1, le=100, description="Number of slowest tables returned"),
+    db: Session = Depends(get_db)
+):
+    """Totals per stage, emails sent and the slowest tables"""
+    return get_metrics_summary(db, top)
+
+
+@metrics_router.delete("")
+def delete_metrics(db: Session = Depends(get_db)):
+    """Reset the accumulated metrics"""
+    return {"deleted": reset_metrics(db)}
@@ -0,0 +1,28 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class StageTotals(BaseModel):
+    stage: str
+    calls: int
+    errors: int
+    total_seconds: float
+    average_seconds: Optional[float] = None
+    max_seconds: float
+    rows: int
+    bytes: int
+    mem_peak_bytes: int = 0  # largest traced peak of one run, tracemalloc only
+
+class TableTotals(BaseModel):
+    table_name: str
+    total_seconds: float
+    rows: int
+    stages: dict = {}  # {stage: total_seconds}
+
+class MetricsSummary(BaseModel):
+    updated_at: Optional[str] = None
+    emails_sent: int = 0
+    emails_failed: int = 0
+    last_peak_rss: Optional[int] = None  # bytes, latest sync cycle
+    stages: List[StageTotals] = []
+    slowest_tables: List[TableTotals] = []
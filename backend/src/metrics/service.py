@@ -0,0 +1,127 @@
+from collections import defaultdict
+from typing import Dict, List
+from sqlalchemy.orm import Session
+from ..database.models import SyncMetric, SyncRun
+from .model import MetricsSummary, StageTotals, TableTotals
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# (metric name, SyncMetric attribute, type, help)
+PROMETHEUS_METRICS = [
+    ("wazapos_sync_stage_calls_total", "calls", "counter", "Number of times a sync stage ran."),
+    ("wazapos_sync_stage_errors_total", "errors", "counter", "Number of failed runs of a sync stage."),
+    ("wazapos_sync_stage_seconds_total", "total_seconds", "counter", "Time spent in a sync stage."),
+    ("wazapos_sync_stage_seconds_max", "max_seconds", "gauge", "Longest single run of a sync stage."),
+    ("wazapos_sync_stage_last_seconds", "last_seconds", "gauge", "Duration of the last run of a sync stage."),
+    ("wazapos_sync_stage_rows_total", "rows", "counter", "Rows handled by a sync stage."),
+    ("wazapos_sync_stage_bytes_total", "bytes", "counter", "Bytes written or sent by a sync stage."),
+    ("wazapos_sync_stage_memory_peak_bytes", "mem_peak_bytes", "gauge", "Largest Python allocation peak of a sync stage (tracemalloc on)."),
+]
+
+
+def _label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus(db: Session) -> str:
+    """All stage metrics in the Prometheus text exposition format."""
+    rows = db.query(SyncMetric).order_by(SyncMetric.stage, SyncMetric.table_name, SyncMetric.site).all()
+
+    lines: List[str] = []
+    for name, attribute, metric_type, help_text in PROMETHEUS_METRICS:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for row in rows:
+            labels = f'stage="{_label_value(row.stage)}",table="{_label_value(row.table_name)}",site="{_label_value(row.site)}"'
+            lines.append(f"{name}{{{labels}}} {getattr(row, attribute)}")
+
+    peak_rss = _last_peak_rss(db)
+    if peak_rss is not None:
+        lines.append("# HELP wazapos_sync_cycle_peak_rss_bytes Peak resident memory of the service during the last sync cycle.")
+        lines.append("# TYPE wazapos_sync_cycle_peak_rss_bytes gauge")
+        lines.append(f"wazapos_sync_cycle_peak_rss_bytes {peak_rss}")
+
+    sent, failed = _email_counts(rows)
+    lines.append("# HELP wazapos_emails_sent_total Delta emails accepted by the SMTP server.")
+    lines.append("# TYPE wazapos_emails_sent_total counter")
+    lines.append(f"wazapos_emails_sent_total {sent}")
+    lines.append("# HELP wazapos_emails_failed_total Delta emails that could not be sent.")
+    lines.append("# TYPE wazapos_emails_failed_total counter")
+    lines.append(f"wazapos_emails_failed_total {failed}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _email_counts(rows: List[SyncMetric]):
+    email_rows = [row for row in rows if row.stage == "email"]
+    failed = sum(row.errors for row in email_rows)
+    return sum(row.calls for row in email_rows) - failed, failed
+
+
+def _last_peak_rss(db: Session):
+    run = (
+        db.query(SyncRun.peak_rss)
+        .filter(SyncRun.kind == "sync", SyncRun.peak_rss.isnot(None))
+        .order_by(SyncRun.id.desc())
+        .first()
+    )
+    return run.peak_rss if run else None
+
+
+def get_metrics_summary(db: Session, top: int = 10) -> MetricsSummary:
+    """Totals per stage and the tables the engine spends the most time on."""
+    rows = db.query(SyncMetric).all()
+    if not rows:
+        return MetricsSummary()
+
+    stages: Dict[str, dict] = defaultdict(lambda: dict(calls=0, errors=0, total_seconds=0.0, max_seconds=0.0, rows=0, bytes=0, mem_peak_bytes=0))
+    tables: Dict[str, dict] = defaultdict(lambda: dict(total_seconds=0.0, rows=0, stages=defaultdict(float)))
+    for row in rows:
+        stage = stages[row.stage]
+        stage["calls"] += row.calls
+        stage["errors"] += row.errors
+        stage["total_seconds"] += row.total_seconds
+        stage["max_seconds"] = max(stage["max_seconds"], row.max_seconds)
+        stage["rows"] += row.rows
+        stage["bytes"] += row.bytes
+        stage["mem_peak_bytes"] = max(stage["mem_peak_bytes"], row.mem_peak_bytes or 0)
+
+        if row.table_name:
+            table = tables[row.table_name]
+            table["total_seconds"] += row.total_seconds
+            table["stages"][row.stage] += row.total_seconds
+            if row.stage == "select":
+                table["rows"] += row.rows
+
+    sent, failed = _email_counts(rows)
+    slowest = sorted(tables.items(), key=lambda item: item[1]["total_seconds"], reverse=True)[:top]
+
+    return MetricsSummary(
+        updated_at=max((row.updated_at for row in rows if row.updated_at), default=None),
+        emails_sent=sent,
+        emails_failed=failed,
+        last_peak_rss=_last_peak_rss(db),
+        stages=[
+            StageTotals(
+                stage=name,
+                average_seconds=round(totals["total_seconds"] / totals["calls"], 6) if totals["calls"] else None,
+                **totals
+            )
+            for name, totals in sorted(stages.items(), key=lambda item: item[1]["total_seconds"], reverse=True)
+        ],
+        slowest_tables=[
+            TableTotals(
+                table_name=name,
+                total_seconds=round(totals["total_seconds"], 6),
+                rows=totals["rows"],
+                stages={stage: round(seconds, 6) for stage, seconds in totals["stages"].items()}
+            )
+            for name, totals in slowest
+        ],
+    )
+
+
+def reset_metrics(db: Session) -> int:
+    deleted = db.query(SyncMetric).delete()
+    db.commit()
+    return deleted
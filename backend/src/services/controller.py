@@ -1,8 +1,7 @@
 import logging
-import sys
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
-from .model import ServiceResponse, ServiceStatus
+from .model import CycleStats, ServiceResponse, ServiceStatus
 import service_manager
 
 service_router = APIRouter(
@@ -10,15 +9,6 @@ service_router = APIRouter(
     tags=["service management"]
 )
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s - %(name)s - %(funcName)s - %(lineno)d - %(threadName)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('fastapi.log')
-    ]
-)
-
 logger = logging.getLogger(__name__)
 
 
@@ -158,4 +148,17 @@ async def reset_service():
         return ServiceResponse(message=result)
     except Exception as e:
         logger.error(f"=== CONTROLLER: Error resetting service: {e} ===")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@service_router.get("/cycles", response_model=CycleStats)
+async def get_cycles():
+    """Get the current polling interval and the durations of the last sync cycles"""
+    try:
+        stats = service_manager.get_cycle_stats()
+        if stats is None:
+            return CycleStats()
+        return CycleStats(**stats)
+    except Exception as e:
+        logger.error(f"=== CONTROLLER: Error reading cycle stats: {e} ===")
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
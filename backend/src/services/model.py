@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 
 
@@ -12,4 +12,18 @@ class ServiceResponse(BaseModel):
     success: Optional[bool] = None
     message:  Optional[str] = None
     error: Optional[str] = None
-    status: Optional[ServiceStatus] = None
\ No newline at end of file
+    status: Optional[ServiceStatus] = None
+
+class SyncCycle(BaseModel):
+    finished_at: str
+    duration: float
+    changed_rows: int
+    interval: float
+    error: Optional[str] = None
+
+class CycleStats(BaseModel):
+    interval: Optional[float] = None
+    min_interval: Optional[float] = None
+    max_interval: Optional[float] = None
+    average_duration: Optional[float] = None
+    cycles: List[SyncCycle] = []
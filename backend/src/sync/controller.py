@@ -0,0 +1,62 @@
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from ..database.session import get_db
+from .model import SyncHistoryPage
+from .service import build_etag, etag_matches, get_change_page, get_run_history, stream_payloads
+
+sync_router = APIRouter(
+    prefix="/sync",
+    tags=["sync"]
+)
+
+
+@sync_router.get("/{site}/changes")
+def get_changes(
+    site: str,
+    request: Request,
+    after: int = Query(0, ge=0, description="Last change set seq already applied by the client"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of change sets returned"),
+    db: Session = Depends(get_db)
+):
+    """
+    Change sets shipped to a site after the given cursor, as NDJSON (one change set per line).
+    Send the X-Next-Cursor value back as `after` to continue; X-Has-More tells if another page is waiting.
+    """
+    page = get_change_page(site, after, limit, db)
+    etag = build_etag(site, after, page)
+
+    headers = {
+        "ETag": etag,
+        "X-Next-Cursor": str(page.last_seq),
+        "X-Has-More": "true" if page.has_more else "false",
+        "Cache-Control": "no-cache",
+        "Vary": "Accept-Encoding",
+    }
+
+    if etag_matches(request.headers.get("if-none-match", ""), etag):
+        return Response(status_code=304, headers=headers)
+
+    compressed = "gzip" in request.headers.get("accept-encoding", "").lower()
+    if compressed:
+        headers["Content-Encoding"] = "gzip"
+
+    return StreamingResponse(
+        stream_payloads(page, compressed),
+        media_type="application/x-ndjson",
+        headers=headers
+    )
+
+
+@sync_router.get("/history", response_model=SyncHistoryPage)
+def get_history(
+    before: Optional[int] = Query(None, ge=1, description="Return runs older than this run id (next_cursor of the previous page)"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of runs returned"),
+    site: Optional[str] = Query(None, description="Only runs that touched this site"),
+    table: Optional[str] = Query(None, description="Only runs that touched this table"),
+    kind: Optional[Literal["sync", "bootstrap", "delivery"]] = Query(None, description="Only runs of this kind"),
+    db: Session = Depends(get_db)
+):
+    """Past sync, bootstrap and delivery runs, newest first, with their per-table results"""
+    return get_run_history(db, before, limit, site, table, kind)
@@ -0,0 +1,36 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class SyncRunTableModel(BaseModel):
+    table_name: str
+    site: str = ""
+    rows: Optional[int] = None
+    bytes: Optional[int] = None
+    duration: Optional[float] = None
+    error: Optional[str] = None
+    delivery_status: Optional[str] = None
+
+class SyncRunModel(BaseModel):
+    id: int
+    kind: str
+    started_at: str
+    finished_at: Optional[str] = None
+    duration: Optional[float] = None
+    status: Optional[str] = None
+    changed_rows: Optional[int] = None
+    bytes: Optional[int] = None
+    table_errors: Optional[int] = None
+    error: Optional[str] = None
+    profile_path: Optional[str] = None  # cProfile capture of this run, see /config/profiling
+    profile_summary: Optional[str] = None
+    peak_rss: Optional[int] = None  # bytes, peak of the service process over the cycle
+    traced_peak: Optional[int] = None  # bytes, tracemalloc only
+    memory_top: Optional[str] = None  # top allocation sites, one per line
+    trace_path: Optional[str] = None  # Chrome trace-event file of the cycle
+    tables: List[SyncRunTableModel] = []
+
+class SyncHistoryPage(BaseModel):
+    runs: List[SyncRunModel] = []
+    next_cursor: Optional[int] = None  # pass as `before` to get the next (older) page
+    has_more: bool = False
@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import zlib
+from typing import Dict, Iterator, List, NamedTuple, Optional
+from sqlalchemy.orm import Session
+from ..database.models import ChangeSet, SyncRun, SyncRunTable
+from .model import SyncHistoryPage, SyncRunModel, SyncRunTableModel
+
+
+class ChangePage(NamedTuple):
+    payloads: List[bytes]  # one gzip member per change set
+    last_seq: int
+    has_more: bool
+
+
+def get_change_page(site: str, after: int, limit: int, db: Session) -> ChangePage:
+    """Change sets of a site with seq > after, oldest first, at most `limit` of them."""
+    rows = (
+        db.query(ChangeSet.seq, ChangeSet.payload)
+        .filter(ChangeSet.site == site, ChangeSet.seq > after)
+        .order_by(ChangeSet.seq)
+        .limit(limit + 1)
+        .all()
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return ChangePage(
+        payloads=[row.payload for row in rows],
+        last_seq=rows[-1].seq if rows else after,
+        has_more=has_more
+    )
+
+
+def build_etag(site: str, after: int, page: ChangePage) -> str:
+    # Change sets are immutable, so the cursor range fully identifies the body
+    digest = hashlib.sha1(f"{site}|{after}|{page.last_seq}|{len(page.payloads)}".encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def stream_payloads(page: ChangePage, compressed: bool) -> Iterator[bytes]:
+    """
+    Yields the NDJSON lines of the page, as one gzip stream when the client accepts gzip.
+
+    The stored members are recompressed rather than sent back to back: HTTP clients
+    decode Content-Encoding: gzip as a single member and would drop the others.
+    """
+    encoder = zlib.compressobj(wbits=31) if compressed else None
+    for payload in page.payloads:
+        lines = gzip.decompress(payload)
+        if encoder is None:
+            yield lines
+        else:
+            chunk = encoder.compress(lines)
+            if chunk:
+                yield chunk
+    if encoder is not None:
+        yield encoder.flush()
+
+
+def get_run_history(
+    db: Session,
+    before: Optional[int] = None,
+    limit: int = 50,
+    site: Optional[str] = None,
+    table: Optional[str] = None,
+    kind: Optional[str] = None
+) -> SyncHistoryPage:
+    """
+    Newest runs first, keyset-paginated on the run id.
+    With a site or table filter, only runs touching it are returned, with only the matching tables.
+    """
+    table_filters = []
+    if site:
+        table_filters.append(SyncRunTable.site == site)
+    if table:
+        table_filters.append(SyncRunTable.table_name == table.upper())
+
+    query = db.query(SyncRun)
+    if before is not None:
+        query = query.filter(SyncRun.id < before)
+    if kind:
+        query = query.filter(SyncRun.kind == kind)
+    if table_filters:
+        query = query.filter(
+            db.query(SyncRunTable.id)
+            .filter(SyncRunTable.run_id == SyncRun.id, *table_filters)
+            .exists()
+        )
+
+    runs = query.order_by(SyncRun.id.desc()).limit(limit + 1).all()
+    has_more = len(runs) > limit
+    runs = runs[:limit]
+
+    tables_by_run: Dict[int, List[SyncRunTableModel]] = {}
+    if runs:
+        rows = (
+            db.query(SyncRunTable)
+            .filter(SyncRunTable.run_id.in_([run.id for run in runs]), *table_filters)
+            .order_by(SyncRunTable.run_id, SyncRunTable.id)
+            .all()
+        )
+        for row in rows:
+            tables_by_run.setdefault(row.run_id, []).append(SyncRunTableModel(
+                table_name=row.table_name,
+                site=row.site or "",
+                rows=row.rows,
+                bytes=row.bytes,
+                duration=row.duration,
+                error=row.error,
+                delivery_status=row.delivery_status
+            ))
+
+    return SyncHistoryPage(
+        runs=[
+            SyncRunModel(
+                id=run.id,
+                kind=run.kind,
+                started_at=run.started_at,
+                finished_at=run.finished_at,
+                duration=run.duration,
+                status=run.status,
+                changed_rows=run.changed_rows,
+                bytes=run.bytes,
+                table_errors=run.table_errors,
+                error=run.error,
+                profile_path=run.profile_path,
+                profile_summary=run.profile_summary,
+                peak_rss=run.peak_rss,
+                traced_peak=run.traced_peak,
+                memory_top=run.memory_top,
+                trace_path=run.trace_path,
+                tables=tables_by_run.get(run.id, [])
+            )
+            for run in runs
+        ],
+        next_cursor=runs[-1].id if has_more else None,
+        has_more=has_more
+    )
@@ -1,7 +1,7 @@
 import pyodbc
+import re
 import sqlite3
 import time
-import zipfile
 import os
 import smtplib
 from email.mime.multipart import MIMEMultipart
@@ -10,20 +10,16 @@ from email import encoders
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
-from decimal import Decimal
 import logging
+from .converters import sqlite_plan
+from .snapshots import create_snapshot
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s - %(name)s - %(funcName)s - %(lineno)d - %(threadName)s',
-    handlers=[
-        logging.FileHandler('fastapi.log')
-    ]
-)
 logger = logging.getLogger(__name__)
 
 LOCAL_DB_PATH = r"C:\poswaza\temp\db"
 ZIP_FOLDER = r"C:\poswaza\temp\zip"
+# Rows fetched from SQL Server and upserted locally per batch
+FETCH_BATCH_SIZE = 5000
 
 class DatabaseSync:
     def __init__(
@@ -31,7 +27,9 @@ class DatabaseSync:
         sql_server_config: Dict[str, str], 
         local_db_path: str = rf"{LOCAL_DB_PATH}\local_data.db",
         zip_folder: str = ZIP_FOLDER,
-        email_config: Optional[Dict[str, str]] = None
+        email_config: Optional[Dict[str, str]] = None,
+        keep_snapshots: int = 5,
+        incremental_backups: bool = False
     ):
         """
         Initialize the sync manager.
@@ -40,16 +38,25 @@ class DatabaseSync:
         :param local_db_path: Path to the local SQLite database
         :param zip_folder: Folder where the zipped database will be saved
         :param email_config: Optional email configuration for sending the zip file
+        :param keep_snapshots: Number of zipped (base) snapshots kept in zip_folder
+        :param incremental_backups: Zip and email only the database pages changed since
+                                    the previous snapshot (see snapshots.restore_snapshot)
         """
         self.sql_config = sql_server_config
         self.local_db_path = local_db_path
         self.zip_folder = zip_folder
         self.email_config = email_config
+        self.keep_snapshots = keep_snapshots
+        self.incremental_backups = incremental_backups
         
         # Create zip folder if it doesn't exist
         Path(self.zip_folder).mkdir(parents=True, exist_ok=True)
 
         os.makedirs(LOCAL_DB_PATH, exist_ok=True)
+
+        self._local_conn: Optional[sqlite3.Connection] = None
+        # {(schema, table): column names or None}, see _table_columns
+        self._table_columns_cache: Dict[tuple, Optional[List[str]]] = {}
         
         # Initialize local tracking table
         self._init_local_db()
@@ -86,7 +93,8 @@ class DatabaseSync:
                     f"Trusted_Connection=yes"
                 )
         
-        logger.info(f"[*] Connecting with: {conn_str}")
+        masked_conn = re.sub(r"PWD=[^;]*", "PWD=***", conn_str)
+        logger.info(f"[*] Connecting with: {masked_conn}")
         return pyodbc.connect(conn_str)
 
     def _get_local_connection(self):
@@ -95,6 +103,18 @@ class DatabaseSync:
         conn.row_factory = sqlite3.Row
         return conn
 
+    def _local_connection(self):
+        """The local connection reused by the sync, opened on first use. See `close()`."""
+        if self._local_conn is None:
+            self._local_conn = self._get_local_connection()
+        return self._local_conn
+
+    def close(self):
+        """Closes the reused local connection (done at the end of every `run_sync`)."""
+        if self._local_conn is not None:
+            self._local_conn.close()
+            self._local_conn = None
+
     def _init_local_db(self):
         """Creates necessary metadata tables in local DB if they don't exist."""
         with self._get_local_connection() as conn:
@@ -106,27 +126,31 @@ class DatabaseSync:
                 )
             """)
             conn.commit()
+        conn.close()
 
     def get_last_sync_time(self, table_name: str) -> datetime:
         """Retrieves the last successful sync timestamp for a table."""
-        with self._get_local_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT last_sync_timestamp FROM sync_state WHERE table_name = ?", (table_name,))
-            row = cursor.fetchone()
-            
-            if row and row['last_sync_timestamp']:
-                return datetime.fromisoformat(row['last_sync_timestamp'])
-            
-            return datetime.min
+        cursor = self._local_connection().cursor()
+        cursor.execute("SELECT last_sync_timestamp FROM sync_state WHERE table_name = ?", (table_name,))
+        row = cursor.fetchone()
+        
+        if row and row['last_sync_timestamp']:
+            return datetime.fromisoformat(row['last_sync_timestamp'])
+        
+        return datetime.min
 
-    def update_sync_time(self, table_name: str, sync_time: datetime):
-        """Updates the last sync timestamp."""
-        with self._get_local_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                INSERT OR REPLACE INTO sync_state (table_name, last_sync_timestamp)
-                VALUES (?, ?)
-            """, (table_name, sync_time.isoformat()))
+    def update_sync_time(self, table_name: str, sync_time: datetime, commit: bool = True):
+        """
+        Updates the last sync timestamp.
+
+        :param commit: False to leave it in the caller's transaction
+        """
+        conn = self._local_connection()
+        conn.execute("""
+            INSERT OR REPLACE INTO sync_state (table_name, last_sync_timestamp)
+            VALUES (?, ?)
+        """, (table_name, sync_time.isoformat()))
+        if commit:
             conn.commit()
 
     def ensure_local_table_exists(self, table_name: str, columns: List[tuple], pk_column: str):
@@ -160,12 +184,60 @@ class DatabaseSync:
 
         create_sql = f'CREATE TABLE IF NOT EXISTS "{table_name}" ({", ".join(col_defs)}, PRIMARY KEY ("{pk_column}"))'
         
-        with self._get_local_connection() as conn:
-            conn.execute(create_sql)
+        conn = self._local_connection()
+        conn.execute(create_sql)
+        conn.commit()
+
+    def _table_columns(self, sql_cursor, table_name: str, pk_column: str, schema: str) -> Optional[List[str]]:
+        """
+        Source column names of a table, with its local table created.
+
+        Looked up once per run (the cache is reset by `run_sync`).
+        Returns None if the table does not exist in SQL Server.
+        """
+        key = (schema, table_name)
+        if key in self._table_columns_cache:
+            return self._table_columns_cache[key]
+
+        sql_cursor.execute(f"""
+            SELECT COLUMN_NAME, DATA_TYPE 
+            FROM INFORMATION_SCHEMA.COLUMNS 
+            WHERE TABLE_NAME = ? AND TABLE_SCHEMA = ?
+            ORDER BY ORDINAL_POSITION
+        """, (table_name, schema))
+        columns = [(row.COLUMN_NAME, row.DATA_TYPE) for row in sql_cursor.fetchall()]
+        
+        if not columns:
+            logger.info(f"    Warning: No columns found for {schema}.{table_name}, trying without schema filter...")
+            sql_cursor.execute(f"""
+                SELECT DISTINCT COLUMN_NAME, DATA_TYPE 
+                FROM INFORMATION_SCHEMA.COLUMNS 
+                WHERE TABLE_NAME = ?
+                ORDER BY COLUMN_NAME
+            """, (table_name,))
+            columns = [(row.COLUMN_NAME, row.DATA_TYPE) for row in sql_cursor.fetchall()]
+
+        unique_col_names = None
+        if columns:
+            self.ensure_local_table_exists(table_name, columns, pk_column)
+            unique_col_names = list(dict.fromkeys(column[0] for column in columns))
+
+        self._table_columns_cache[key] = unique_col_names
+        return unique_col_names
 
     def sync_table(self, table_name: str, pk_column: str, timestamp_column: str, schema: str = "dbo") -> bool:
         """
         Synchronizes a specific table from SQL Server to Local DB.
+
+        The changed rows are streamed with fetchmany() and upserted in batches;
+        the new watermark is the source's MAX(timestamp_column), read first and
+        used as the upper bound of the fetch, so rows changed meanwhile are left
+        for the next run. Rows and watermark are committed together.
+
+        The MAX and the fetch are two statements at the connection's default
+        isolation, not one snapshot: the `<= watermark` bound keeps the fetch and
+        the watermark consistent with each other, but a transaction still open
+        during the MAX that commits rows stamped at or below it is not seen.
         
         :param table_name: Name of the table to sync
         :param pk_column: Primary key column name (for upserts)
@@ -180,123 +252,78 @@ class DatabaseSync:
 
         try:
             sql_conn = self._get_sql_connection()
-            sql_cursor = sql_conn.cursor()
+            try:
+                sql_cursor = sql_conn.cursor()
 
-            sql_cursor.execute(f"""
-                SELECT COLUMN_NAME, DATA_TYPE 
-                FROM INFORMATION_SCHEMA.COLUMNS 
-                WHERE TABLE_NAME = ? AND TABLE_SCHEMA = ?
-                ORDER BY ORDINAL_POSITION
-            """, (table_name, schema))
-            columns = [(row.COLUMN_NAME, row.DATA_TYPE) for row in sql_cursor.fetchall()]
-            
-            if not columns:
-                logger.info(f"    Warning: No columns found for {schema}.{table_name}, trying without schema filter...")
-                sql_cursor.execute(f"""
-                    SELECT DISTINCT COLUMN_NAME, DATA_TYPE 
-                    FROM INFORMATION_SCHEMA.COLUMNS 
-                    WHERE TABLE_NAME = ?
-                    ORDER BY COLUMN_NAME
-                """, (table_name,))
-                columns = [(row.COLUMN_NAME, row.DATA_TYPE) for row in sql_cursor.fetchall()]
-                
-                if not columns:
+                unique_col_names = self._table_columns(sql_cursor, table_name, pk_column, schema)
+                if not unique_col_names:
                     logger.info(f"    Error: Table {table_name} not found in SQL Server.")
                     return False
 
-            self.ensure_local_table_exists(table_name, columns, pk_column)
-            
-            seen = set()
-            unique_col_names = []
-            for c in columns:
-                if c[0] not in seen:
-                    seen.add(c[0])
-                    unique_col_names.append(c[0])
-            
-            placeholders = ','.join(['?' for _ in unique_col_names])
-            cols_str = ','.join([f'"{c}"' for c in unique_col_names])
-
-            query = f'SELECT {cols_str} FROM "{schema}"."{table_name}" WHERE "{timestamp_column}" > ?'
-            sql_cursor.execute(query, last_sync)
-            
-            rows = sql_cursor.fetchall()
-            
-            if not rows:
-                logger.info("    No new changes found.")
-                sql_conn.close()
-                return False
-
-            logger.info(f"    Found {len(rows)} records to update.")
+                source_table = f'"{schema}"."{table_name}"'
+                sql_cursor.execute(
+                    f'SELECT MAX("{timestamp_column}") FROM {source_table} WHERE "{timestamp_column}" > ?', last_sync
+                )
+                new_max_date = sql_cursor.fetchone()[0]
+                if new_max_date is None:
+                    logger.info("    No new changes found.")
+                    return False
+                if isinstance(new_max_date, str):
+                    new_max_date = datetime.fromisoformat(new_max_date)
 
-            local_conn = self._get_local_connection()
-            local_cursor = local_conn.cursor()
-            
-            new_max_date = last_sync
+                placeholders = ','.join(['?' for _ in unique_col_names])
+                cols_str = ','.join([f'"{c}"' for c in unique_col_names])
 
-            local_cursor.execute("BEGIN TRANSACTION")
-            try:
-                for row in rows:
-                    values = self._convert_row_for_sqlite(tuple(row))
-                    
-                    upsert_sql = f"""
-                        INSERT OR REPLACE INTO "{table_name}" ({cols_str})
-                        VALUES ({placeholders})
-                    """
-                    local_cursor.execute(upsert_sql, values)
-                    
-                    # Find the index of timestamp column
-                    try:
-                        ts_index = unique_col_names.index(timestamp_column)
-                        row_date = values[ts_index]
-                    except (ValueError, IndexError):
-                        row_date = getattr(row, timestamp_column, None)
-                    
-                    if row_date:
-                        if isinstance(row_date, str):
-                            try:
-                                row_date = datetime.fromisoformat(row_date)
-                            except ValueError:
-                                pass
-                                
-                        if isinstance(row_date, datetime) and row_date > new_max_date:
-                            new_max_date = row_date
-
-                local_conn.commit()
-                
-                self.update_sync_time(table_name, new_max_date)
-                logger.info(f"    Successfully synced. New watermark: {new_max_date}")
-                
-            except Exception as e:
-                local_conn.rollback()
-                logger.info(f"    Error writing to local DB: {e}")
-                raise
+                query = (
+                    f'SELECT {cols_str} FROM {source_table} '
+                    f'WHERE "{timestamp_column}" > ? AND "{timestamp_column}" <= ?'
+                )
+                sql_cursor.execute(query, last_sync, new_max_date)
+                plan = sqlite_plan(sql_cursor.description)
+
+                upsert_sql = f'INSERT OR REPLACE INTO "{table_name}" ({cols_str}) VALUES ({placeholders})'
+                local_conn = self._local_connection()
+                local_cursor = local_conn.cursor()
+                count = 0
+
+                local_cursor.execute("BEGIN TRANSACTION")
+                try:
+                    while True:
+                        rows = sql_cursor.fetchmany(FETCH_BATCH_SIZE)
+                        if not rows:
+                            break
+                        local_cursor.executemany(upsert_sql, map(plan.convert, rows))
+                        count += len(rows)
+
+                    self.update_sync_time(table_name, new_max_date, commit=False)
+                    local_conn.commit()
+                except Exception as e:
+                    local_conn.rollback()
+                    logger.info(f"    Error writing to local DB: {e}")
+                    raise
+
+                logger.info(f"    Synced {count} records. New watermark: {new_max_date}")
+                return count > 0
             finally:
-                local_conn.close()
-
-            sql_conn.close()
-            
-            return True
+                sql_conn.close()
 
         except Exception as e:
             logger.info(f"    Sync failed: {e}")
             return False
 
     def create_zip(self) -> str:
-        """Creates a zip file of the SQLite database and removes any old zip files."""
+        """
+        Snapshots the SQLite database into a new zip with the online backup API,
+        keeping the newest `keep_snapshots` zips. In incremental mode the zip only
+        holds the pages changed since the previous one.
+        """
         logger.info(f"[*] Creating zip archive of {self.local_db_path}...")
         
-        for file in Path(self.zip_folder).glob("*.zip"):
-            file.unlink()
-            logger.info(f"    Removed old zip: {file}")
+        zip_path = create_snapshot(
+            self.local_db_path, self.zip_folder, keep=self.keep_snapshots, incremental=self.incremental_backups
+        )
         
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        zip_filename = f"database_backup_{timestamp}.zip"
-        zip_path = os.path.join(self.zip_folder, zip_filename)
-        
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            zipf.write(self.local_db_path, arcname=os.path.basename(self.local_db_path))
-        
-        logger.info(f"    Created zip: {zip_path}")
+        logger.info(f"    Created zip: {zip_path} ({os.path.getsize(zip_path)} bytes)")
         return zip_path
 
     def send_email(self, zip_path: str):
@@ -346,16 +373,28 @@ class DatabaseSync:
         logger.info("="*50)
         
         changes_detected = False
+        # Source schemas are looked up again on every run
+        self._table_columns_cache = {}
         
-        for table_info in tables_to_sync:
-            if len(table_info) == 4:
-                table, pk, time_col, schema = table_info
-            else:
-                table, pk, time_col = table_info
-                schema = "dbo"  # Default schema
-            
-            if self.sync_table(table, pk, time_col, schema):
-                changes_detected = True
+        synced = set()
+        try:
+            for table_info in tables_to_sync:
+                if len(table_info) == 4:
+                    table, pk, time_col, schema = table_info
+                else:
+                    table, pk, time_col = table_info
+                    schema = "dbo"  # Default schema
+
+                # A table listed twice is synced once
+                if (schema, table) in synced:
+                    logger.info(f"    Skipping duplicate entry for {schema}.{table}")
+                    continue
+                synced.add((schema, table))
+                
+                if self.sync_table(table, pk, time_col, schema):
+                    changes_detected = True
+        finally:
+            self.close()
         
         if changes_detected:
             logger.info("\n[*] Changes detected! Creating backup and sending email...")
@@ -364,36 +403,6 @@ class DatabaseSync:
         else:
             logger.info("\n[*] No changes detected. Skipping backup.")
 
-    def _convert_value_for_sqlite(self, value):
-        """
-        Convert SQL Server values to SQLite-compatible types.
-        Handles decimal.Decimal, datetime, and other unsupported types.
-        """
-        if value is None:
-            return None
-        elif isinstance(value, Decimal):
-            # Convert Decimal to float for SQLite
-            return float(value)
-        elif isinstance(value, datetime):
-            # Convert datetime to ISO format string
-            return value.isoformat()
-        elif isinstance(value, bytes):
-            # Keep bytes as-is (BLOB)
-            return value
-        elif isinstance(value, (int, float, str)):
-            # These types are natively supported
-            return value
-        else:
-            # Convert any other type to string
-            return str(value)
-
-    def _convert_row_for_sqlite(self, row):
-        """
-        Convert an entire row tuple to SQLite-compatible values.
-        """
-        return tuple(self._convert_value_for_sqlite(val) for val in row)
-
-
 
 # Example Usage
 if __name__ == "__main__":
@@ -444,10 +453,8 @@ if __name__ == "__main__":
         ("TABMODELIV", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("STOCK", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("FACILITY", "AUUID_0", "UPDDATTIM_0", "SEED"),
-        ("SORDER", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("BPCARRIER", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("COMPANY", "AUUID_0", "UPDDATTIM_0", "SEED"),
-        ("BPDLVCUST", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("TABSOHTYP", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("TABVACBPR", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("SVCRVAT", "AUUID_0", "UPDDATTIM_0", "SEED"),
@@ -460,11 +467,9 @@ if __name__ == "__main__":
         ("TABVAT", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("BPADDRESS", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("WAREHOUSE", "AUUID_0", "UPDDATTIM_0", "SEED"),
-        ("TABMODELIV", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("TABPAYTERM", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("TABDEPAGIO", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("BPCINVVAT", "AUUID_0", "UPDDATTIM_0", "SEED"),
-        ("TABVAT", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("TABRATVAT", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("TABVACITM", "AUUID_0", "UPDDATTIM_0", "SEED"),
         ("TABVAC", "AUUID_0", "UPDDATTIM_0", "SEED"),
@@ -0,0 +1,117 @@
+# windowsService/bootstrap_pool.py
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+
+class ExtractTable(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+    site_column: Optional[str]  # rows are filtered on it per site when set
+
+
+class SiteJob(NamedTuple):
+    site: str
+    extract_path: str  # source extract shared by all sites, read only
+    sqlite_path: str   # local_data.db of the site
+    tables: Tuple[ExtractTable, ...]
+
+
+class TableResult(NamedTuple):
+    table: str
+    rows: int
+    seconds: float
+    error: Optional[str]
+
+
+def build_site_database(job: SiteJob) -> List[TableResult]:
+    """
+    Builds the local_data.db of one site from the source extract.
+
+    Runs in a worker process (or in process with a single worker): every site
+    has its own SQLite file and writer, so sites do not wait on each other.
+    """
+    conn = sqlite3.connect(job.sqlite_path)
+    results = []
+    try:
+        conn.execute("ATTACH DATABASE ? AS extract", (job.extract_path,))
+        for entry in job.tables:
+            start = time.perf_counter()
+            try:
+                columns_def = ", ".join(f'"{column}" TEXT' for column in entry.columns)
+                conn.execute(f'DROP TABLE IF EXISTS main."{entry.table}"')
+                conn.execute(f'CREATE TABLE main."{entry.table}" ({columns_def})')
+                if entry.site_column:
+                    cursor = conn.execute(
+                        f'INSERT INTO main."{entry.table}" SELECT * FROM extract."{entry.table}" WHERE "{entry.site_column}" = ?',
+                        (job.site,)
+                    )
+                else:
+                    cursor = conn.execute(f'INSERT INTO main."{entry.table}" SELECT * FROM extract."{entry.table}"')
+                results.append(TableResult(entry.table, max(cursor.rowcount, 0), time.perf_counter() - start, None))
+            except sqlite3.Error as e:
+                results.append(TableResult(entry.table, 0, time.perf_counter() - start, str(e)))
+        conn.commit()
+    finally:
+        conn.close()
+    return results
+
+
+def worker_count(configured: int, jobs: int) -> int:
+    """Configured worker count, 0 meaning one per site up to the number of CPUs."""
+    if configured > 0:
+        return min(configured, jobs)
+    return max(1, min(jobs, os.cpu_count() or 1))
+
+
+def _spawn_context():
+    context = multiprocessing.get_context("spawn")
+    # Under the service host sys.executable is pythonservice.exe, which cannot start workers
+    if os.path.basename(sys.executable).lower().startswith("pythonservice"):
+        context.set_executable(os.path.join(sys.exec_prefix, "python.exe"))
+    return context
+
+
+def run_site_jobs(
+    jobs: Sequence[SiteJob],
+    workers: int
+) -> Iterator[Tuple[SiteJob, Optional[List[TableResult]], Optional[BaseException]]]:
+    """
+    Builds the site databases, `workers` at a time, yielding (job, results, error)
+    as each site finishes.
+
+    With one worker (or one site) they are built in this process. If the pool
+    cannot start its processes, the remaining sites are built in this process too.
+    """
+    remaining = list(jobs)
+    if workers > 1 and len(remaining) > 1:
+        finished = []
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=_spawn_context()) as pool:
+                futures = {pool.submit(build_site_database, job): job for job in remaining}
+                for future in as_completed(futures):
+                    job = futures[future]
+                    try:
+                        results = future.result()
+                    except BrokenProcessPool:
+                        continue
+                    except Exception as e:
+                        finished.append(job)
+                        yield job, None, e
+                    else:
+                        finished.append(job)
+                        yield job, results, None
+        except (BrokenProcessPool, OSError):
+            pass
+        remaining = [job for job in remaining if job not in finished]
+
+    for job in remaining:
+        try:
+            yield job, build_site_database(job), None
+        except Exception as e:
+            yield job, None, e
@@ -0,0 +1,142 @@
+# windowsService/bootstrap_progress.py
+import json
+import os
+import sqlite3
+from typing import Any, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+PROGRESS_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS bootstrap_meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE IF NOT EXISTS bootstrap_tables (
+        table_name TEXT PRIMARY KEY,
+        columns TEXT NOT NULL,
+        tracked INTEGER NOT NULL DEFAULT 0,
+        last_key,
+        rows INTEGER NOT NULL DEFAULT 0,
+        done INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE IF NOT EXISTS bootstrap_sites (
+        site TEXT NOT NULL,
+        table_name TEXT NOT NULL,
+        PRIMARY KEY (site, table_name)
+    );
+"""
+
+
+class TableProgress(NamedTuple):
+    table: str
+    columns: Tuple[str, ...]
+    tracked: bool        # tracking columns already updated in SQL Server
+    last_key: Any        # key column of the last row extracted, None before the first chunk
+    rows: int
+    done: bool
+
+
+class BootstrapProgress:
+    """
+    Checkpoints of a bootstrap, kept in the source extract itself.
+
+    Every extracted chunk commits its rows together with the key of its last
+    row, so after a stop or a dropped connection the extract holds exactly
+    what the checkpoints say. The next bootstrap reopens it and:
+
+    - skips the tracking updates and the tables already extracted
+    - reads a partly extracted table from its last key on (keyset, the key
+      column being unique and the query ordered on it)
+    - only builds the (site, table) pairs not built yet
+
+    A different site list invalidates the extract, which is then started
+    over. The extract is removed once a bootstrap completes.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, resumed: bool):
+        self.conn = conn
+        self.resumed = resumed
+
+    @classmethod
+    def open(cls, path: str, sites: Sequence[str]) -> "BootstrapProgress":
+        """Opens the extract at `path`, resuming it if it was left by a bootstrap of the same sites."""
+        signature = json.dumps(sorted(sites))
+        if os.path.exists(path):
+            conn = cls._connect(path)
+            try:
+                row = conn.execute("SELECT value FROM bootstrap_meta WHERE key = 'sites'").fetchone()
+            except sqlite3.DatabaseError:
+                row = None
+            if row is not None and row[0] == signature:
+                return cls(conn, resumed=True)
+            conn.close()
+            cls.remove(path)
+
+        conn = cls._connect(path)
+        conn.executescript(PROGRESS_SCHEMA)
+        conn.execute("INSERT OR REPLACE INTO bootstrap_meta (key, value) VALUES ('sites', ?)", (signature,))
+        conn.commit()
+        return cls(conn, resumed=False)
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        # Chunks are written from the extract stage thread, one thread at a time.
+        # WAL lets the site workers read the extract while builds are checkpointed.
+        conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    @staticmethod
+    def remove(path: str):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    def close(self):
+        self.conn.close()
+
+    def table(self, table: str) -> Optional[TableProgress]:
+        row = self.conn.execute(
+            "SELECT table_name, columns, tracked, last_key, rows, done FROM bootstrap_tables WHERE table_name = ?",
+            (table,)
+        ).fetchone()
+        if row is None:
+            return None
+        name, columns, tracked, last_key, rows, done = row
+        return TableProgress(name, tuple(json.loads(columns)), bool(tracked), last_key, rows, bool(done))
+
+    def done_tables(self) -> List[str]:
+        return [row[0] for row in self.conn.execute("SELECT table_name FROM bootstrap_tables WHERE done = 1")]
+
+    def mark_tracked(self, table: str):
+        self.conn.execute(
+            "INSERT INTO bootstrap_tables (table_name, columns, tracked) VALUES (?, '[]', 1) "
+            "ON CONFLICT (table_name) DO UPDATE SET tracked = 1",
+            (table,)
+        )
+        self.conn.commit()
+
+    def start_table(self, table: str, columns: Sequence[str]):
+        """(Re)starts the extraction of a table from its first row. Not committed."""
+        self.conn.execute(
+            "INSERT INTO bootstrap_tables (table_name, columns) VALUES (?, ?) "
+            "ON CONFLICT (table_name) DO UPDATE SET columns = excluded.columns, last_key = NULL, rows = 0, done = 0",
+            (table, json.dumps(list(columns)))
+        )
+
+    def advance(self, table: str, rows: int, last_key: Any = None):
+        """Counts an extracted chunk. Not committed: the caller commits it with the chunk."""
+        self.conn.execute(
+            "UPDATE bootstrap_tables SET rows = rows + ?, last_key = ? WHERE table_name = ?",
+            (rows, last_key, table)
+        )
+
+    def finish_table(self, table: str):
+        self.conn.execute("UPDATE bootstrap_tables SET done = 1 WHERE table_name = ?", (table,))
+        self.conn.commit()
+
+    def site_tables(self, site: str) -> Set[str]:
+        """Tables already built in the database of a site."""
+        return {row[0] for row in self.conn.execute("SELECT table_name FROM bootstrap_sites WHERE site = ?", (site,))}
+
+    def mark_site_table(self, site: str, table: str):
+        self.conn.execute("INSERT OR IGNORE INTO bootstrap_sites (site, table_name) VALUES (?, ?)", (site, table))
+        self.conn.commit()
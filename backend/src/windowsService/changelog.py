@@ -0,0 +1,100 @@
+# windowsService/changelog.py
+import gzip
+import json
+import sqlite3
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+
+class ChangeLog:
+    """
+    Sequence-numbered log of the change sets shipped to each site.
+
+    Lives in config.db (table `sync_changelog`, declared on the API side as
+    `ChangeSet`) so the FastAPI backend can serve `/sync/{site}/changes?after=<seq>`
+    to POS clients that pull their deltas instead of waiting for an email.
+
+    Each entry stores its payload as one gzip member holding a single JSON line,
+    which lets the API stream several entries back to back without recompressing.
+    """
+
+    def __init__(self, db_path: str, keep_per_site: int = 1000):
+        """
+        :param db_path: Path to config.db
+        :param keep_per_site: Number of change sets kept per site, older ones are pruned
+        """
+        self.db_path = db_path
+        self.keep_per_site = keep_per_site
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_changelog (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    site VARCHAR NOT NULL,
+                    created_at VARCHAR NOT NULL,
+                    tables VARCHAR,
+                    row_count INTEGER,
+                    payload BLOB NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sync_changelog_site ON sync_changelog (site)")
+        conn.close()
+
+    def record(self, site: str, changes_dict: Dict[str, Tuple[List[str], list]]) -> int:
+        """
+        Appends a shipped change set for a site.
+
+        :param site: Site code
+        :param changes_dict: {table: (columns, rows)} with values already rendered as text
+        :return: Sequence number of the new entry
+        """
+        created_at = datetime.now().isoformat()
+        table_counts = {table: len(rows) for table, (_, rows) in changes_dict.items()}
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM sync_changelog")
+            seq = cursor.fetchone()[0]
+
+            document = {
+                'seq': seq,
+                'site': site,
+                'created_at': created_at,
+                'tables': {
+                    table: {
+                        'columns': list(columns),
+                        'rows': [[str(x) if x is not None else None for x in row] for row in rows]
+                    }
+                    for table, (columns, rows) in changes_dict.items()
+                },
+            }
+            payload = gzip.compress((json.dumps(document) + "\n").encode('utf-8'))
+
+            cursor.execute("""
+                INSERT INTO sync_changelog (seq, site, created_at, tables, row_count, payload)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (seq, site, created_at, json.dumps(table_counts), sum(table_counts.values()), payload))
+
+            # Keep the newest entries only; a client further behind has to re-bootstrap
+            cursor.execute("""
+                DELETE FROM sync_changelog
+                WHERE site = ? AND seq <= (
+                    SELECT seq FROM sync_changelog WHERE site = ?
+                    ORDER BY seq DESC LIMIT 1 OFFSET ?
+                )
+            """, (site, site, self.keep_per_site))
+
+            conn.commit()
+            return seq
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
@@ -0,0 +1,166 @@
+# windowsService/config_snapshot.py
+import sqlite3
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from table_schedule import SCHEDULE_QUERY
+
+
+class ConfigSnapshot(NamedTuple):
+    """Everything the service reads from config.db, taken in one read transaction."""
+    sql_config: Optional[Dict[str, Any]]
+    email_config: Optional[Dict[str, Any]]
+    site_emails: Dict[str, str]
+    site_transports: Dict[str, str]
+    delivery_folder: Optional[str]
+    table_schedules: List[tuple]
+    profiling: Optional[Dict[str, Any]]  # profiling_config row, see profiling.CycleProfiler
+    memory: Optional[Dict[str, Any]]  # tracemalloc settings of the same row, see memory.MemoryTracker
+    tracing: Optional[Dict[str, Any]]  # span trace settings of the same row, see tracing.SpanTracer
+    error: Optional[str]  # why no syncer can be built from this configuration
+
+
+class ConfigSnapshotLoader:
+    """
+    Caches the configuration written by the FastAPI backend in config.db.
+
+    The API bumps `config_version.version` whenever it saves configuration, and
+    SQLite's `PRAGMA data_version` tells whether any other connection wrote to the
+    file at all. As long as neither moved, `load()` returns the cached snapshot
+    without querying the configuration tables again.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.conn: Optional[sqlite3.Connection] = None
+        self.snapshot: Optional[ConfigSnapshot] = None
+        self.data_version: Optional[int] = None
+        self.config_version: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # data_version only moves for writes made by *other* connections, so keep ours open
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        return self.conn
+
+    def _read_config_version(self, cursor) -> Optional[int]:
+        try:
+            cursor.execute("SELECT version FROM config_version WHERE id = 1")
+            row = cursor.fetchone()
+            return row[0] if row else None
+        except sqlite3.OperationalError:
+            # Older API without the version counter
+            return None
+
+    def load(self) -> Tuple[ConfigSnapshot, bool]:
+        """
+        Returns the current configuration.
+
+        :return: (snapshot, changed) where changed is True when the snapshot differs
+                 from the one returned by the previous call
+        """
+        conn = self._connection()
+        cursor = conn.cursor()
+
+        data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+        if self.snapshot is not None and data_version == self.data_version:
+            return self.snapshot, False
+
+        cursor.execute("BEGIN")
+        try:
+            config_version = self._read_config_version(cursor)
+            if self.snapshot is not None and config_version is not None and config_version == self.config_version:
+                # Something else wrote to config.db (change log, run history), not the configuration
+                self.data_version = data_version
+                return self.snapshot, False
+
+            snapshot = self._read_snapshot(cursor)
+        finally:
+            conn.commit()
+
+        changed = snapshot != self.snapshot
+        self.snapshot = snapshot
+        self.data_version = data_version
+        self.config_version = config_version
+        return snapshot, changed
+
+    def _fetch(self, cursor, query: str, many: bool = False):
+        try:
+            cursor.execute(query)
+            return cursor.fetchall() if many else cursor.fetchone()
+        except sqlite3.OperationalError:
+            # Table not created yet by the API
+            return [] if many else None
+
+    def _read_snapshot(self, cursor) -> ConfigSnapshot:
+        config_rows = self._fetch(cursor, "SELECT * FROM database_configuration")
+        folder_rows = self._fetch(cursor, "SELECT * FROM configurations_folders")
+        email_rows = self._fetch(cursor, "SELECT * FROM email_configs")
+        site_configs = self._fetch(cursor, "SELECT * FROM site_configs", many=True)
+        table_schedules = self._fetch(cursor, SCHEDULE_QUERY, many=True)
+        profiling_rows = self._fetch(
+            cursor, "SELECT enabled, target, cycles, keep_files, top_n FROM profiling_config WHERE id = 1"
+        )
+        memory_rows = self._fetch(
+            cursor, "SELECT trace_memory, memory_top_n, memory_frames FROM profiling_config WHERE id = 1"
+        )
+        tracing_rows = self._fetch(cursor, "SELECT trace_spans, keep_files FROM profiling_config WHERE id = 1")
+
+        error = None
+        sql_config = None
+        if not config_rows:
+            error = "No database configuration found in config.db. Please configure the database in the app."
+        else:
+            # row[1]=dsn, row[3]=host, row[4]=port, row[5]=database, row[6]=schema, row[7]=user, row[8]=pass
+            dsn = config_rows[1]
+            host = config_rows[3]
+            port = config_rows[4]
+            if not dsn and not host:
+                error = "Invalid database configuration: Both DSN and Host are missing. Please check your settings."
+            sql_config = {
+                'username': config_rows[7],
+                'password': config_rows[8],
+                'server': f"{host},{port}" if host and port else host,
+                'database': config_rows[5],
+                'driver': 'ODBC Driver 17 for SQL Server',
+                'dsn': dsn,
+                'schema': config_rows[6]
+            }
+
+        email_config = None
+        if email_rows:
+            email_config = {
+                'smtp_server': email_rows[1],
+                'smtp_port': email_rows[4],
+                'smtp_username': email_rows[2],
+                'smtp_password': email_rows[3],
+                'from_email': email_rows[2],
+                'to_email': email_rows[5],
+                'subject': 'Database Sync Update'
+            }
+
+        site_emails = {}
+        site_transports = {}
+        for site_config in site_configs:
+            # row[1] = site, row[2] = email
+            site_emails[site_config[1]] = site_config[2]
+            # row[3] = transport ('email', 'folder' or 'pull'), absent on older config.db files
+            site_transports[site_config[1]] = site_config[3] if len(site_config) > 3 and site_config[3] else "email"
+
+        return ConfigSnapshot(
+            sql_config=sql_config,
+            email_config=email_config,
+            site_emails=site_emails,
+            site_transports=site_transports,
+            # row[2] = destination
+            delivery_folder=folder_rows[2] if folder_rows else None,
+            table_schedules=table_schedules,
+            profiling=dict(zip(("enabled", "target", "cycles", "keep_files", "top_n"), profiling_rows)) if profiling_rows else None,
+            memory=dict(zip(("trace_memory", "memory_top_n", "memory_frames"), memory_rows)) if memory_rows else None,
+            tracing=dict(zip(("trace_spans", "keep_files"), tracing_rows)) if tracing_rows else None,
+            error=error,
+        )
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,91 @@
+# windowsService/converters.py
+import datetime
+import decimal
+from typing import Callable, Iterable, List, Optional, Sequence
+
+# Types SQLite stores as they are
+_SQLITE_NATIVE = (str, int, float, bool)
+
+
+def _sqlite_value(value):
+    """Generic conversion, for columns whose driver type is unknown."""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, (bytes, int, float, str)):
+        return value
+    return str(value)
+
+
+def _datetime_value(value):
+    return value.isoformat()
+
+
+class ConverterPlan:
+    """
+    Per-column value conversion of a result set, built once per query.
+
+    Instead of an isinstance chain on every value, each column gets the
+    converter its driver type needs (None when values pass through as they are)
+    and `convert()` only touches those columns:
+
+        plan = sqlite_plan(cursor.description)
+        cursor.executemany(insert_sql, map(plan.convert, rows))
+    """
+
+    def __init__(self, converters: Sequence[Optional[Callable]], null=None):
+        """
+        :param converters: One converter per column, None for a passthrough column
+        :param null: What NULLs become ('' for CSV), None keeps them
+        """
+        self.width = len(converters)
+        self.null = null
+        if null is None:
+            # NULLs stay NULL, passthrough columns are not even looked at
+            self._steps = [(index, convert) for index, convert in enumerate(converters) if convert is not None]
+        else:
+            self._steps = list(enumerate(converters))
+
+    def convert(self, row) -> list:
+        values = list(row)
+        null = self.null
+        for index, convert in self._steps:
+            value = values[index]
+            if value is None:
+                values[index] = null
+            elif convert is not None:
+                values[index] = convert(value)
+        return values
+
+    def convert_rows(self, rows: Iterable) -> List[list]:
+        convert = self.convert
+        return [convert(row) for row in rows]
+
+
+def _type_codes(description) -> List[Optional[type]]:
+    # cursor.description entries are (name, type_code, ...); pyodbc reports Python types
+    return [column[1] if len(column) > 1 else None for column in description]
+
+
+def sqlite_plan(description) -> ConverterPlan:
+    """Plan storing the values natively in SQLite (Decimal as float, datetime as ISO text, rest as text)."""
+    converters: List[Optional[Callable]] = []
+    for type_code in _type_codes(description):
+        if type_code in _SQLITE_NATIVE:
+            converters.append(None)
+        elif type_code is decimal.Decimal:
+            converters.append(float)
+        elif type_code is datetime.datetime:
+            converters.append(_datetime_value)
+        elif type_code in (datetime.date, datetime.time):
+            converters.append(str)
+        else:
+            # bytes/bytearray and unknown types: decided on the value
+            converters.append(_sqlite_value)
+    return ConverterPlan(converters)
+
+
+def text_plan(description, null=None) -> ConverterPlan:
+    """Plan turning every value into its str() (bootstrap tables, pending deltas, CSV)."""
+    return ConverterPlan([None if type_code is str else str for type_code in _type_codes(description)], null=null)
@@ -0,0 +1,69 @@
+# windowsService/delivery.py
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+
+class FolderTransport:
+    """
+    Delivers delta files by dropping them into `destination/<site>/`.
+
+    Files are written under a temporary name and atomically renamed, so a POS
+    watching the folder never picks up a partial file. A `<file>.manifest.json`
+    is published after the data file; consumers should only process files that
+    have a manifest.
+    """
+
+    def __init__(self, destination: str):
+        self.destination = destination
+
+    def site_folder(self, site: str) -> str:
+        folder = os.path.join(self.destination, site)
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    def deliver(self, site: str, file_path: str, changes_dict: Dict[str, Tuple[List[str], list]]) -> str:
+        """
+        Copies a delta file into the site folder and writes its manifest.
+
+        :param site: Site code
+        :param file_path: Delta file to publish
+        :param changes_dict: {table: (columns, rows)} contained in the file
+        :return: Path of the published file
+        """
+        folder = self.site_folder(site)
+        file_name = os.path.basename(file_path)
+        target_path = os.path.join(folder, file_name)
+
+        sha256 = hashlib.sha256()
+        tmp_path = os.path.join(folder, f".{file_name}.tmp")
+        with open(file_path, 'rb') as src, open(tmp_path, 'wb') as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b''):
+                sha256.update(chunk)
+                dst.write(chunk)
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_path, target_path)
+
+        manifest = {
+            'file': file_name,
+            'site': site,
+            'created_at': datetime.now().isoformat(),
+            'size': os.path.getsize(target_path),
+            'sha256': sha256.hexdigest(),
+            'total_records': sum(len(rows) for _, (_, rows) in changes_dict.items()),
+            'tables': {table: len(rows) for table, (_, rows) in changes_dict.items()},
+        }
+        self._write_atomic(os.path.join(folder, f"{file_name}.manifest.json"), json.dumps(manifest, indent=2))
+
+        return target_path
+
+    def _write_atomic(self, path: str, content: str):
+        tmp_path = os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
@@ -0,0 +1,156 @@
+# windowsService/delta_store.py
+import json
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class PendingDeltaStore:
+    """
+    Per-site store of changes that have not been delivered yet.
+
+    Every cycle stages its changed rows here instead of shipping them directly.
+    Rows are coalesced by (site, table, primary key) so a site that stays offline
+    for a while receives one compacted delta containing only the latest version
+    of each changed row, no matter how many cycles it missed.
+    """
+
+    def __init__(self, db_path: str, key_column: str = "AUUID_0"):
+        """
+        :param db_path: Path to the SQLite file holding the pending rows
+        :param key_column: Column used to coalesce rows of the same record
+        """
+        self.db_path = db_path
+        self.key_column = key_column
+        self._init_db()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS pending_rows (
+                    site TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    row_key TEXT NOT NULL,
+                    columns TEXT NOT NULL,
+                    row_values TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    PRIMARY KEY (site, table_name, row_key)
+                )
+            """)
+        conn.close()
+
+    def _row_key(self, columns: Sequence[str], values: List[Optional[str]]) -> str:
+        if self.key_column in columns:
+            key = values[columns.index(self.key_column)]
+            if key is not None:
+                return key
+        # No usable key: only identical rows are coalesced
+        return json.dumps(values)
+
+    def stage(self, site: str, changes: Dict[str, Tuple[List[str], Iterable]]) -> int:
+        """
+        Merges a cycle's changes for a site into the pending set.
+
+        :param site: Site code
+        :param changes: {table: (columns, rows)} as collected by run_sync, rows already
+                        converted to text (see converters.text_plan)
+        :return: Number of rows staged
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM pending_rows")
+            seq = cursor.fetchone()[0]
+
+            staged = 0
+            for table, (columns, rows) in changes.items():
+                columns_json = json.dumps(list(columns))
+                batch = []
+                for row in rows:
+                    values = list(row)
+                    batch.append((site, table, self._row_key(columns, values), columns_json, json.dumps(values), seq))
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO pending_rows (site, table_name, row_key, columns, row_values, seq)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, batch)
+                staged += len(batch)
+
+            conn.commit()
+            return staged
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def load(self, site: str, table_order: Optional[Sequence[str]] = None) -> Tuple[Dict[str, Tuple[List[str], List[list]]], int]:
+        """
+        Returns the compacted pending delta of a site.
+
+        Rows staged under an older column list are projected onto the latest
+        column list of their table (missing columns become empty).
+
+        :param site: Site code
+        :param table_order: Optional preferred table order for the result
+        :return: ({table: (columns, rows)}, highest seq included)
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT table_name, columns, row_values, seq
+                FROM pending_rows
+                WHERE site = ?
+                ORDER BY table_name, row_key
+            """, (site,))
+
+            grouped: Dict[str, list] = {}
+            max_seq = 0
+            for table, columns_json, values_json, seq in cursor:
+                grouped.setdefault(table, []).append((seq, columns_json, values_json))
+                if seq > max_seq:
+                    max_seq = seq
+        finally:
+            conn.close()
+
+        order = list(table_order or [])
+        tables = [t for t in order if t in grouped] + sorted(t for t in grouped if t not in order)
+
+        changes = {}
+        for table in tables:
+            entries = grouped[table]
+            latest_json = max(entries, key=lambda e: e[0])[1]
+            columns = json.loads(latest_json)
+
+            rows = []
+            for _, columns_json, values_json in entries:
+                values = json.loads(values_json)
+                if columns_json != latest_json:
+                    by_name = dict(zip(json.loads(columns_json), values))
+                    values = [by_name.get(col) for col in columns]
+                rows.append(values)
+            changes[table] = (columns, rows)
+
+        return changes, max_seq
+
+    def clear(self, site: str, up_to_seq: int):
+        """
+        Drops the pending rows of a site once they have been delivered.
+        Rows re-staged after the delivered snapshot (higher seq) are kept.
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM pending_rows WHERE site = ? AND seq <= ?", (site, up_to_seq))
+        conn.close()
+
+    def pending_count(self, site: str) -> int:
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT COUNT(*) FROM pending_rows WHERE site = ?", (site,)).fetchone()
+            return row[0]
+        finally:
+            conn.close()
@@ -0,0 +1,124 @@
+# windowsService/log_pipeline.py
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+LOG_FORMATS = ("kv", "json")
+
+# Attributes every LogRecord has, anything else was passed through `extra=`
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+
+def _kv_value(value) -> str:
+    text = str(value)
+    if not text or any(char in text for char in ' "=\n'):
+        return json.dumps(text, ensure_ascii=False)
+    return text
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    One line per record, as key=value pairs or as a JSON object.
+
+    Fields passed with `extra=` (table, site, rows, seconds, ...) are written as
+    their own keys, so the log can be filtered without parsing the message:
+
+        logger.info("Found changed records", extra={"table": table, "site": site, "rows": 12})
+    """
+
+    def __init__(self, fmt: str = "kv"):
+        super().__init__()
+        self.fmt = fmt if fmt in LOG_FORMATS else "kv"
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                fields[key] = value
+        if record.exc_info:
+            fields["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # Already rendered by the queue handler
+            fields["exc"] = record.exc_text
+
+        if self.fmt == "json":
+            return json.dumps(fields, ensure_ascii=False, default=str)
+        return " ".join(f"{key}={_kv_value(value)}" for key, value in fields.items())
+
+
+class _StructuredQueueHandler(QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The default prepare() bakes the formatted text into msg; keep the record
+        # as is (with its extra fields) and only resolve what cannot cross threads safely
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def start_logging(
+    log_folder: str,
+    file_name: str = "service.log",
+    fmt: str = "kv",
+    level: int = logging.INFO,
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+    console: bool = True
+) -> QueueListener:
+    """
+    Routes the root logger through a queue to a background writer thread.
+
+    Logging calls only put the record on an in-memory queue; formatting and the
+    writes to the rotating log file (and stdout) happen on the listener thread.
+    Call `stop_logging()` with the returned listener to flush it on shutdown.
+
+    :param fmt: 'kv' (key=value pairs) or 'json' (one object per line)
+    :param max_bytes: Size at which the file rolls over to file_name.1 ... file_name.<backup_count>
+    """
+    os.makedirs(log_folder, exist_ok=True)
+    formatter = StructuredFormatter(fmt)
+
+    handlers = [RotatingFileHandler(
+        os.path.join(log_folder, file_name), maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
+    )]
+    if console and sys.stdout is not None:
+        handlers.append(logging.StreamHandler(sys.stdout))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: queue.Queue = queue.Queue(-1)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_StructuredQueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging, listener)
+    return listener
+
+
+def stop_logging(listener: Optional[QueueListener]):
+    """Writes out the records still queued and closes the log files."""
+    if listener is None or listener._thread is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
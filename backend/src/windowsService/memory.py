@@ -0,0 +1,161 @@
+# windowsService/memory.py
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+try:
+    import win32api
+    import win32process
+except ImportError:  # not on Windows (benchmarks, tests)
+    win32api = None
+    win32process = None
+
+
+def current_rss() -> Optional[int]:
+    """Resident set size (working set on Windows) of this process in bytes, None if unknown."""
+    if win32process is not None:
+        return win32process.GetProcessMemoryInfo(win32api.GetCurrentProcess())["WorkingSetSize"]
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class CycleMemory:
+    """Memory figures of one sync cycle, filled in once the cycle exits."""
+
+    def __init__(self):
+        self.rss_start: Optional[int] = None
+        self.peak_rss: Optional[int] = None
+        self.traced_peak: Optional[int] = None  # Python allocations above the cycle start, tracemalloc only
+        self.top_allocations: List[str] = []
+
+    def describe(self) -> str:
+        text = f"peak RSS {_mb(self.peak_rss)}"
+        if self.rss_start is not None and self.peak_rss is not None:
+            text += f" (+{_mb(self.peak_rss - self.rss_start)} over the cycle start)"
+        if self.traced_peak is not None:
+            text += f", traced peak {_mb(self.traced_peak)}"
+        return text
+
+
+def _mb(value: Optional[int]) -> str:
+    return "n/a" if value is None else f"{value / (1024 * 1024):.1f} MB"
+
+
+class MemoryTracker:
+    """
+    Memory usage of the sync engine.
+
+    The peak RSS of every cycle is always sampled by a background thread
+    (cheap, one reading every `sample_interval` seconds). tracemalloc is opt-in
+    (`trace_memory` in /config/profiling or WAZAPOS_TRACEMALLOC) since it slows
+    allocations down considerably: when on, `StageMetrics` records the peak
+    allocated by every stage and the cycle keeps the top allocation sites.
+
+    tracemalloc is process wide, so stages running at the same time on other
+    job threads (delivery) add to each other's peaks.
+    """
+
+    def __init__(self, sample_interval: float = 0.1, top_n: int = 10, frames: int = 1):
+        self.sample_interval = sample_interval
+        self.top_n = top_n
+        self.frames = frames
+        self._settings: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+        # [start, peak] of the stages being measured
+        self._open_stages: List[list] = []
+
+    def configure(self, settings: Optional[Dict[str, Any]]):
+        """
+        Turns tracemalloc on or off.
+
+        :param settings: {trace_memory, memory_top_n, memory_frames} or None to turn it off
+        """
+        if settings == self._settings:
+            return
+        self._settings = settings
+
+        settings = settings or {}
+        self.top_n = max(1, int(settings.get("memory_top_n") or self.top_n))
+        self.frames = max(1, int(settings.get("memory_frames") or self.frames))
+        if settings.get("trace_memory"):
+            if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != self.frames:
+                tracemalloc.stop()
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(self.frames)
+        elif tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def stage_begin(self) -> Optional[list]:
+        """Starts measuring the peak of a stage. Returns a mark for `stage_end()`."""
+        if not tracemalloc.is_tracing():
+            return None
+        with self._lock:
+            current, peak = tracemalloc.get_traced_memory()
+            # reset_peak() is process wide: stages still open (enclosing or on other threads) keep what they saw
+            self._fold_peak(peak)
+            mark = [current, current]  # [start, peak]
+            self._open_stages.append(mark)
+            tracemalloc.reset_peak()
+            return mark
+
+    def stage_end(self, mark: Optional[list]) -> int:
+        """Returns the bytes allocated at the peak of the stage, above its start."""
+        if mark is None:
+            return 0
+        with self._lock:
+            if tracemalloc.is_tracing():
+                self._fold_peak(tracemalloc.get_traced_memory()[1])
+            self._open_stages = [other for other in self._open_stages if other is not mark]
+            return max(0, mark[1] - mark[0])
+
+    def _fold_peak(self, peak: int):
+        for mark in self._open_stages:
+            mark[1] = max(mark[1], peak)
+
+    @contextmanager
+    def cycle(self):
+        """
+        Measures the enclosed cycle. The yielded CycleMemory gets the peak RSS
+        and, with tracemalloc on, the traced peak and top allocation sites.
+        """
+        usage = CycleMemory()
+        usage.rss_start = current_rss()
+        usage.peak_rss = usage.rss_start
+
+        stop = threading.Event()
+
+        def sample():
+            while not stop.wait(self.sample_interval):
+                rss = current_rss()
+                if rss is not None and (usage.peak_rss is None or rss > usage.peak_rss):
+                    usage.peak_rss = rss
+
+        sampler = threading.Thread(target=sample, name="rss-sampler", daemon=True)
+        sampler.start()
+
+        before = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        mark = self.stage_begin()
+        try:
+            yield usage
+        finally:
+            stop.set()
+            sampler.join()
+            rss = current_rss()
+            if rss is not None and (usage.peak_rss is None or rss > usage.peak_rss):
+                usage.peak_rss = rss
+
+            if mark is not None:
+                usage.traced_peak = self.stage_end(mark)
+                if tracemalloc.is_tracing() and before is not None:
+                    usage.top_allocations = self._top_allocations(before, tracemalloc.take_snapshot())
+
+    def _top_allocations(self, before, after) -> List[str]:
+        # Growth over the cycle, the tracer's own allocations left out
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+        stats = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+        return [str(stat) for stat in stats[:self.top_n]]
@@ -0,0 +1,148 @@
+# windowsService/metrics.py
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, Tuple
+
+
+class StageSample:
+    """Counters filled in by the code running inside a `StageMetrics.stage()` block."""
+
+    def __init__(self):
+        self.rows = 0
+        self.bytes = 0
+        self.error = False
+        self.mem_peak = 0
+
+
+class StageMetrics:
+    """
+    Per-stage timing metrics of the sync engine.
+
+    Stages (resolve, select, tracking, stage, export, email, folder, changelog,
+    bootstrap, ...) are timed per table and site and accumulated in memory, then
+    added to the `sync_metrics` table of config.db by `flush()`. The FastAPI
+    backend exposes that table as `/metrics` (Prometheus text) and
+    `/metrics/summary`.
+    """
+
+    def __init__(self, db_path: str, memory=None, tracer=None):
+        """
+        :param db_path: Path to config.db
+        :param memory: Optional memory.MemoryTracker, records the traced peak of each stage while tracemalloc is on
+        :param tracer: Optional tracing.SpanTracer, every stage is also a span of the cycle trace
+        """
+        self.db_path = db_path
+        self.memory = memory
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        # (stage, table, site) -> [calls, errors, total_seconds, max_seconds, last_seconds, rows, bytes, mem_peak_bytes]
+        self._pending: Dict[Tuple[str, str, str], list] = {}
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_metrics (
+                    stage VARCHAR NOT NULL,
+                    table_name VARCHAR NOT NULL DEFAULT '',
+                    site VARCHAR NOT NULL DEFAULT '',
+                    calls INTEGER NOT NULL DEFAULT 0,
+                    errors INTEGER NOT NULL DEFAULT 0,
+                    total_seconds FLOAT NOT NULL DEFAULT 0,
+                    max_seconds FLOAT NOT NULL DEFAULT 0,
+                    last_seconds FLOAT NOT NULL DEFAULT 0,
+                    rows INTEGER NOT NULL DEFAULT 0,
+                    bytes INTEGER NOT NULL DEFAULT 0,
+                    mem_peak_bytes INTEGER NOT NULL DEFAULT 0,
+                    updated_at VARCHAR,
+                    PRIMARY KEY (stage, table_name, site)
+                )
+            """)
+            # Column added after the first release of the table
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(sync_metrics)")}
+            if "mem_peak_bytes" not in existing:
+                conn.execute("ALTER TABLE sync_metrics ADD COLUMN mem_peak_bytes INTEGER NOT NULL DEFAULT 0")
+        conn.close()
+
+    def record(
+        self,
+        stage: str,
+        seconds: float,
+        table: str = "",
+        site: str = "",
+        rows: int = 0,
+        bytes: int = 0,
+        error: bool = False,
+        mem_peak: int = 0
+    ):
+        """Adds one timed call of a stage."""
+        key = (stage, table or "", site or "")
+        with self._lock:
+            entry = self._pending.get(key)
+            if entry is None:
+                entry = self._pending[key] = [0, 0, 0.0, 0.0, 0.0, 0, 0, 0]
+            entry[0] += 1
+            entry[1] += 1 if error else 0
+            entry[2] += seconds
+            entry[3] = max(entry[3], seconds)
+            entry[4] = seconds
+            entry[5] += rows
+            entry[6] += bytes
+            entry[7] = max(entry[7], mem_peak)
+
+    @contextmanager
+    def stage(self, stage: str, table: str = "", site: str = ""):
+        """
+        Times the enclosed block. Set `rows`, `bytes` or `error` on the yielded
+        sample to record them; an exception counts as an error and is re-raised.
+        """
+        sample = StageSample()
+        span = self.tracer.span(stage, table=table, site=site) if self.tracer else nullcontext()
+        with span:
+            mark = self.memory.stage_begin() if self.memory else None
+            start = time.perf_counter()
+            try:
+                yield sample
+            except Exception:
+                sample.error = True
+                raise
+            finally:
+                seconds = time.perf_counter() - start
+                if mark is not None:
+                    sample.mem_peak = self.memory.stage_end(mark)
+                self.record(stage, seconds, table, site, sample.rows, sample.bytes, sample.error, sample.mem_peak)
+
+    def flush(self):
+        """Adds the accumulated metrics to config.db. Metrics never fail a cycle."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+
+        now = datetime.now().isoformat(timespec='seconds')
+        try:
+            with self._connect() as conn:
+                conn.executemany("""
+                    INSERT INTO sync_metrics
+                        (stage, table_name, site, calls, errors, total_seconds, max_seconds, last_seconds, rows, bytes, mem_peak_bytes, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (stage, table_name, site) DO UPDATE SET
+                        calls = calls + excluded.calls,
+                        errors = errors + excluded.errors,
+                        total_seconds = total_seconds + excluded.total_seconds,
+                        max_seconds = MAX(max_seconds, excluded.max_seconds),
+                        last_seconds = excluded.last_seconds,
+                        rows = rows + excluded.rows,
+                        bytes = bytes + excluded.bytes,
+                        mem_peak_bytes = MAX(mem_peak_bytes, excluded.mem_peak_bytes),
+                        updated_at = excluded.updated_at
+                """, [(*key, *values, now) for key, values in pending.items()])
+            conn.close()
+        except sqlite3.Error:
+            pass
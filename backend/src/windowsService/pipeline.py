@@ -0,0 +1,91 @@
+# windowsService/pipeline.py
+import queue
+import threading
+from typing import Any, Callable, Optional
+
+_DONE = object()
+
+
+class StageWorker:
+    """
+    One stage of a pipeline: `handle(item)` runs on its own thread for every
+    item the caller `put()`s, through a bounded queue.
+
+    The caller keeps producing (fetching the next table, exporting the next
+    site) while the worker consumes, and blocks only when `maxsize` items are
+    waiting, so the slower stage sets the pace and memory stays bounded:
+
+        with StageWorker("send", send, maxsize=1) as sender:
+            for site in sites:
+                sender.put(export(site))
+
+    Leaving the block waits for the queue to drain, also when the caller
+    failed: items already handed over are handled. An exception raised by
+    `handle` stops the worker and is raised again in the caller, by the next
+    `put()` or on exit.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handle: Callable[[Any], None],
+        maxsize: int = 2,
+        teardown: Optional[Callable[[], None]] = None
+    ):
+        """
+        :param handle: Called on the worker thread for each item, in order
+        :param maxsize: Items waiting at most before `put()` blocks
+        :param teardown: Called on the worker thread once the queue is drained
+                         (closes what `handle` opened there)
+        """
+        self.name = name
+        self.handle = handle
+        self.teardown = teardown
+        self.error: Optional[BaseException] = None
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+        self._thread = threading.Thread(target=self._run, name=f"stage-{name}", daemon=True)
+
+    def __enter__(self) -> "StageWorker":
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._put(_DONE)
+        self._thread.join()
+        if exc_type is None:
+            self._raise_error()
+        return False
+
+    def put(self, item: Any):
+        """Queues an item, waiting while the queue is full. Raises the worker's error if it failed."""
+        self._raise_error()
+        self._put(item)
+        self._raise_error()
+
+    def _put(self, item: Any):
+        while self._thread.is_alive():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _DONE:
+                    break
+                self.handle(item)
+        except BaseException as e:
+            self.error = e
+        finally:
+            if self.teardown is not None:
+                try:
+                    self.teardown()
+                except Exception as e:
+                    self.error = self.error or e
@@ -0,0 +1,97 @@
+# windowsService/polling.py
+import json
+import os
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+class AdaptivePoller:
+    """
+    Decides how long the sync loop waits before its next cycle.
+
+    The interval shrinks while tables keep changing and backs off while they
+    are idle, so data stays fresh during the day without querying X3 every
+    minute at night. The last cycles are kept for diagnostics.
+    """
+
+    def __init__(
+        self,
+        min_interval: float = 15,
+        max_interval: float = 300,
+        initial_interval: float = 60,
+        backoff: float = 2.0,
+        burst_rows: int = 100,
+        history_size: int = 50,
+        stats_path: Optional[str] = None
+    ):
+        """
+        :param min_interval: Shortest interval between two cycle starts (seconds)
+        :param max_interval: Longest interval when nothing changes (seconds)
+        :param initial_interval: Interval used until the first cycle completes
+        :param backoff: Factor applied when growing or shrinking the interval
+        :param burst_rows: Changed rows in one cycle that drop the interval straight to the minimum
+        :param history_size: Number of cycles kept in the history
+        :param stats_path: Optional JSON file the history is written to after each cycle
+        """
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min(max(initial_interval, min_interval), max_interval)
+        self.backoff = backoff
+        self.burst_rows = burst_rows
+        self.stats_path = stats_path
+        self.history: deque = deque(maxlen=history_size)
+
+    def _adapt(self, changed_rows: int) -> float:
+        if changed_rows >= self.burst_rows:
+            self.interval = self.min_interval
+        elif changed_rows > 0:
+            self.interval = max(self.min_interval, self.interval / self.backoff)
+        else:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+        return self.interval
+
+    def record_cycle(self, duration: float, changed_rows: int, error: Optional[str] = None) -> float:
+        """
+        Records a finished cycle and returns how long to wait before the next one.
+        The wait is measured from the end of the cycle, so the cadence between
+        cycle starts stays close to the interval.
+        """
+        interval = self._adapt(changed_rows)
+        wait = max(0.0, interval - duration)
+
+        self.history.append({
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'duration': round(duration, 3),
+            'changed_rows': changed_rows,
+            'interval': interval,
+            'error': error,
+        })
+        self._write_stats()
+
+        return wait
+
+    def durations(self) -> List[float]:
+        return [cycle['duration'] for cycle in self.history]
+
+    def stats(self) -> Dict[str, Any]:
+        durations = self.durations()
+        return {
+            'interval': self.interval,
+            'min_interval': self.min_interval,
+            'max_interval': self.max_interval,
+            'average_duration': round(sum(durations) / len(durations), 3) if durations else None,
+            'cycles': list(self.history),
+        }
+
+    def _write_stats(self):
+        if not self.stats_path:
+            return
+        try:
+            tmp_path = f"{self.stats_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.stats(), f, indent=2)
+            os.replace(tmp_path, self.stats_path)
+        except OSError:
+            # Stats are diagnostics only, never fail a cycle over them
+            pass
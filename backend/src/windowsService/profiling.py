@@ -0,0 +1,120 @@
+# windowsService/profiling.py
+import cProfile
+import io
+import os
+import pstats
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+PROFILE_TARGETS = ("run_sync", "bootstrap", "cycles")
+
+
+class ProfileCapture:
+    """Result of one profiled block, filled in once the block exits."""
+
+    def __init__(self, target: str):
+        self.target = target
+        self.path: Optional[str] = None
+        self.summary: Optional[str] = None
+
+
+class CycleProfiler:
+    """
+    Opt-in cProfile capture of the sync engine.
+
+    Settings come from config.db (`profiling_config`, managed through
+    /config/profiling) and can be forced with the WAZAPOS_PROFILE environment
+    variable. Depending on the target, every run_sync, the bootstrap of the next
+    syncer, or the next N whole cycles are profiled. Each capture is written as
+    a .prof file (open it with snakeviz or `python -m pstats`); only the newest
+    `keep_files` are kept.
+    """
+
+    def __init__(self, folder: str, keep_files: int = 20, top_n: int = 25):
+        self.folder = folder
+        self.keep_files = keep_files
+        self.top_n = top_n
+        self.enabled = False
+        self.target = "run_sync"
+        self.cycles_left = 0
+        self._settings: Optional[Dict[str, Any]] = None
+        # cProfile cannot nest, and only one capture at a time makes sense
+        self._active = threading.Lock()
+
+    def configure(self, settings: Optional[Dict[str, Any]]):
+        """
+        Applies new settings. Re-arms the cycle countdown only when they changed.
+
+        :param settings: {enabled, target, cycles, keep_files, top_n} or None to disable
+        """
+        if settings == self._settings:
+            return
+        self._settings = settings
+
+        settings = settings or {}
+        self.enabled = bool(settings.get("enabled"))
+        self.target = settings.get("target") if settings.get("target") in PROFILE_TARGETS else "run_sync"
+        self.cycles_left = max(1, int(settings.get("cycles") or 1)) if self.target == "cycles" else 0
+        self.keep_files = max(1, int(settings.get("keep_files") or self.keep_files))
+        self.top_n = max(1, int(settings.get("top_n") or self.top_n))
+
+    def wants(self, target: str) -> bool:
+        if not self.enabled or self.target != target:
+            return False
+        return target != "cycles" or self.cycles_left > 0
+
+    @contextmanager
+    def profile(self, target: str):
+        """
+        Profiles the enclosed block when `target` is the configured one.
+        The yielded capture gets the .prof path and a top-N summary on exit.
+        """
+        capture = ProfileCapture(target)
+        if not self.wants(target) or not self._active.acquire(blocking=False):
+            yield capture
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield capture
+            finally:
+                profiler.disable()
+                if target == "cycles":
+                    self.cycles_left -= 1
+                self._save(profiler, capture)
+        finally:
+            self._active.release()
+
+    def _save(self, profiler: cProfile.Profile, capture: ProfileCapture):
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+            capture.path = os.path.join(self.folder, f"profile_{capture.target}_{timestamp}.prof")
+            profiler.dump_stats(capture.path)
+
+            out = io.StringIO()
+            stats = pstats.Stats(profiler, stream=out)
+            stats.sort_stats("cumulative").print_stats(self.top_n)
+            capture.summary = out.getvalue()
+
+            self._prune()
+        except OSError:
+            # Profiling is diagnostics only, never fail a cycle over it
+            pass
+
+    def _prune(self):
+        files = sorted(
+            (entry for entry in os.scandir(self.folder)
+             if entry.is_file() and entry.name.startswith("profile_") and entry.name.endswith(".prof")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        for entry in files[self.keep_files:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -0,0 +1,210 @@
+# windowsService/run_history.py
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+
+class SyncRun:
+    """One sync, bootstrap or delivery pass being recorded. Written by `finish()`."""
+
+    def __init__(self, history: "RunHistory", kind: str):
+        self.history = history
+        self.kind = kind
+        self.started_at = datetime.now().isoformat(timespec='milliseconds')
+        self._start = time.perf_counter()
+        self.tables: List[tuple] = []
+        self._lock = threading.Lock()
+        self.run_id: Optional[int] = None
+
+    def add_table(
+        self,
+        table: str,
+        site: str = "",
+        rows: int = 0,
+        bytes: int = 0,
+        duration: Optional[float] = None,
+        error: Optional[str] = None,
+        delivery_status: Optional[str] = None
+    ):
+        """
+        Records the outcome for one table (and site) within the run.
+
+        :param delivery_status: 'staged', 'delivered', 'failed' or 'pending'
+        """
+        with self._lock:
+            self.tables.append((
+                table, site or "", rows, bytes,
+                round(duration, 6) if duration is not None else None,
+                error, delivery_status
+            ))
+
+    def finish(self, changed_rows: int = 0, bytes: int = 0, error: Optional[str] = None) -> Optional[int]:
+        """Writes the run and its tables. Returns the run id, None if it could not be recorded."""
+        duration = time.perf_counter() - self._start
+        table_errors = sum(1 for entry in self.tables if entry[5])
+        if error:
+            status = "failed"
+        elif table_errors:
+            status = "partial"
+        else:
+            status = "success"
+
+        self.run_id = self.history._write(self, duration, status, changed_rows, bytes, error, table_errors)
+        return self.run_id
+
+
+class RunHistory:
+    """
+    Structured history of the sync runs, in the `sync_runs` and `sync_run_tables`
+    tables of config.db (declared on the API side as `SyncRun` / `SyncRunTable`
+    and served by `/sync/history`).
+    """
+
+    def __init__(self, db_path: str, keep_runs: int = 5000):
+        """
+        :param db_path: Path to config.db
+        :param keep_runs: Number of runs kept, older ones are pruned with their tables
+        """
+        self.db_path = db_path
+        self.keep_runs = keep_runs
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    kind VARCHAR NOT NULL,
+                    started_at VARCHAR NOT NULL,
+                    finished_at VARCHAR,
+                    duration FLOAT,
+                    status VARCHAR,
+                    changed_rows INTEGER,
+                    bytes INTEGER,
+                    table_errors INTEGER,
+                    error VARCHAR,
+                    profile_path VARCHAR,
+                    profile_summary VARCHAR,
+                    peak_rss INTEGER,
+                    traced_peak INTEGER,
+                    memory_top VARCHAR,
+                    trace_path VARCHAR
+                )
+            """)
+            # Columns added after the first release of the table
+            existing = {row[1] for row in conn.execute("PRAGMA table_info(sync_runs)")}
+            for column, column_type in (
+                ("profile_path", "VARCHAR"),
+                ("profile_summary", "VARCHAR"),
+                ("peak_rss", "INTEGER"),
+                ("traced_peak", "INTEGER"),
+                ("memory_top", "VARCHAR"),
+                ("trace_path", "VARCHAR"),
+            ):
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE sync_runs ADD COLUMN {column} {column_type}")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_run_tables (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    run_id INTEGER NOT NULL REFERENCES sync_runs (id),
+                    table_name VARCHAR NOT NULL,
+                    site VARCHAR NOT NULL DEFAULT '',
+                    rows INTEGER,
+                    bytes INTEGER,
+                    duration FLOAT,
+                    error VARCHAR,
+                    delivery_status VARCHAR
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sync_run_tables_run_id ON sync_run_tables (run_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sync_run_tables_site ON sync_run_tables (site, run_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_sync_run_tables_table_name ON sync_run_tables (table_name, run_id)")
+        conn.close()
+
+    def start(self, kind: str) -> SyncRun:
+        """
+        Starts recording a run.
+
+        :param kind: 'sync', 'bootstrap' or 'delivery'
+        """
+        return SyncRun(self, kind)
+
+    def attach_profile(self, run_id: Optional[int], path: Optional[str], summary: Optional[str]):
+        """Links a cProfile capture (.prof file and top-N summary) to a recorded run."""
+        if path is None:
+            return
+        self._update(run_id, profile_path=path, profile_summary=summary)
+
+    def attach_memory(
+        self,
+        run_id: Optional[int],
+        peak_rss: Optional[int],
+        traced_peak: Optional[int] = None,
+        top_allocations: Optional[List[str]] = None
+    ):
+        """Stores the memory figures of the cycle a run belongs to."""
+        self._update(
+            run_id,
+            peak_rss=peak_rss,
+            traced_peak=traced_peak,
+            memory_top="\n".join(top_allocations) if top_allocations else None
+        )
+
+    def attach_trace(self, run_id: Optional[int], path: Optional[str]):
+        """Links the Chrome trace-event file of a cycle to its sync run."""
+        if path is None:
+            return
+        self._update(run_id, trace_path=path)
+
+    def _update(self, run_id: Optional[int], **columns):
+        if run_id is None:
+            return
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        try:
+            with self._connect() as conn:
+                conn.execute(f"UPDATE sync_runs SET {assignments} WHERE id = ?", (*columns.values(), run_id))
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _write(self, run: SyncRun, duration, status, changed_rows, bytes, error, table_errors) -> Optional[int]:
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("""
+                    INSERT INTO sync_runs (kind, started_at, finished_at, duration, status, changed_rows, bytes, table_errors, error)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    run.kind, run.started_at, datetime.now().isoformat(timespec='milliseconds'),
+                    round(duration, 6), status, changed_rows, bytes, table_errors, error
+                ))
+                run_id = cursor.lastrowid
+                cursor.executemany("""
+                    INSERT INTO sync_run_tables (run_id, table_name, site, rows, bytes, duration, error, delivery_status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, [(run_id, *entry) for entry in run.tables])
+
+                # Keep the newest runs only
+                cursor.execute("SELECT id FROM sync_runs ORDER BY id DESC LIMIT 1 OFFSET ?", (self.keep_runs,))
+                row = cursor.fetchone()
+                if row:
+                    cursor.execute("DELETE FROM sync_run_tables WHERE run_id <= ?", (row[0],))
+                    cursor.execute("DELETE FROM sync_runs WHERE id <= ?", (row[0],))
+
+                conn.commit()
+                return run_id
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                conn.close()
+        except sqlite3.Error:
+            # History is diagnostics only, never fail a cycle over it
+            return None
@@ -1,11 +1,14 @@
 # windowsService/scheduler.py
-import schedule
+import heapq
+import itertools
 import time
 import threading
 import logging
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Callable, List, Optional
 
 # Setup logging
 log_dir = os.path.join(
@@ -15,16 +18,16 @@ log_dir = os.path.join(
 )
 os.makedirs(log_dir, exist_ok=True)
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s - %(name)s - %(funcName)s - %(lineno)d - %(threadName)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(os.path.join(log_dir, 'scheduler.log'), mode='a')
-    ]
-)
-
+# Handlers go on the module logger rather than basicConfig, so importing the
+# scheduler from service.py does not take over the service's root logging
 logger = logging.getLogger(__name__)
+if not logger.handlers:
+    _formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s - %(name)s - %(funcName)s - %(lineno)d - %(threadName)s')
+    for _handler in (logging.StreamHandler(sys.stdout), logging.FileHandler(os.path.join(log_dir, 'scheduler.log'), mode='a')):
+        _handler.setFormatter(_formatter)
+        logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
 
 # Log immediately when module is loaded
 logger.info("=" * 60)
@@ -60,23 +63,126 @@ def your_task_function():
         import traceback
         logger.error(traceback.format_exc())
 
+
+class Job:
+    """A job registered on the TaskScheduler."""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], None],
+        interval: Optional[float] = None,
+        delay_fn: Optional[Callable[[], float]] = None,
+        allow_overlap: bool = False,
+        misfire: str = "skip",
+        max_catch_up: int = 1
+    ):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.delay_fn = delay_fn
+        self.allow_overlap = allow_overlap
+        self.misfire = misfire
+        self.max_catch_up = max_catch_up
+
+        self.next_run: Optional[float] = None
+        self.running = 0
+        self.pending_runs = 0
+        self.run_count = 0
+        self.skipped_count = 0
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+
 class TaskScheduler:
-    def __init__(self):
+    """
+    Timer scheduler backed by a heap of due times.
+
+    The scheduler thread sleeps until the next job is due (or until a job is
+    added, triggered or the scheduler is stopped) and hands due jobs to a
+    bounded worker pool, so a long job never delays the others.
+
+    Jobs run either at a fixed rate (`interval`) or, with `delay_fn`, again
+    `delay_fn()` seconds after their previous run completed. A fixed-rate job
+    that is still running when it is due again is skipped unless
+    `allow_overlap` is set. Runs missed while the job was busy or the machine
+    was asleep are dropped with misfire="skip", or replayed back to back
+    (at most `max_catch_up` of them) with misfire="catch_up".
+    """
+
+    def __init__(self, max_workers: int = 4):
         self.running = False
         self.thread = None
         self.task_count = 0
+        self.max_workers = max_workers
+        self.jobs: dict = {}
+        self._heap: List[tuple] = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._executor: Optional[ThreadPoolExecutor] = None
         logger.info("TaskScheduler initialized")
-        
+
+    def add_job(
+        self,
+        name: str,
+        func: Callable[[], None],
+        interval: Optional[float] = None,
+        delay_fn: Optional[Callable[[], float]] = None,
+        first_delay: float = 0,
+        allow_overlap: bool = False,
+        misfire: str = "skip",
+        max_catch_up: int = 1
+    ) -> Job:
+        """
+        Registers a job.
+
+        :param name: Unique job name
+        :param func: Callable run on a worker thread
+        :param interval: Fixed rate in seconds
+        :param delay_fn: Alternative to interval: returns the delay after each completed run
+        :param first_delay: Seconds before the first run
+        :param allow_overlap: Start a new run even if the previous one is still running
+        :param misfire: "skip" or "catch_up" for runs missed while busy
+        :param max_catch_up: Maximum number of missed runs replayed with "catch_up"
+        """
+        if (interval is None) == (delay_fn is None):
+            raise ValueError(f"Job '{name}' needs exactly one of interval or delay_fn")
+        if misfire not in ("skip", "catch_up"):
+            raise ValueError(f"Unknown misfire policy '{misfire}'")
+
+        job = Job(name, func, interval, delay_fn, allow_overlap, misfire, max_catch_up)
+        with self._cond:
+            self.jobs[name] = job
+            self._schedule(job, time.monotonic() + first_delay)
+        logger.info(f"Scheduled job '{name}' ({f'every {interval}s' if interval is not None else 'adaptive delay'})")
+        return job
+
+    def trigger(self, name: str):
+        """Runs a job as soon as possible instead of waiting for its next due time."""
+        with self._cond:
+            job = self.jobs[name]
+            if job.running and not job.allow_overlap:
+                # Run once more right after the current run
+                job.pending_runs = max(job.pending_runs, 1)
+                return
+            self._schedule(job, time.monotonic())
+
+    def _schedule(self, job: Job, when: float):
+        # Older heap entries of the job are ignored once next_run moved
+        job.next_run = when
+        heapq.heappush(self._heap, (when, next(self._counter), job))
+        self._cond.notify()
+
     def setup_schedules(self):
         logger.info("Setting up scheduled tasks...")
 
         try:
             # Run every 5 minutes only
-            schedule.every(5).minutes.do(self._wrapped_task, "Every 5 minutes")
+            self.add_job("Every 5 minutes", lambda: self._wrapped_task("Every 5 minutes"), interval=5 * 60, first_delay=5 * 60)
             logger.info("Scheduled: Task every 5 minutes")
 
             logger.info("All schedules configured successfully")
-            logger.info(f"Total scheduled jobs: {len(schedule.jobs)}")
+            logger.info(f"Total scheduled jobs: {len(self.jobs)}")
 
         except Exception as e:
             logger.error(f"Error setting up schedules: {e}")
@@ -85,30 +191,96 @@ class TaskScheduler:
     
     def _wrapped_task(self, task_name):
         """Wrapper that adds tracking to task execution"""
-        self.task_count += 1
         logger.info(f"Executing task '{task_name}' (execution #{self.task_count})")
         your_task_function()
         logger.info(f"Completed task '{task_name}'")
-        
+
+    def _dispatch(self, job: Job, due: float, now: float):
+        """Called with the lock held when a job reaches its due time."""
+        missed = 0
+        if job.interval is not None:
+            # Next slot on the fixed-rate grid, counting the slots that were missed
+            missed = int((now - due) // job.interval)
+            self._schedule(job, due + (missed + 1) * job.interval)
+        else:
+            job.next_run = None  # rescheduled when the run completes
+
+        if job.running and not job.allow_overlap:
+            if job.misfire == "catch_up":
+                job.pending_runs = min(job.max_catch_up, job.pending_runs + 1 + missed)
+            else:
+                job.skipped_count += 1 + missed
+                logger.info(f"Job '{job.name}' still running, skipping this run")
+            return
+
+        if missed:
+            if job.misfire == "catch_up":
+                job.pending_runs = min(job.max_catch_up, job.pending_runs + missed)
+            else:
+                job.skipped_count += missed
+                logger.info(f"Job '{job.name}' missed {missed} run(s), skipping them")
+
+        self._submit(job)
+
+    def _submit(self, job: Job):
+        job.running += 1
+        self._executor.submit(self._run_job, job) # type: ignore
+
+    def _run_job(self, job: Job):
+        start = time.monotonic()
+        try:
+            job.func()
+            job.last_error = None
+        except Exception as e:
+            job.last_error = str(e)
+            logger.error(f"Error in job '{job.name}': {e}")
+            import traceback
+            logger.error(traceback.format_exc())
+        finally:
+            with self._cond:
+                job.running -= 1
+                job.run_count += 1
+                self.task_count += 1
+                job.last_duration = time.monotonic() - start
+
+                if not self.running:
+                    return
+                if job.pending_runs > 0 and not job.running:
+                    job.pending_runs -= 1
+                    self._submit(job)
+                elif job.delay_fn is not None and not job.running:
+                    try:
+                        delay = max(0.0, float(job.delay_fn()))
+                    except Exception as e:
+                        logger.error(f"Error computing next delay of job '{job.name}': {e}")
+                        delay = 60.0
+                    self._schedule(job, time.monotonic() + delay)
+
     def run(self):
         """Run the scheduler loop"""
         try:
             logger.info("Scheduler loop starting...")
-            self.setup_schedules()
-            
             logger.info("Entering scheduler loop - waiting for tasks...")
-            iteration = 0
-            while self.running:
-                iteration += 1
-                
-                # Log every 60 iterations (roughly every minute) to show scheduler is alive
-                if iteration % 60 == 0:
-                    logger.info(f"Scheduler alive - {len(schedule.jobs)} jobs scheduled, {self.task_count} tasks executed so far")
-                    logger.info(f"Next run times: {[str(job.next_run) for job in schedule.jobs[:3]]}")
-                
-                schedule.run_pending()
-                time.sleep(1)
-            
+
+            with self._cond:
+                while self.running:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+
+                    due, _, job = self._heap[0]
+                    if job.next_run != due:
+                        heapq.heappop(self._heap)  # stale entry
+                        continue
+
+                    now = time.monotonic()
+                    if due > now:
+                        self._cond.wait(due - now)
+                        continue
+
+                    heapq.heappop(self._heap)
+                    self._dispatch(job, due, now)
+
             logger.info("Scheduler loop ended")
         except Exception as e:
             logger.error(f"Error in scheduler loop: {e}")
@@ -119,15 +291,22 @@ class TaskScheduler:
     def start(self):
         """Start the scheduler in a separate thread"""
         logger.info("Starting scheduler thread...")
+        if not self.jobs:
+            self.setup_schedules()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scheduler-worker")
         self.running = True
-        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread = threading.Thread(target=self.run, daemon=True, name="scheduler")
         self.thread.start()
         logger.info("Scheduler thread started")
     
-    def stop(self):
-        """Stop the scheduler"""
+    def stop(self, wait: bool = True):
+        """Stop the scheduler. With wait=True, running jobs are allowed to finish."""
         logger.info("Stopping scheduler...")
-        self.running = False
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
         if self.thread:
             self.thread.join(timeout=5)
-        logger.info(f"Scheduler stopped - Total tasks executed: {self.task_count}")
\ No newline at end of file
+        if self._executor:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+        logger.info(f"Scheduler stopped - Total tasks executed: {self.task_count}")
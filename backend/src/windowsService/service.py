@@ -3,8 +3,8 @@ import win32service
 import win32event
 import servicemanager
 import socket
-import sys
 import os
+import re
 import time
 import logging
 import sqlite3
@@ -17,8 +17,25 @@ from email import encoders
 from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import Any, Dict, List, Optional
-from io import TextIOWrapper
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from delta_store import PendingDeltaStore
+from delivery import FolderTransport
+from changelog import ChangeLog
+from polling import AdaptivePoller
+from table_schedule import TableSchedulePlan
+from scheduler import TaskScheduler
+from config_snapshot import ConfigSnapshot, ConfigSnapshotLoader
+from metrics import StageMetrics
+from run_history import RunHistory
+from profiling import CycleProfiler
+from memory import MemoryTracker
+from log_pipeline import start_logging, stop_logging
+from tracing import SpanTracer
+from converters import text_plan
+from sync_plan import SyncPlan
+from bootstrap_pool import ExtractTable, SiteJob, run_site_jobs, worker_count
+from bootstrap_progress import BootstrapProgress
+from pipeline import StageWorker
 
 # Setup Logging and Folders
 BASE_FOLDER = r"C:\poswaza\temp"
@@ -31,92 +48,105 @@ DELTA_FOLDER = os.path.join(BASE_FOLDER, "delta")
 for folder in [LOG_FOLDER, DB_FOLDER, ZIP_FOLDER, DELTA_FOLDER]:
     os.makedirs(folder, exist_ok=True)
 
-log_file_path = os.path.join(LOG_FOLDER, "service.log")
-sync_log_path = os.path.join(LOG_FOLDER, "service_log.txt")
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(module)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file_path),
-        logging.StreamHandler(sys.stdout)
-    ]
-)
+# service.log, written by a background thread (see log_pipeline.py) and rotated by size
+LOG_FILE_NAME = "service.log"
+LOG_FORMAT = os.getenv("WAZAPOS_LOG_FORMAT", "kv")  # 'kv' or 'json'
+LOG_LEVEL = os.getenv("WAZAPOS_LOG_LEVEL", "INFO").upper()
+LOG_MAX_BYTES = int(os.getenv("WAZAPOS_LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(os.getenv("WAZAPOS_LOG_BACKUP_COUNT", 5))
+
 logger = logging.getLogger("WazaService")
 
 # Paths
 LOCAL_DB_PATH = DB_FOLDER
 CONFIG_DB_PATH = os.path.join(LOCAL_DB_PATH, "config.db")
+CYCLE_STATS_PATH = os.path.join(LOG_FOLDER, "cycle_stats.json")
+PROFILE_FOLDER = os.path.join(LOG_FOLDER, "profiles")
+TRACE_FOLDER = os.path.join(LOG_FOLDER, "traces")
 
-class ConfigLoader:
-    """Handles loading configuration from the local SQLite database."""
-    
-    @staticmethod
-    def get_sql_config() -> Dict[str, str]:
-        try:
-            with sqlite3.connect(CONFIG_DB_PATH) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM database_configuration")
-                row = cursor.fetchone()
-                
-                if not row:
-                    logger.error("No database configuration found.")
-                    return {}
-                
-                # Assuming row structure matches: id, odbc_source, connection_type, host, port, database, schemas, username, password
-                # Adjust indices if model changes. Based on original code:
-                # row[1]=dsn, row[3]=host, row[4]=port, row[5]=database, row[6]=schema, row[7]=user, row[8]=pass
-                
-                return {
-                    'username': row[7],
-                    'password': row[8],
-                    'server': f"{row[3]},{row[4]}",
-                    'database': row[5],
-                    'driver': 'ODBC Driver 17 for SQL Server',
-                    'dsn': row[1],
-                    'schema': row[6]
-                }
-        except Exception as e:
-            logger.error(f"Error loading SQL config: {e}")
-            return {}
+# Polling interval bounds (seconds): short while tables are busy, backing off when idle
+POLL_MIN_SECONDS = float(os.getenv("WAZAPOS_POLL_MIN_SECONDS", 15))
+POLL_MAX_SECONDS = float(os.getenv("WAZAPOS_POLL_MAX_SECONDS", 300))
 
-    @staticmethod
-    def get_email_config() -> Dict[str, Any]:
-        try:
-            with sqlite3.connect(CONFIG_DB_PATH) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM email_configs")
-                row = cursor.fetchone()
-                
-                if not row:
-                    return {}
-
-                # stored in email_configs table
-                return {
-                    'smtp_server': row[1],
-                    'smtp_username': row[2],
-                    'smtp_password': row[3],
-                    'smtp_port': row[4],
-                    'from_email': row[2],
-                    'to_email': row[5], # Default receiver if needed
-                }
-        except Exception as e:
-            logger.error(f"Error loading Email config: {e}")
-            return {}
+# Background jobs: retry of pending deliveries and cleanup of exported delta files
+DELIVERY_RETRY_SECONDS = float(os.getenv("WAZAPOS_DELIVERY_RETRY_SECONDS", 120))
+MAINTENANCE_SECONDS = 3600
+DELTA_RETENTION_DAYS = int(os.getenv("WAZAPOS_DELTA_RETENTION_DAYS", 7))
 
-    @staticmethod
-    def get_site_emails() -> Dict[str, str]:
-        try:
-            with sqlite3.connect(CONFIG_DB_PATH) as conn:
-                cursor = conn.cursor()
-                cursor.execute("SELECT * FROM site_configs")
-                rows = cursor.fetchall()
-                # row[1] = site, row[2] = email
-                return {row[1]: row[2] for row in rows}
-        except Exception as e:
-            logger.error(f"Error loading site configs: {e}")
-            return {}
+# Processes building the site databases of the bootstrap (0 = one per site, up to the CPU count)
+BOOTSTRAP_WORKERS = int(os.getenv("WAZAPOS_BOOTSTRAP_WORKERS", 0))
+# Rows per page of the bootstrap and change queries (see DatabaseSync._select_pages),
+# and bootstrap pages fetched ahead of the extract writer
+EXTRACT_PAGE_ROWS = max(1, int(os.getenv("WAZAPOS_EXTRACT_PAGE_ROWS", 5000)))
+BOOTSTRAP_QUEUE_CHUNKS = 4
+# Tables whose tracking updates may wait behind the queries of run_sync
+TRACKING_QUEUE_SIZE = 2
 
+# Isolation of the extraction reads: "snapshot" (when the database allows it) or "read_committed"
+SQL_ISOLATION = os.getenv("WAZAPOS_SQL_ISOLATION", "snapshot").strip().lower()
+# Reference tables read WITH (NOLOCK), comma separated: opt-in, they may return uncommitted rows
+NOLOCK_TABLES = {table.strip().upper() for table in os.getenv("WAZAPOS_NOLOCK_TABLES", "").split(",") if table.strip()}
+# SET LOCK_TIMEOUT of every connection (milliseconds, -1 waits forever), and retries of a
+# table whose statement timed out (error 1222), LOCK_RETRY_SECONDS more before each retry
+SQL_LOCK_TIMEOUT_MS = int(os.getenv("WAZAPOS_SQL_LOCK_TIMEOUT_MS", 10000))
+LOCK_TIMEOUT_RETRIES = int(os.getenv("WAZAPOS_LOCK_TIMEOUT_RETRIES", 3))
+LOCK_RETRY_SECONDS = float(os.getenv("WAZAPOS_LOCK_RETRY_SECONDS", 2))
+
+# Forces cProfile captures whatever profiling_config says: run_sync, bootstrap or cycles
+PROFILE_TARGET = os.getenv("WAZAPOS_PROFILE", "")
+PROFILE_CYCLES = int(os.getenv("WAZAPOS_PROFILE_CYCLES", 1))
+# Forces tracemalloc on, with this many frames per traceback (0 leaves it to profiling_config)
+TRACEMALLOC_FRAMES = int(os.getenv("WAZAPOS_TRACEMALLOC", 0))
+# Forces a Chrome trace-event file of every cycle (see tracing.py)
+TRACE_SPANS = os.getenv("WAZAPOS_TRACE", "") not in ("", "0")
+
+# Tables checked when config.db has no table schedules yet
+DEFAULT_TABLES_TO_SYNC = [
+    "TABSDHTYP",
+    "SDELIVERY",
+    "SDELIVERYD",
+    "ITMMASTER",
+    "ITMFACILIT",
+    "FACILITY",
+    "ITMSALES",
+    "BPARTNER",
+    "BPCUSTOMER",
+    "BPCUSTMVT",
+    "BPDLVCUST",
+    "SALESREP",
+    "SPRICLINK",
+    "PRICSTRUCT",
+    "SPREASON",
+    "SPRICCONF",
+    "SPRICLIST",
+    "SORDER",
+    "PIMPL",
+    "TABMODELIV",
+    "STOCK",
+    "BPCARRIER",
+    "COMPANY",
+    "TABSOHTYP",
+    "TABVACBPR",
+    "SVCRVAT",
+    "ITMCATEG",
+    "CBLOB",
+    "ABLOB",
+    "AUTILIS",
+    "AMENUSER",
+    "TABVAT",
+    "BPADDRESS",
+    "WAREHOUSE",
+    "TABPAYTERM",
+    "TABDEPAGIO",
+    "BPCINVVAT",
+    "TABRATVAT",
+    "TABVACITM",
+    "TABVAC",
+    "TAXLINK",
+    "SFOOTINV",
+    "SORDERQ",
+    "SORDERP",
+]
 
 class EmailSender:
     """Handles email operations."""
@@ -161,6 +191,19 @@ class EmailSender:
         except Exception as e:
             logger.error(f"Failed to send email to {to_email}: {e}")
 
+def is_lock_timeout(error: Exception) -> bool:
+    """True for SQL Server error 1222, "Lock request time out period exceeded"."""
+    return "(1222)" in str(error)
+
+class PreparedDelivery(NamedTuple):
+    """A site delta exported to CSV, waiting to be shipped."""
+    site: str
+    transport: str
+    email: Optional[str]
+    changes: Dict[str, Tuple[List[str], List[list]]]
+    up_to_seq: int
+    csv_path: str
+
 class DatabaseSync:
 
     def _send_email_report(self, site, email, changes, csv_path):
@@ -172,8 +215,6 @@ class DatabaseSync:
             body += f"{table}: {len(rows)} records\n"
             
         self.email_sender.send_email(email, subject, body, csv_path)
-        if self.fs:
-            self.fs.flush()
 
     def __init__(
         self,
@@ -183,29 +224,68 @@ class DatabaseSync:
         zip_folder,
         email_config,
         parameters,
-        fs=None
+        memory: Optional[MemoryTracker] = None,
+        tracer: Optional[SpanTracer] = None
     ):
         """
         Initialize the sync manager.
+
+        :param memory: Records the traced memory peak of each metrics stage while tracemalloc is on
+        :param tracer: Collects the spans of the cycle traces, tracing stays off without one
         """
         self.sql_config = sql_server_config
         self.parameters = parameters
         self.zip_folder = zip_folder
         self.email_config = email_config
-        self.fs : Optional[TextIOWrapper] = fs
         self.tables_to_sync = tables_to_sync
         self.local_db_path = local_db_path
+        self.tracer = tracer or SpanTracer(TRACE_FOLDER)
         
         # Create folders if they don't exist
         Path(self.zip_folder).mkdir(parents=True, exist_ok=True)
         Path(DELTA_FOLDER).mkdir(parents=True, exist_ok=True)
         os.makedirs(self.local_db_path, exist_ok=True)
+
+        # Undelivered changes, coalesced per site until they are shipped
+        self.delta_store = PendingDeltaStore(
+            os.path.join(self.local_db_path, "pending_deltas.db"),
+            key_column=self.parameters.get("primary_key_column", "AUUID_0") # type: ignore
+        )
+
+        # Sites with the "folder" transport get their deltas dropped in configurations_folders.destination
+        delivery_folder = self.parameters.get("delivery_folder") # type: ignore
+        self.folder_transport = FolderTransport(delivery_folder) if delivery_folder else None
+
+        # Every shipped change set is numbered so POS clients can pull what they miss from the API
+        self.changelog = ChangeLog(CONFIG_DB_PATH)
+
+        # Per-stage timings, served by the API as /metrics
+        self.metrics = StageMetrics(CONFIG_DB_PATH, memory=memory, tracer=self.tracer)
+        # sync_runs / sync_run_tables, served by the API as /sync/history
+        self.history = RunHistory(CONFIG_DB_PATH)
+        # Ids of the last recorded runs, used to attach profiles to them
+        self.last_sync_run_id: Optional[int] = None
+        self.last_bootstrap_run_id: Optional[int] = None
+        # Whether the database allows SNAPSHOT isolation, None until the first read connection
+        self.snapshot_isolation: Optional[bool] = None
         
+        # Tables deduplicated, resolved and ordered once, reused by the bootstrap and every cycle
+        self.plan = self._compile_plan(self.tables_to_sync)
+
         # Initialize first launch
-        self._init_first_launch(self.tables_to_sync)
+        self._init_first_launch()
+
+    def _get_sql_connection(self, reads: bool = False):
+        """
+        Creates a connection to the remote SQL Server using DSN or Windows Auth.
+
+        Every connection gets SET LOCK_TIMEOUT (WAZAPOS_SQL_LOCK_TIMEOUT_MS).
 
-    def _get_sql_connection(self):
-        """Creates a connection to the remote SQL Server using DSN or Windows Auth."""
+        :param reads: Connection used for extraction reads only: SNAPSHOT isolation when
+                      WAZAPOS_SQL_ISOLATION asks for it and the database allows it, so
+                      reads neither wait on nor block ERP writers. Tracking updates use
+                      a connection of their own at the default READ COMMITTED.
+        """
         dsn = self.sql_config.get('dsn')
         username = self.sql_config.get('username')
         password = self.sql_config.get('password')
@@ -217,10 +297,6 @@ class DatabaseSync:
 
         # Final safety
         password = password.strip()
-
-        if self.fs:
-            self.fs.write(f"DEBUG PASSWORD RAW: [{repr(self.sql_config.get('password'))}]")
-            self.fs.write(f"DEBUG PASSWORD CLEAN: [{repr(password)}]")
         
         if dsn:
             if username and password:
@@ -248,12 +324,8 @@ class DatabaseSync:
                     f"Trusted_Connection=yes"
                 )
         
-        if self.fs:
-            masked_conn = conn_str
-            self.fs.write(f"[*] Connecting with: {masked_conn}\n")
-            self.fs.write(f"DEBUG PASSWORD RAW: [{repr(self.sql_config.get('password'))}]")
-            self.fs.write(f"DEBUG PASSWORD CLEAN: [{repr(password)}]")
-            self.fs.flush()
+        masked_conn = re.sub(r"PWD=[^;]*", "PWD=***", conn_str)
+        logger.info(f"Connecting with: {masked_conn}")
         
         conn = pyodbc.connect(conn_str, timeout=30)
         
@@ -262,8 +334,58 @@ class DatabaseSync:
         conn.setdecoding(pyodbc.SQL_WCHAR, encoding='latin-1')
         conn.setencoding('latin-1')
         
+        cursor = conn.cursor()
+        cursor.execute(f"SET LOCK_TIMEOUT {int(SQL_LOCK_TIMEOUT_MS)}")
+        if reads and SQL_ISOLATION == "snapshot" and self._snapshot_allowed(cursor):
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL SNAPSHOT")
+        
         return conn
 
+    def _snapshot_allowed(self, cursor) -> bool:
+        """Whether the database has ALLOW_SNAPSHOT_ISOLATION on, checked once per syncer."""
+        if self.snapshot_isolation is None:
+            try:
+                cursor.execute(
+                    "SELECT snapshot_isolation_state, is_read_committed_snapshot_on FROM sys.databases WHERE name = DB_NAME()"
+                )
+                row = cursor.fetchone()
+                self.snapshot_isolation = bool(row and row[0] == 1)
+                read_committed_snapshot = bool(row and row[1])
+            except Exception as e:
+                logger.warning("Cannot read the snapshot isolation settings of the database", extra={"error": str(e)})
+                self.snapshot_isolation = False
+                read_committed_snapshot = False
+            
+            if self.snapshot_isolation:
+                logger.info("Extraction reads use SNAPSHOT isolation")
+            elif read_committed_snapshot:
+                logger.info("Extraction reads use READ COMMITTED, row versioned by the database (READ_COMMITTED_SNAPSHOT)")
+            else:
+                logger.warning(
+                    "Snapshot isolation not allowed by the database, extraction reads use READ COMMITTED "
+                    "(ALTER DATABASE ... SET ALLOW_SNAPSHOT_ISOLATION ON to enable it)"
+                )
+        return self.snapshot_isolation
+
+    def _retry_lock_timeout(self, action, table: str, site: str = ""):
+        """
+        Runs `action()`, again up to LOCK_TIMEOUT_RETRIES times while it fails on a
+        lock timeout, waiting a little longer before each retry.
+        """
+        for attempt in range(LOCK_TIMEOUT_RETRIES + 1):
+            try:
+                return action()
+            except pyodbc.Error as e:
+                if not is_lock_timeout(e) or attempt >= LOCK_TIMEOUT_RETRIES:
+                    raise
+                delay = LOCK_RETRY_SECONDS * (attempt + 1)
+                logger.warning(
+                    "Lock timeout, retrying",
+                    extra={"table": table, "site": site, "attempt": attempt + 1, "delay": delay}
+                )
+                self.metrics.record("lock_timeout", delay, table, site, error=True)
+                time.sleep(delay)
+
     def _resolve_table_name(self, cursor, table_name: str) -> str:
         """
         Attempts to find the correct schema for a table if the configured one fails.
@@ -279,9 +401,7 @@ class DatabaseSync:
             return full_name
         except pyodbc.ProgrammingError as e:
             if '42S02' in str(e): # Object Not Found
-                if self.fs:
-                    self.fs.write(f"    [!] Table {full_name} not found. Searching other schemas...\n")
-                    self.fs.flush()
+                logger.warning(f"Table {full_name} not found. Searching other schemas...")
                 
                 # Search for the table in other schemas
                 cursor.execute(
@@ -292,9 +412,7 @@ class DatabaseSync:
                 if row:
                     found_schema = row[0]
                     resolved_name = f"[{db}].[{found_schema}].[{table_name}]"
-                    if self.fs:
-                        self.fs.write(f"    [+] Found table in schema: {found_schema}. Using {resolved_name}\n")
-                        self.fs.flush()
+                    logger.info(f"Found table in schema: {found_schema}. Using {resolved_name}")
                     return resolved_name
                 
                 # Try common ones as last resort
@@ -310,151 +428,293 @@ class DatabaseSync:
             raise e
 
 
-    def _init_first_launch(self, tables: List[str]):
+    def _compile_plan(self, tables: List[str]) -> SyncPlan:
+        """Resolves the tables to sync against SQL Server, see sync_plan.SyncPlan."""
+        def resolve(cursor, table):
+            with self.metrics.stage("resolve", table):
+                return self._resolve_table_name(cursor, table)
 
-        for site in self.parameters["sites"]: # type: ignore
-            if self.fs:
-                self.fs.write(f"[*] Exporting tables for site: {site}\n")
+        with self._get_sql_connection(reads=True) as conn:
+            return SyncPlan(tables, self.parameters).compile(conn.cursor(), resolve)
+
+    def _init_first_launch(self):
+        """
+        Exports every table of the plan into the local_data.db of each site.
+
+        SQL Server is read once: tracking columns are updated and the rows are
+        written as text into a source extract (bootstrap_extract.db), the
+        site-dependent tables restricted to the configured sites. The site
+        databases are then built from the extract by a pool of worker processes
+        (WAZAPOS_BOOTSTRAP_WORKERS, see bootstrap_pool.py).
+
+        Progress is checkpointed in the extract (see bootstrap_progress.py): a
+        bootstrap that was stopped, lost its connection or failed tables leaves
+        the extract behind, and the next one resumes from it.
+        """
+        run = self.history.start("bootstrap")
+        exported_rows = 0
+        sites = list(self.parameters["sites"]) # type: ignore
+        extract_path = os.path.join(self.local_db_path, "bootstrap_extract.db")
+        try:
+            if sites:
+                progress = BootstrapProgress.open(extract_path, sites)
+                try:
+                    complete = self._bootstrap_sites(run, progress, extract_path, sites)
+                    exported_rows = sum(entry[2] for entry in run.tables)
+                finally:
+                    progress.close()
+                if complete:
+                    BootstrapProgress.remove(extract_path)
+                else:
+                    logger.warning("Bootstrap incomplete, extract kept to resume", extra={"path": extract_path})
+            self.metrics.flush()
+        except Exception as e:
+            self.last_bootstrap_run_id = run.finish(exported_rows, error=str(e))
+            raise
+        self.last_bootstrap_run_id = run.finish(exported_rows)
+
+    def _bootstrap_sites(self, run, progress: BootstrapProgress, extract_path: str, sites: List[str]) -> bool:
+        """Extracts the source and builds the site databases. Returns False if tables are left to resume."""
+        if progress.resumed:
+            logger.info("Resuming bootstrap", extra={"path": extract_path, "tables_done": len(progress.done_tables())})
+        extracted, failed, interrupted = self._extract_source(progress, sites)
+
+        jobs = []
+        for site in sites:
             self.ensure_folder(rf"{LOCAL_DB_PATH}\{site}")
-            sqlite_path = rf"{LOCAL_DB_PATH}\{site}\local_data.db"
-            sqlite_conn = sqlite3.connect(sqlite_path)
-            sqlite_cur = sqlite_conn.cursor()
+            for table, table_error in failed.items():
+                run.add_table(table, site, error=table_error)
+            # Tables built by an earlier, interrupted bootstrap are kept
+            built = progress.site_tables(site)
+            tables = tuple(entry for entry in extracted if entry.table not in built)
+            if tables:
+                jobs.append(SiteJob(site, extract_path, rf"{LOCAL_DB_PATH}\{site}\local_data.db", tables))
 
-            with self._get_sql_connection() as conn:
-                sql_cursor = conn.cursor()
-                
-                for table in tables:
+        workers = worker_count(BOOTSTRAP_WORKERS, len(jobs))
+        logger.info("Building site databases", extra={"sites": len(jobs), "workers": workers})
+        with self.tracer.span("site_databases", sites=len(jobs), workers=workers):
+            for job, results, error in run_site_jobs(jobs, workers):
+                site = job.site
+                if error is not None:
+                    logger.error("Error building site database", extra={"site": site, "error": str(error)})
+                    for entry in job.tables:
+                        run.add_table(entry.table, site, error=str(error))
+                    interrupted = True
+                    continue
+
+                site_rows = 0
+                for result in results:
+                    self.metrics.record(
+                        "bootstrap_write", result.seconds, result.table, site,
+                        rows=result.rows, error=result.error is not None
+                    )
+                    run.add_table(result.table, site, rows=result.rows, duration=result.seconds, error=result.error)
+                    if result.error:
+                        logger.error("Error processing table", extra={"table": result.table, "site": site, "error": result.error})
+                        interrupted = True
+                    else:
+                        progress.mark_site_table(site, result.table)
+                    site_rows += result.rows
+                logger.info("Exported tables to local DB", extra={"site": site, "path": job.sqlite_path, "rows": site_rows})
+        return not interrupted
+
+    def _extract_source(self, progress: BootstrapProgress, sites: List[str]):
+        """
+        Reads every table of the plan from SQL Server into the source extract.
+
+        :return: (tables extracted as ExtractTable, {table: error} for the others,
+                  True if a table failed while extracting)
+        """
+        extracted = []
+        failed = {}
+        interrupted = False
+
+        # Tracking updates on a READ COMMITTED connection, reads on a (snapshot) read connection
+        with self._get_sql_connection() as conn, self._get_sql_connection(reads=True) as read_conn:
+            sql_cursor = read_conn.cursor()
+
+            for entry in self.plan.bootstrap_entries():
+                table = entry.table
+                if entry.error:
+                    # Logged once when the plan was compiled
+                    failed[table] = entry.error
+                    continue
+                state = progress.table(table)
+                if state is not None and state.done:
+                    logger.info("Table already extracted", extra={"table": table, "rows": state.rows})
+                    extracted.append(ExtractTable(table, state.columns, entry.site_column))
+                    continue
+                with self.tracer.span("table", table=table):
                     try:
-                        # Determine full table name dynamically
-                        full_table = self._resolve_table_name(sql_cursor, table)
-
-                        if self.fs:
-                            self.fs.write(f"[*] Processing table: {table} ({full_table})\n")
-                            self.fs.flush()
-
-                        # First, check column structure
-                        try:
-                            check_columns_query = f"SELECT TOP 1 * FROM {full_table}"
-                            sql_cursor.execute(check_columns_query)
-                        except Exception as e:
-                            if self.fs:
-                                self.fs.write(f"    [!] FATAL ERROR: Unable to access {full_table}\n")
-                                self.fs.write(f"    [!] Exception details: {type(e).__name__}: {str(e)}\n")
-                                self.fs.write(f"    [!] SKIPPING table '{table}'\n\n")
-                                self.fs.flush()
-                            continue
-
-                        columns = [column[0] for column in sql_cursor.description]
-                        has_tracking = 'ZTRANSFERT_0' in columns and 'ZTRANSDATE_0' in columns
-
-                        if self.fs:
-                            self.fs.write(f"    Columns found: {len(columns)}, has_tracking: {has_tracking}\n")
-                            if not has_tracking:
-                                missing_cols = []
-                                if 'ZTRANSFERT_0' not in columns:
-                                    missing_cols.append('ZTRANSFERT_0')
-                                if 'ZTRANSDATE_0' not in columns:
-                                    missing_cols.append('ZTRANSDATE_0')
-                                self.fs.write(f"    [!] WARNING: Table '{table}' is missing tracking columns: {', '.join(missing_cols)}\n")
-                                self.fs.write(f"    [!] Table will still be synced but without automatic tracking updates\n")
-
-                        # Determine the primary key column
-                        if table in self.parameters["site_dependent_tables"]: # type: ignore
-                            pk_column = self.parameters['site_keys_column'][table] # type: ignore
-                        else:
-                            pk_column = self.parameters["primary_key_column"] # type: ignore
-
-                        # **STEP 1: UPDATE SQL SERVER FIRST (if has tracking columns)**
-                        if has_tracking and pk_column in columns:
-                            if self.fs:
-                                self.fs.write(f"    Updating tracking columns in SQL Server for {table}...\n")
-                            
-                            # Get list of primary keys to update
-                            if table in self.parameters["site_dependent_tables"]: # type: ignore
-                                pk_query = f"SELECT {pk_column} FROM {full_table} WHERE {self.parameters['site_keys_column'][table]} = ?" # type: ignore
-                                sql_cursor.execute(pk_query, (site,))
-                            else:
-                                pk_query = f"SELECT {pk_column} FROM {full_table}"
-                                sql_cursor.execute(pk_query)
-                            
-                            pk_values = [row[0] for row in sql_cursor.fetchall()]
-                            
-                            if len(pk_values) > 0:
-                                # Update in batches to avoid parameter limit
-                                batch_size = 1000
-                                total_updated = 0
-                                
-                                for i in range(0, len(pk_values), batch_size):
-                                    batch = pk_values[i:i + batch_size]
-                                    placeholders_batch = ",".join("?" for _ in batch)
-
-                                    update_sql = f"""
-                                        UPDATE {full_table}
-                                        SET 
-                                            ZTRANSFERT_0 = 2,
-                                            ZTRANSDATE_0 = GETDATE()
-                                        WHERE {pk_column} IN ({placeholders_batch})
-                                    """
-                                    sql_cursor.execute(update_sql, batch)
-                                    conn.commit()
-                                    total_updated += len(batch)
-                                
-                                if self.fs:
-                                    self.fs.write(f"    Updated {total_updated} rows in SQL Server.\n")
-
-                        # **STEP 2: NOW FETCH THE UPDATED DATA**
-                        if table in self.parameters["site_dependent_tables"]: # type: ignore
-                            query = f"SELECT * FROM {full_table} WHERE {self.parameters['site_keys_column'][table]} = ?" # type: ignore
-                            sql_cursor.execute(query, (site,))
-                        else:
-                            query = f"SELECT * FROM {full_table}"
-                            sql_cursor.execute(query)
-                        
-                        # Create table in SQLite
-                        columns_def = ", ".join([f'"{col}" TEXT' for col in columns])
-                        sqlite_cur.execute(f"DROP TABLE IF EXISTS {table}")
-                        sqlite_cur.execute(f"CREATE TABLE {table} ({columns_def})")
-
-                        # Fetch all data
-                        if self.fs:
-                            self.fs.write(f"    Fetching data for {table}...\n")
-                        rows = sql_cursor.fetchall()
-                        
-                        if len(rows) > 0:
-                            if self.fs:
-                                self.fs.write(f"    Found {len(rows)} records. Syncing to SQLite...\n")
-                            placeholders = ", ".join(["?"] * len(columns))
-                            insert_query = f"INSERT INTO {table} VALUES ({placeholders})"
-
-                            count = 0
-                            for row in rows:
-                                sqlite_cur.execute(insert_query, tuple(str(x) if x is not None else None for x in row))
-                                count += 1
-                                if count % 1000 == 0 and self.fs:
-                                    self.fs.write(f"    Progress: {count}/{len(rows)} records...\n")
-                            
-                            if self.fs:
-                                self.fs.write(f"    Successfully exported {len(rows)} records into {table}.\n")
-                        else:
-                            if self.fs:
-                                self.fs.write(f"    No records found for {table}.\n")
+                        # A retry after a lock timeout resumes from the checkpoint
+                        columns = self._retry_lock_timeout(
+                            lambda: self._extract_table(conn, sql_cursor, progress, entry, progress.table(table), sites),
+                            table
+                        )
+                        extracted.append(ExtractTable(table, tuple(columns), entry.site_column))
                     except Exception as e:
-                        if self.fs:
-                            self.fs.write(f"    [!] Error processing {table}: {e}\n")
-                        continue
-                
-                sqlite_conn.commit()
+                        # Rows of a chunk that failed halfway must not be committed without their checkpoint
+                        progress.conn.rollback()
+                        logger.error("Error processing table", extra={"table": table, "error": str(e)})
+                        failed[table] = str(e)
+                        interrupted = True
+        read_conn.close()
+        conn.close()
+        return extracted, failed, interrupted
+
+    def _extract_table(self, conn, sql_cursor, progress: BootstrapProgress, entry, state, sites: List[str]) -> List[str]:
+        """
+        Updates the tracking columns of a table, then copies its rows into the extract,
+        from its checkpoint on. Returns its columns.
+
+        :param conn: Connection of the tracking updates
+        :param sql_cursor: Cursor of the read connection
+        """
+        table, full_table = entry.table, entry.full_name
+        extract = progress.conn
+        logger.info(
+            "Processing table",
+            extra={"table": table, "full_table": full_table, "columns": len(entry.columns), "has_tracking": entry.has_tracking}
+        )
+
+        # Site-dependent tables only for the configured sites
+        site_condition, params = "", ()
+        if entry.site_column:
+            site_condition = f"{entry.site_column} IN ({', '.join('?' for _ in sites)})"
+            params = tuple(sites)
+        site_filter = f" WHERE {site_condition}" if site_condition else ""
+
+        # **STEP 1: UPDATE SQL SERVER FIRST (if has tracking columns)**
+        pk_column = entry.pk_column
+        if entry.has_tracking and pk_column in entry.columns and not (state and state.tracked):
+            logger.info("Updating tracking columns in SQL Server", extra={"table": table})
+            write_cursor = conn.cursor()
+            write_cursor.execute(f"SELECT {pk_column} FROM {full_table}{site_filter}", params)
+            pk_values = [row[0] for row in write_cursor.fetchall()]
+
+            # Update in batches to avoid parameter limit
+            batch_size = 1000
+            total_updated = 0
+            for i in range(0, len(pk_values), batch_size):
+                batch = pk_values[i:i + batch_size]
+                placeholders_batch = ",".join("?" for _ in batch)
+
+                update_sql = f"""
+                    UPDATE {full_table}
+                    SET 
+                        ZTRANSFERT_0 = 2,
+                        ZTRANSDATE_0 = GETDATE()
+                    WHERE {pk_column} IN ({placeholders_batch})
+                """
+                self._retry_lock_timeout(lambda: write_cursor.execute(update_sql, batch), table)
+                conn.commit()
+                total_updated += len(batch)
+            if total_updated:
+                logger.info("Updated tracking columns in SQL Server", extra={"table": table, "rows": total_updated})
+            progress.mark_tracked(table)
+
+        # **STEP 2: NOW FETCH THE UPDATED DATA**
+        # Keyset pages, so an interrupted table resumes after its last extracted row
+        key_column = self.parameters.get("primary_key_column", "AUUID_0") # type: ignore
+        keyset = key_column in entry.columns
+        resume_key = None
+        if keyset and state is not None and state.last_key is not None and tuple(entry.columns) == state.columns:
+            resume_key = state.last_key
+        pages = self._select_pages(sql_cursor, entry, site_condition, params, resume_key)
+        with self.metrics.stage("bootstrap_fetch", table) as sample:
+            chunk = next(pages)
+            sample.rows = len(chunk)
+
+        # Extract table with the columns the query actually returned, all TEXT like the site databases
+        columns = [column[0] for column in sql_cursor.description]
+        converter = text_plan(sql_cursor.description)
+        if resume_key is None:
+            columns_def = ", ".join([f'"{col}" TEXT' for col in columns])
+            extract.execute(f'DROP TABLE IF EXISTS "{table}"')
+            extract.execute(f'CREATE TABLE "{table}" ({columns_def})')
+            progress.start_table(table, columns)
+            extract.commit()
+        else:
+            logger.info("Resuming table extract", extra={"table": table, "rows": state.rows})
+        key_index = columns.index(key_column) if keyset else None
+        insert_query = f'INSERT INTO "{table}" VALUES ({", ".join(["?"] * len(columns))})'
+
+        def write(chunk):
+            with self.metrics.stage("bootstrap_extract", table) as sample:
+                extract.executemany(insert_query, map(converter.convert, chunk))
+                # Checkpoint committed with the chunk it covers
+                progress.advance(table, len(chunk), chunk[-1][key_index] if keyset else None)
+                extract.commit()
+                sample.rows = len(chunk)
+
+        # The next page comes over the network while the writer inserts the previous one
+        rows = 0
+        with StageWorker("bootstrap_extract", write, maxsize=BOOTSTRAP_QUEUE_CHUNKS) as writer:
+            while chunk:
+                writer.put(chunk)
+                rows += len(chunk)
+                with self.metrics.stage("bootstrap_fetch", table) as sample:
+                    chunk = next(pages, None)
+                    sample.rows = len(chunk or ())
+        progress.finish_table(table)
+
+        logger.info("Extracted table", extra={"table": table, "rows": rows})
+        return columns
+
+    def _select_pages(self, sql_cursor, entry, condition: str = "", params: tuple = (), after_key=None):
+        """
+        Yields the rows of `SELECT * FROM <table> WHERE <condition>` page by page,
+        the first page even when empty. `sql_cursor.description` describes the
+        page just yielded.
+
+        Tables with the key column (primary_key_column) are read in keyset pages of
+        EXTRACT_PAGE_ROWS rows, `TOP n ... WHERE key > last key ORDER BY key`: each
+        page is its own statement and transaction, so its shared locks (or its row
+        versions) are released and its rows can be dropped before the next one is
+        read. Other tables are read with one statement, EXTRACT_PAGE_ROWS rows per
+        fetchmany(). Tables of WAZAPOS_NOLOCK_TABLES are read WITH (NOLOCK).
+
+        :param after_key: Start after this key (a resumed bootstrap)
+        """
+        full_table = entry.full_name
+        if entry.table.upper() in NOLOCK_TABLES:
+            full_table += " WITH (NOLOCK)"
+        key_column = self.parameters.get("primary_key_column", "AUUID_0") # type: ignore
+
+        if key_column not in entry.columns:
+            where = f" WHERE {condition}" if condition else ""
+            with self.tracer.span("query", table=entry.table):
+                sql_cursor.execute(f"SELECT * FROM {full_table}{where}", params)
+            rows = sql_cursor.fetchmany(EXTRACT_PAGE_ROWS)
+            yield rows
+            while rows:
+                rows = sql_cursor.fetchmany(EXTRACT_PAGE_ROWS)
+                if rows:
+                    yield rows
+            return
+
+        last_key = after_key
+        first = True
+        while True:
+            conditions = [f"({condition})"] if condition else []
+            page_params = params
+            if last_key is not None:
+                conditions.append(f"{key_column} > ?")
+                page_params = params + (last_key,)
+            where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+            with self.tracer.span("query", table=entry.table):
+                sql_cursor.execute(f"SELECT TOP {EXTRACT_PAGE_ROWS} * FROM {full_table}{where} ORDER BY {key_column}", page_params)
+            rows = sql_cursor.fetchall()
+            # Ends the read transaction: a snapshot is not kept open across pages
+            sql_cursor.commit()
+            if rows or first:
+                yield rows
+            if len(rows) < EXTRACT_PAGE_ROWS:
+                return
+            key_index = [column[0] for column in sql_cursor.description].index(key_column)
+            last_key = rows[-1][key_index]
+            first = False
 
-                if self.fs:
-                    self.fs.write(f"[*] Export completed. Local DB path: {sqlite_path}\n")
-            
-            if self.fs:
-                self.fs.write(f"[*] Exported tables to local DB at {sqlite_path}\n")
-            
-            sqlite_conn.close()
-            conn.close()
-        
-        
     def ensure_folder(self, path):
         os.makedirs(path, exist_ok=True)
         return path
@@ -464,13 +724,11 @@ class DatabaseSync:
         Sends the zipped file via email with appropriate subject.
         """
         if not self.email_config:
-            if self.fs:
-                self.fs.write("    No email configuration provided, skipping email.\n")
+            logger.info("No email configuration provided, skipping email.")
             return
         
         sync_type = "FULL DATABASE" if is_first_sync else "DELTA RECORDS"
-        if self.fs:
-            self.fs.write(f"[*] Sending email with {sync_type} to {self.email_config['to_email']}...\n")
+        logger.info(f"Sending email with {sync_type} to {self.email_config['to_email']}...")
         
         try:
             msg = MIMEMultipart()
@@ -502,15 +760,18 @@ class DatabaseSync:
                     server.login(self.email_config['smtp_username'], self.email_config['smtp_password'])
                 server.send_message(msg)
             
-            if self.fs:
-                self.fs.write(f"    Email sent successfully!\n")
+            logger.info(f"Email sent successfully!")
         except Exception as e:
-            if self.fs:
-                self.fs.write(f"    Error sending email: {e}\n")
+            logger.error(f"Error sending email: {e}")
 
-    def run_sync(self):
+    def run_sync(self, tables: Optional[List[str]] = None, deliver: bool = True) -> int:
         """
         Monitors SQL Server tables for changes and sends a single consolidated CSV per site.
+        Returns the number of changed records found, which drives the polling interval.
+        
+        :param tables: Tables due in this cycle (defaults to all tables_to_sync)
+        :param deliver: Ship the pending deltas right away; the service passes False and
+                        leaves delivery to its own scheduler job
         
         Logic:
         - ZTRANSFERT_0 = 0: New record (never transferred)
@@ -521,156 +782,217 @@ class DatabaseSync:
         - Site-specific tables with changes for that site
         """
         
-        if self.fs:
-            self.fs.write(f"\n[*] Starting sync monitoring at {datetime.now()}\n")
+        logger.info("Starting sync monitoring")
         
-        # Get email addresses for each site
-        site_emails = self.parameters.get("site_emails", {}) # type: ignore
+        if not self.parameters.get("sites"): # type: ignore
+            logger.warning("No sites configured. Skipping sync.")
+            return 0
         
-        if not site_emails:
-            if self.fs:
-                self.fs.write("[!] No site emails configured. Skipping sync.\n")
-            return
+        changed_rows = 0
+        sync_start = time.perf_counter()
         
-        with self._get_sql_connection() as conn:
-            sql_cursor = conn.cursor()
+        run = self.history.start("sync")
+        try:
+            # Rows staged per site, coalesced with anything still undelivered
+            staged_rows: Dict[str, int] = {}
             
-            # Collect all changes per site
-            site_changes = {}  # {site: {table: (columns, rows)}}
-            generic_changes = {}  # {table: (columns, rows)} - for non-site tables
+            with self._get_sql_connection(reads=True) as conn, self._tracking_stage() as tracking:
+                sql_cursor = conn.cursor()
             
-            for table in self.tables_to_sync:
-                try:
-                    # Determine full table name dynamically
-                    full_table = self._resolve_table_name(sql_cursor, table)
-                    
-                    if self.fs:
-                        self.fs.write(f"[*] Checking table: {table} ({full_table})\n")
-                        self.fs.flush()
-                except Exception as e:
-                    if self.fs:
-                        self.fs.write(f"    [!] ERROR: Cannot resolve table '{table}': {type(e).__name__}: {str(e)}\n")
-                        self.fs.write(f"    [!] SKIPPING table '{table}'\n\n")
-                        self.fs.flush()
-                    continue
-                
-                # Check if table has tracking columns
-                try:
-                    check_query = f"SELECT TOP 1 * FROM {full_table}"
-                    sql_cursor.execute(check_query)
-                    columns = [column[0] for column in sql_cursor.description]
-                except Exception as e:
-                    if self.fs:
-                        self.fs.write(f"    [!] ERROR: Cannot access resolved table '{full_table}': {type(e).__name__}: {str(e)}\n")
-                        self.fs.write(f"    [!] SKIPPING table '{table}'\n\n")
-                        self.fs.flush()
-                    continue
-                
-                has_tracking = (
-                    'ZTRANSFERT_0' in columns and 
-                    'ZTRANSDATE_0' in columns and 
-                    'UPDDATTIM_0' in columns
-                )
-                
-                if not has_tracking:
-                    if self.fs:
-                        missing = []
-                        if 'ZTRANSFERT_0' not in columns: missing.append('ZTRANSFERT_0')
-                        if 'ZTRANSDATE_0' not in columns: missing.append('ZTRANSDATE_0')
-                        if 'UPDDATTIM_0' not in columns: missing.append('UPDDATTIM_0')
-                        self.fs.write(f"    [!] Table {table} is missing columns for incremental sync: {', '.join(missing)}. Skipping delta sync.\n\n")
-                        self.fs.flush()
-                    continue
+                # Tables the plan could not validate were reported once when it was compiled
+                for entry in self.plan.delta_entries(self.tables_to_sync if tables is None else tables):
+                    table = entry.table
+                    with self.tracer.span("table", table=table):
+                        logger.debug("Checking table", extra={"table": table, "full_table": entry.full_name})
                 
-                # Determine if site-dependent
-                is_site_dependent = table in self.parameters.get("site_dependent_tables", []) # type: ignore
-                
-                if is_site_dependent:
-                    # Collect changes per site
-                    site_column = self.parameters['site_keys_column'].get(table) # type: ignore
-                    if not site_column:
-                        if self.fs:
-                            self.fs.write(f"[!] No site column defined for {table}. Skipping.\n")
-                        continue
-                    
-                    for site in self.parameters.get("sites", []): # type: ignore
-                        query = f"""
-                            SELECT * FROM {full_table}
-                            WHERE {site_column} = ?
-                            AND (
-                                ZTRANSFERT_0 = 0 
-                                OR (ZTRANSFERT_0 = 2 AND UPDDATTIM_0 > ZTRANSDATE_0)
+                        # Site-dependent tables are checked per site, generic tables once for every site
+                        for site in self.parameters.get("sites", []) if entry.site_column else [""]: # type: ignore
+                            table_start = time.perf_counter()
+                            # A retry after a lock timeout resumes after the last page staged
+                            progress = {"rows": 0, "last_key": None}
+                            rows = self._retry_lock_timeout(
+                                lambda: self._stage_table_changes(sql_cursor, tracking, entry, site, staged_rows, progress),
+                                table, site
                             )
-                        """
-                        
-                        sql_cursor.execute(query, (site,))
-                        rows = sql_cursor.fetchall()
-                        
-                        if len(rows) > 0:
-                            if self.fs:
-                                self.fs.write(f"[*] Found {len(rows)} changed records in {table} for site {site}\n")
-                                self.fs.flush()
-                            
-                            if site not in site_changes:
-                                site_changes[site] = {}
-                            site_changes[site][table] = (columns, rows)
-                            
-                            # Update tracking columns
-                            self._update_tracking_columns(conn, sql_cursor, table, full_table, columns, rows)
-                
-                else:
-                    # Generic table - collect changes once
-                    query = f"""
-                        SELECT * FROM {full_table}
-                        WHERE 
-                            ZTRANSFERT_0 = 0 
-                            OR (ZTRANSFERT_0 = 2 AND UPDDATTIM_0 > ZTRANSDATE_0)
-                    """
-                    
-                    sql_cursor.execute(query)
-                    rows = sql_cursor.fetchall()
-                    
-                    if len(rows) > 0:
-                        if self.fs:
-                            self.fs.write(f"[*] Found {len(rows)} changed records in {table} (generic table)\n")
-                            self.fs.flush()
-                        
-                        generic_changes[table] = (columns, rows)
-                        
-                        # Update tracking columns
-                        self._update_tracking_columns(conn, sql_cursor, table, full_table, columns, rows)
-            
-            # Now create one CSV per site with all their changes
-            for site in self.parameters.get("sites", []): # type: ignore
-                email = site_emails.get(site)
-                if not email:
-                    if self.fs:
-                        self.fs.write(f"[!] No email configured for site {site}. Skipping.\n")
-                    continue
-                
-                # Combine generic changes + site-specific changes
-                all_changes_for_site = {}
-                
-                # Add generic tables
-                for table, (columns, rows) in generic_changes.items():
-                    all_changes_for_site[table] = (columns, rows)
-                
-                # Add site-specific tables
-                if site in site_changes:
-                    for table, (columns, rows) in site_changes[site].items():
-                        all_changes_for_site[table] = (columns, rows)
-                
-                if len(all_changes_for_site) > 0:
-                    csv_path = self._export_consolidated_csv(all_changes_for_site, site)
-                    self._send_consolidated_email(csv_path, site, email, all_changes_for_site)
-                else:
-                    if self.fs:
-                        self.fs.write(f"[*] No changes for site {site}\n")
-                        self.fs.flush()
+                            changed_rows += rows
+                            run.add_table(
+                                table, site, rows=rows, duration=time.perf_counter() - table_start,
+                                delivery_status="staged" if rows else None
+                            )
+            
+            # Leaving the block waited for the last tracking updates
+            for site, staged in staged_rows.items():
+                logger.info("Staged changed records", extra={"site": site, "rows": staged})
+        
+            if deliver:
+                self.deliver_pending()
+        except Exception as e:
+            self.last_sync_run_id = run.finish(changed_rows, error=str(e))
+            raise
+        
+        logger.info(
+            "Sync monitoring completed",
+            extra={"rows": changed_rows, "seconds": round(time.perf_counter() - sync_start, 3)}
+        )
+        
+        self.metrics.record("run_sync", time.perf_counter() - sync_start, rows=changed_rows)
+        self.metrics.flush()
+        self.last_sync_run_id = run.finish(changed_rows)
+        return changed_rows
+
+    def _stage_table_changes(
+        self, sql_cursor, tracking: StageWorker, entry, site: str, staged_rows: Dict[str, int], progress: Dict[str, Any]
+    ) -> int:
+        """
+        Stages the changed rows of a table, page by page, then queues their tracking
+        updates: rows are in the pending store before SQL Server marks them transferred.
+
+        :param site: Site of a site-dependent table, "" for a generic table (staged for every site)
+        :param staged_rows: Rows staged per site, updated
+        :param progress: {"rows", "last_key"} of the pages staged so far, updated after each
+                         page; a call with the same dict reads on from the next page
+        :return: Number of changed rows
+        """
+        table = entry.table
+        condition = "ZTRANSFERT_0 = 0 OR (ZTRANSFERT_0 = 2 AND UPDDATTIM_0 > ZTRANSDATE_0)"
+        params: tuple = ()
+        if site:
+            condition = f"{entry.site_column} = ? AND ({condition})"
+            params = (site,)
+        targets = [site] if site else list(self.parameters.get("sites", [])) # type: ignore
+        
+        pages = self._select_pages(sql_cursor, entry, condition, params, progress["last_key"])
+        with self.metrics.stage("select", table, site) as sample:
+            rows = next(pages)
+            sample.rows = len(rows)
+        
+        # Every page of the table has the columns of the first one
+        columns = [column[0] for column in sql_cursor.description]
+        converter = text_plan(sql_cursor.description)
+        key_index = columns.index(entry.pk_column)
+        while rows:
+            page = {table: (columns, converter.convert_rows(rows))}
+            for target in targets:
+                with self.metrics.stage("stage", site=target) as sample:
+                    sample.rows = self.delta_store.stage(target, page)
+                staged_rows[target] = staged_rows.get(target, 0) + sample.rows
+            
+            # Update tracking columns of the rows just staged, while the next page is read
+            tracking.put((table, entry.full_name, site, entry.pk_column, [row[key_index] for row in rows]))
+            progress["rows"] += len(rows)
+            progress["last_key"] = rows[-1][key_index]
+            
+            with self.metrics.stage("select", table, site) as sample:
+                rows = next(pages, None)
+                sample.rows = len(rows or ())
+        
+        changed = progress["rows"]
+        if changed:
+            logger.info("Found changed records", extra={"table": table, "site": site, "rows": changed})
+        return changed
+
+    def deliver_pending(self):
+        """
+        Create one CSV per site with all their pending changes and ship it.
+
+        Shipping runs on its own thread, fed one site ahead: the CSV of the
+        next site is exported while the previous one is being emailed or
+        copied, so a slow SMTP server does not hold up the exports.
+        """
+        run = self.history.start("delivery")
+        with self.tracer.span("delivery"):
+            with StageWorker("delivery", lambda prepared: self._ship_delivery(prepared, run), maxsize=1) as shipper:
+                for site in self.parameters.get("sites", []): # type: ignore
+                    with self.tracer.span("site", site=site):
+                        prepared = self._prepare_delivery(site, run)
+                    if prepared is not None:
+                        shipper.put(prepared)
+        self.metrics.flush()
+        # Passes with nothing to ship are not worth a history entry
+        if run.tables:
+            run.finish(
+                sum(entry[2] for entry in run.tables),
+                bytes=sum(entry[3] for entry in run.tables)
+            )
+
+    def _deliver_pending(self, site, run=None):
+        """
+        Ships the compacted pending delta of a site and clears it once delivered.
+        Undelivered rows stay in the store and are merged into the next attempt.
+        """
+        prepared = self._prepare_delivery(site, run)
+        if prepared is not None:
+            self._ship_delivery(prepared, run)
+
+    def _prepare_delivery(self, site, run=None) -> Optional[PreparedDelivery]:
+        """
+        Loads the pending delta of a site and exports its CSV.
+        Returns None when there is nothing to ship or the site was served already (pull).
+        """
+        transport = self.parameters.get("site_transports", {}).get(site) or "email" # type: ignore
+        email = self.parameters.get("site_emails", {}).get(site) # type: ignore
+        
+        if transport == "folder" and self.folder_transport is None:
+            logger.warning("No destination folder configured, keeping changes pending", extra={"site": site})
+            return None
+        if transport == "email" and not email:
+            logger.warning("No email configured, keeping changes pending", extra={"site": site})
+            return None
+        
+        pending_changes, up_to_seq = self.delta_store.load(site, self.tables_to_sync)
+        if len(pending_changes) == 0:
+            logger.debug("No changes", extra={"site": site})
+            return None
         
-        if self.fs:
-            self.fs.write(f"[*] Sync monitoring completed at {datetime.now()}\n")
-            self.fs.flush()
+        if transport == "pull":
+            # Pull sites fetch their deltas from /sync/{site}/changes, recording is the delivery
+            delivered = self._record_change_set(site, pending_changes)
+            if delivered:
+                self.delta_store.clear(site, up_to_seq)
+            self._record_delivery(run, site, pending_changes, delivered)
+            return None
+        
+        with self.metrics.stage("export", site=site) as sample:
+            csv_path = self._export_consolidated_csv(pending_changes, site)
+            sample.rows = sum(len(rows) for _, (_, rows) in pending_changes.items())
+            sample.bytes = os.path.getsize(csv_path)
+        return PreparedDelivery(site, transport, email, pending_changes, up_to_seq, csv_path)
+
+    def _ship_delivery(self, prepared: PreparedDelivery, run=None):
+        """Sends an exported CSV and clears the pending delta it holds once delivered."""
+        site, transport, email, pending_changes, up_to_seq, csv_path = prepared
+        
+        # Timed per transport, so "email" calls minus errors is the number of emails sent
+        with self.tracer.span("site", site=site), self.metrics.stage(transport, site=site) as sample:
+            if transport == "folder":
+                delivered = self._send_to_folder(csv_path, site, pending_changes)
+            else:
+                delivered = self._send_consolidated_email(csv_path, site, email, pending_changes)
+            sample.bytes = os.path.getsize(csv_path)
+            sample.error = not delivered
+        
+        self._record_delivery(run, site, pending_changes, delivered, os.path.getsize(csv_path), transport)
+        if delivered:
+            self._record_change_set(site, pending_changes)
+            self.delta_store.clear(site, up_to_seq)
+        else:
+            # The next attempt exports a fresh compacted file, drop this one
+            try:
+                os.remove(csv_path)
+            except OSError:
+                pass
+            logger.warning("Delivery failed, changes kept pending for the next cycle", extra={"site": site, "transport": transport})
+
+    def _record_delivery(self, run, site, changes_dict, delivered, file_bytes=0, transport="pull"):
+        """Adds one row per delivered table to the run history (file size on the first row)."""
+        if run is None:
+            return
+        for index, (table, (_, rows)) in enumerate(changes_dict.items()):
+            run.add_table(
+                table, site, rows=len(rows), bytes=file_bytes if index == 0 else 0,
+                error=None if delivered else f"{transport} delivery failed",
+                delivery_status="delivered" if delivered else "failed"
+            )
 
     def _export_consolidated_csv(self, changes_dict, site):
         """
@@ -695,23 +1017,41 @@ class DatabaseSync:
                 header = ['TABLE_NAME'] + columns
                 writer.writerow(header)
                 
-                # Write data rows with table name prefixed
-                for row in rows:
-                    data_row = [table] + [str(x) if x is not None else '' for x in row]
-                    writer.writerow(data_row)
+                # Write data rows with table name prefixed; the pending rows are text already
+                plan = text_plan([(column, str) for column in columns], null='')
+                writer.writerows([table, *plan.convert(row)] for row in rows)
         
-        if self.fs:
-            self.fs.write(f"    Exported consolidated CSV: {csv_path}\n")
-            self.fs.flush()
+        logger.info("Exported consolidated CSV", extra={"path": csv_path})
         
         return csv_path
 
-    def _send_consolidated_email(self, csv_path, site, to_email, changes_dict):
-        """Send consolidated CSV file via email."""
+    def _record_change_set(self, site, changes_dict) -> bool:
+        """Append a shipped change set to the changelog served by the API."""
+        try:
+            with self.metrics.stage("changelog", site=site) as sample:
+                seq = self.changelog.record(site, changes_dict)
+                sample.rows = sum(len(rows) for _, (_, rows) in changes_dict.items())
+            logger.info("Recorded change set", extra={"site": site, "seq": seq})
+            return True
+        except Exception as e:
+            logger.error("Error recording change set", extra={"site": site, "error": str(e)})
+            return False
+
+    def _send_to_folder(self, csv_path, site, changes_dict) -> bool:
+        """Drop the consolidated CSV into the site's destination folder."""
+        try:
+            target_path = self.folder_transport.deliver(site, csv_path, changes_dict) # type: ignore
+            logger.info("Delivered to folder", extra={"site": site, "file": os.path.basename(csv_path), "path": target_path})
+            return True
+        except Exception as e:
+            logger.error("Error delivering to folder", extra={"site": site, "error": str(e)})
+            return False
+
+    def _send_consolidated_email(self, csv_path, site, to_email, changes_dict) -> bool:
+        """Send consolidated CSV file via email. Returns True once the message was accepted."""
         if not self.email_config:
-            if self.fs:
-                self.fs.write("    No email configuration provided, skipping email.\n")
-            return
+            logger.info("No email configuration provided, skipping email.")
+            return False
         
         # Calculate totals
         total_records = sum(len(rows) for _, (_, rows) in changes_dict.items())
@@ -757,28 +1097,44 @@ class DatabaseSync:
                     server.login(self.email_config['smtp_username'], self.email_config['smtp_password'])
                 server.send_message(msg)
             
-            if self.fs:
-                self.fs.write(f"    Email sent to {to_email} ({total_tables} tables, {total_records} records)\n")
+            logger.info("Email sent", extra={"site": site, "to": to_email, "tables": total_tables, "rows": total_records})
+            return True
         except Exception as e:
-            if self.fs:
-                self.fs.write(f"    Error sending email to {to_email}: {e}\n")
+            logger.error("Error sending email", extra={"site": site, "to": to_email, "error": str(e)})
+            return False
    
-    def _update_tracking_columns(self, conn, sql_cursor, table, full_table, columns, rows):
-        """Update tracking columns after successful export."""
-        
-        # Determine primary key column
-        if table in self.parameters.get("site_dependent_tables", []): # type: ignore
-            pk_column = self.parameters['site_keys_column'].get(table) # type: ignore
-        else:
-            pk_column = self.parameters.get("primary_key_column", "AUUID_0") # type: ignore
-        
-        if pk_column not in columns:
-            if self.fs:
-                self.fs.write(f"    Warning: Primary key column '{pk_column}' not found. Skipping update.\n")
-            return
-        
-        pk_index = columns.index(pk_column)
-        pk_values = [row[pk_index] for row in rows]
+    def _tracking_stage(self) -> StageWorker:
+        """
+        Runs the tracking updates of run_sync on their own thread and SQL connection,
+        so the next table is queried while the UPDATE batches of the previous one run.
+        Items are (table, full_table, site, pk_column, keys).
+
+        Only the keys of rows already in the pending store may be queued: an UPDATE
+        marks exactly those rows transferred, never a row the sync has not staged.
+        """
+        state = {}
+
+        def update(item):
+            table, full_table, site, pk_column, keys = item
+            if "conn" not in state:
+                state["conn"] = self._get_sql_connection()
+            with self.metrics.stage("tracking", table, site) as sample:
+                self._update_tracking_columns(state["conn"], state["conn"].cursor(), table, full_table, pk_column, keys)
+                sample.rows = len(keys)
+
+        def close():
+            if "conn" in state:
+                state["conn"].close()
+
+        return StageWorker("tracking", update, maxsize=TRACKING_QUEUE_SIZE, teardown=close)
+
+    def _update_tracking_columns(self, conn, sql_cursor, table, full_table, pk_column, pk_values):
+        """
+        Marks the staged rows transferred, by their row key.
+
+        Keyed on the row key for every table: the site column of a site-dependent
+        table would also mark the changed rows of the site not read yet.
+        """
         
         # Update in batches
         batch_size = 1000
@@ -795,11 +1151,10 @@ class DatabaseSync:
                 WHERE {pk_column} IN ({placeholders_batch})
             """
             
-            sql_cursor.execute(update_sql, batch)
+            self._retry_lock_timeout(lambda: sql_cursor.execute(update_sql, batch), table)
             conn.commit()
         
-        if self.fs:
-            self.fs.write(f"    Updated {len(pk_values)} records tracking columns\n")
+        logger.info("Updated tracking columns", extra={"table": table, "rows": len(pk_values)})
 
 
 
@@ -824,173 +1179,244 @@ class PythonService(win32serviceutil.ServiceFramework):
         servicemanager.LogInfoMsg("WAZAPOS_TEST - Starting service...")
         
         # Folders are already ensured at the top of the file
+        log_listener = start_logging(
+            LOG_FOLDER, LOG_FILE_NAME, fmt=LOG_FORMAT, level=getattr(logging, LOG_LEVEL, logging.INFO),
+            max_bytes=LOG_MAX_BYTES, backup_count=LOG_BACKUP_COUNT
+        )
         
-        syncer = None
-        
-        while self.running:
-            # Re-open the file handle each loop to stay fresh
-            with open(sync_log_path, "a") as f:
-                site_config_dict = {}
-                tables_to_sync = [
-                    "TABSDHTYP",
-                    "SDELIVERY",
-                    "SDELIVERYD",
-                    "ITMMASTER",
-                    "ITMFACILIT", 
-                    "FACILITY",
-                    "ITMSALES",
-                    "BPARTNER",
-                        "BPCUSTOMER",
-                        "BPCUSTMVT",
-                        "BPDLVCUST",
-                        "SALESREP",
-                        "SPRICLINK",
-                        "PRICSTRUCT",
-                        "SPREASON",
-                        "SPRICCONF",
-                        "SPRICLIST",
-                        "SORDER",
-                        "PIMPL",
-                        "TABMODELIV",
-                        "STOCK",
-                        "BPCARRIER",
-                        "COMPANY",
-                        "TABSOHTYP",
-                        "TABVACBPR",
-                        "SVCRVAT",
-                        "ITMCATEG",
-                        "CBLOB",
-                        "ABLOB",
-                        "AUTILIS",
-                        "AMENUSER",
-                        "TABVAT",
-                        "BPADDRESS",
-                        "WAREHOUSE",
-                        "TABPAYTERM",
-                        "TABDEPAGIO",
-                        "BPCINVVAT",
-                        "TABRATVAT",
-                        "TABVACITM",
-                        "TABVAC",
-                        "TAXLINK",
-                        "SFOOTINV",
-                        "SORDERQ",
-                        "SORDERP",
-                        "TABMODELIV",
-                        
-
-                    ]
-        
-  
-                try:
-                    db_path = rf"{LOCAL_DB_PATH}\config.db"
-                    config_conn = sqlite3.connect(db_path)
-                    config_cursor = config_conn.cursor()
-                    config_cursor.execute("SELECT * FROM database_configuration")
-                    config_rows = config_cursor.fetchone()
-                    config_conn.close()
-                    
-                    if not config_rows:
-                        f.write("[!] No database configuration found in config.db. Please configure the database in the app.\n")
-                        time.sleep(10)
-                        continue
+        self.syncer = None
+        self.poller = AdaptivePoller(
+            min_interval=POLL_MIN_SECONDS,
+            max_interval=POLL_MAX_SECONDS,
+            stats_path=CYCLE_STATS_PATH
+        )
+        # Per-table hot/warm/cold intervals and priorities from config.db
+        self.table_plan = TableSchedulePlan()
+        # Cached config.db contents, reread only when the API saved something
+        self.config_loader = ConfigSnapshotLoader(CONFIG_DB_PATH)
+        # Configuration the current syncer was built from, profiling settings left out
+        self.syncer_config: Optional[ConfigSnapshot] = None
+        self.profiler = CycleProfiler(PROFILE_FOLDER)
+        # Peak RSS of every cycle, tracemalloc on demand
+        self.memory = MemoryTracker()
+        # Sync run recorded by the current cycle, if any
+        self.cycle_run_id: Optional[int] = None
+        # Span trace of the cycles, kept open until the delivery a cycle triggers is done
+        self.tracer = SpanTracer(TRACE_FOLDER)
+        self.trace_run_id: Optional[int] = None
+        self.delivery_holds_trace = False
+        self.next_sync_wait = 0.0
+        
+        self.scheduler = TaskScheduler(max_workers=3)
+        # Sync runs again once its adaptive wait has elapsed after the previous cycle
+        self.scheduler.add_job("sync", self._sync_job, delay_fn=lambda: self.next_sync_wait)
+        # Retries deliveries that failed, sync triggers it directly when rows changed
+        self.scheduler.add_job("delivery", self._delivery_job, interval=DELIVERY_RETRY_SECONDS, first_delay=DELIVERY_RETRY_SECONDS)
+        self.scheduler.add_job("maintenance", self._maintenance_job, interval=MAINTENANCE_SECONDS, first_delay=60)
+        self.scheduler.start()
+        
+        # Returns when SvcStop signals the stop event
+        win32event.WaitForSingleObject(self.stop_event, win32event.INFINITE)
+        self.scheduler.stop()
+        self.config_loader.close()
+        # Writes out what is still queued
+        stop_logging(log_listener)
 
-                    # Validation: Ensure we have either a DSN or Host/Port
-                    dsn = config_rows[1]
-                    host = config_rows[3]
-                    port = config_rows[4]
-                    
-                    if not dsn and not host:
-                        f.write(f"[!] Invalid database configuration: Both DSN and Host are missing. Please check your settings.\n")
-                        time.sleep(10)
-                        continue
+        servicemanager.LogInfoMsg("WAZAPOS_TEST - Service stopped.")
 
-                    sql_config = {
-                        'username': config_rows[7],
-                        'password': config_rows[8],
-                        'server': f"{host},{port}" if host and port else host,
-                        'database': config_rows[5],
-                        'driver': 'ODBC Driver 17 for SQL Server',
-                        'dsn': dsn,
-                        'schema': config_rows[6]
-                    }
-                                
-                    # Get folder configuration
-                    folder_conn = sqlite3.connect(db_path)
-                    folder_cursor = folder_conn.cursor()
-                    folder_cursor.execute("SELECT * FROM configurations_folders")
-                    folder_rows = folder_cursor.fetchone()
-                    folder_conn.close()
-                                
-                    # Get email configuration
-                    email_conn = sqlite3.connect(db_path)
-                    email_cursor = email_conn.cursor()
-                    email_cursor.execute("SELECT * FROM email_configs")
-                    email_rows = email_cursor.fetchone()
-                    email_conn.close()      
-
-
-                    site_config_conn = sqlite3.connect(db_path)
-                    site_config_cursor = site_config_conn.cursor()
-                    site_config_cursor.execute("SELECT * FROM site_configs") 
-                    site_configs = site_config_cursor.fetchall()
-                    site_config_conn.close()      
-
-                    for site_config in site_configs:
-                        site_config_dict[site_config[1]] = site_config[2]
-                                
-                    email_config = {
-                        'smtp_server': email_rows[1],
-                        'smtp_port': email_rows[4],
-                        'smtp_username': email_rows[2],
-                        'smtp_password': email_rows[3],
-                        'from_email': email_rows[2],
-                        'to_email': email_rows[5],
-                        'subject': 'Database Sync Update'
-                    }
-
-                    f.write(f"[*] ====> Email sender {email_rows[2]} password {email_rows[3]} \n")
-                    
-                    parameters = {
-                        "sites": list(site_config_dict.keys()),
-                        "site_dependent_tables": ["ITMFACILIT", "FACILITY"],
-                        "site_keys_column": {"ITMFACILIT": "STOFCY_0", "FACILITY": "FCY_0"},
-                        "primary_key_column": "AUUID_0", 
-                        "all_tables": [t for t in tables_to_sync if t not in ["ITMFACILIT", "FACILITY"]],  # Exclude site-dependent
-                        'site_emails' : site_config_dict
-                    }
-
-                    f.write(f"[*] =====> Site configs {site_config_dict} \n")
-            
-                    syncer = DatabaseSync(
-                                sql_config,
-                                tables_to_sync=tables_to_sync,
-                                local_db_path=rf"{LOCAL_DB_PATH}",
-                                zip_folder=ZIP_FOLDER,
-                                email_config=email_config,
-                                parameters = parameters,
-                                fs=f
-                            )
-                except Exception as e:
-                    f.write(f"Error in service execution: {e}\n")
+    def _sync_job(self):
+        """One sync cycle, profiled as a whole when profiling targets 'cycles'."""
+        snapshot = None
+        try:
+            snapshot, _ = self.config_loader.load()
+        except Exception as e:
+            # The current syncer stays, config.db is read again next cycle
+            logger.error(f"Error loading the configuration: {e}")
+        if snapshot is not None:
+            self._configure_diagnostics(snapshot)
+
+        self.cycle_run_id = None
+        self.tracer.begin()
+        with self.memory.cycle() as usage:
+            with self.profiler.profile("cycles") as capture:
+                with self.tracer.span("cycle"):
+                    self._sync_cycle(snapshot)
+        self._attach_profile(capture, self.cycle_run_id)
+        self._record_memory(usage)
+        self.trace_run_id = self.cycle_run_id
+        self._release_trace()
+
+    def _configure_diagnostics(self, snapshot: ConfigSnapshot):
+        """
+        Applies the profiling, memory and tracing settings of a snapshot.
+        A setting that fails is logged and skipped: it neither stops the others nor touches the syncer.
+        """
+        settings = [
+            ("profiling", self.profiler, {"enabled": True, "target": PROFILE_TARGET, "cycles": PROFILE_CYCLES} if PROFILE_TARGET else snapshot.profiling),
+            ("memory", self.memory, {"trace_memory": True, "memory_frames": TRACEMALLOC_FRAMES} if TRACEMALLOC_FRAMES else snapshot.memory),
+            ("tracing", self.tracer, {"trace_spans": True} if TRACE_SPANS else snapshot.tracing),
+        ]
+        for name, diagnostic, config in settings:
+            try:
+                diagnostic.configure(config)
+            except Exception as e:
+                logger.error("Error configuring diagnostics", extra={"diagnostic": name, "error": str(e)})
+
+    def _sync_cycle(self, snapshot: Optional[ConfigSnapshot]):
+        """Rebuilds the syncer if the configuration changed, then checks the due tables and stages their changes."""
+        if snapshot is None:
+            logger.warning("Configuration not loaded, skipping this cycle. Retrying in 10 seconds.")
+            self.next_sync_wait = 10.0
+            return
+        
+        # Toggling profiling alone must not rebuild (and re-bootstrap) the syncer
+        sync_config = snapshot._replace(profiling=None, memory=None, tracing=None)
+        if self.syncer is None or sync_config != self.syncer_config:
+            if snapshot.error:
+                # The configuration no longer describes a usable syncer
+                self.syncer = None
+                self.syncer_config = None
+                logger.warning(snapshot.error)
+            else:
+                rebuilding = self.syncer is not None
                 try:
-                    f.write(f"\n--- Sync run at {datetime.now()} ---\n")
-                    f.write(f"Next sync in 60 seconds...\n")
-                    f.flush()
-                    if syncer is not None:
-                        syncer.fs = f  # type: ignore # Update file handle
-                        syncer.run_sync()  # type: ignore
-                    else:
-                        f.write("[!] Syncer not initialized (likely a connection error above). Skipping sync.\n")
-                        f.flush()
-                    time.sleep(60)
+                    logger.info("Configuration changed, rebuilding syncer" if rebuilding else "Building syncer")
+                    self.table_plan.apply(snapshot.table_schedules, DEFAULT_TABLES_TO_SYNC)
+                    with self.profiler.profile("bootstrap") as capture, self.tracer.span("bootstrap"):
+                        syncer = self._build_syncer(snapshot)
                 except Exception as e:
-                    f.write(f"Error in service execution: {e}\n")
-                    f.flush()
-            
-            time.sleep(60)
+                    # The current syncer stays, the rebuild is tried again next cycle
+                    logger.error(f"Error in service execution: {e}")
+                    self.next_sync_wait = 10.0
+                    return
+                self.syncer = syncer
+                self.syncer_config = sync_config
+                self._attach_profile(capture, syncer.last_bootstrap_run_id)
+        
+        if self.syncer is None:
+            logger.warning("Syncer not initialized (likely a configuration or connection error above). Retrying in 10 seconds.")
+            self.next_sync_wait = 10.0
+            return
+        
+        cycle_start = time.time()
+        changed_rows = 0
+        cycle_error = None
+        try:
+            due_tables = self.table_plan.due_tables(cycle_start)
+            logger.info("Sync run", extra={"due_tables": len(due_tables), "tables": len(self.table_plan.entries)})
+            try:
+                with self.profiler.profile("run_sync") as capture, self.tracer.span("run_sync", tables=len(due_tables)):
+                    changed_rows = self.syncer.run_sync(due_tables, deliver=False)
+            finally:
+                self.cycle_run_id = self.syncer.last_sync_run_id
+            self._attach_profile(capture, self.cycle_run_id)
+            self.table_plan.mark_run(due_tables, cycle_start)
+            if changed_rows > 0:
+                # The delivery of these rows belongs in this cycle's trace
+                if not self.delivery_holds_trace and self.tracer.hold():
+                    self.delivery_holds_trace = True
+                self.scheduler.trigger("delivery")
+        except Exception as e:
+            cycle_error = str(e)
+            logger.error(f"Error in service execution: {e}")
+        
+        cycle_duration = time.time() - cycle_start
+        wait_seconds = self.poller.record_cycle(cycle_duration, changed_rows, cycle_error)
+        # No point waking up before the next table is due
+        self.next_sync_wait = max(wait_seconds, self.table_plan.seconds_until_next())
+        logger.info(
+            "Cycle finished",
+            extra={"seconds": round(cycle_duration, 3), "rows": changed_rows, "next_sync": round(self.next_sync_wait)}
+        )
 
-        servicemanager.LogInfoMsg("WAZAPOS_TEST - Service stopped.")
+    def _attach_profile(self, capture, run_id: Optional[int]):
+        """Logs a finished profile capture and links it to its run in the sync history."""
+        if capture.path is None:
+            return
+        logger.info("Profile written", extra={"target": capture.target, "path": capture.path})
+        if self.syncer is not None:
+            self.syncer.history.attach_profile(run_id, capture.path, capture.summary)
+
+    def _record_memory(self, usage):
+        """Logs the memory figures of a cycle and stores them with its sync run."""
+        logger.info(
+            f"Memory: {usage.describe()}",
+            extra={"peak_rss": usage.peak_rss, "traced_peak": usage.traced_peak}
+        )
+        for rank, line in enumerate(usage.top_allocations, 1):
+            logger.info("Top allocation site (growth over the cycle)", extra={"rank": rank, "site_stats": line})
+        if self.syncer is not None:
+            self.syncer.history.attach_memory(
+                self.cycle_run_id, usage.peak_rss, usage.traced_peak, usage.top_allocations
+            )
+
+    def _delivery_job(self):
+        """Ships whatever is pending for each site."""
+        release_trace, self.delivery_holds_trace = self.delivery_holds_trace, False
+        syncer = self.syncer
+        try:
+            if syncer is not None:
+                syncer.deliver_pending()
+        except Exception as e:
+            logger.error(f"Error delivering pending changes: {e}")
+        finally:
+            if release_trace:
+                self._release_trace()
+
+    def _release_trace(self):
+        """Writes the cycle trace once both the cycle and the delivery it triggered are done."""
+        path = self.tracer.release()
+        if path is None:
+            return
+        logger.info("Trace written", extra={"path": path})
+        if self.syncer is not None:
+            self.syncer.history.attach_trace(self.trace_run_id, path)
+
+    def _maintenance_job(self):
+        """Removes exported delta files older than DELTA_RETENTION_DAYS."""
+        cutoff = time.time() - DELTA_RETENTION_DAYS * 86400
+        removed = 0
+        for entry in os.scandir(DELTA_FOLDER):
+            try:
+                if entry.is_file() and entry.name.endswith(".csv") and entry.stat().st_mtime < cutoff:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info("Maintenance: removed old delta files", extra={"files": removed, "days": DELTA_RETENTION_DAYS})
+
+    def _build_syncer(self, snapshot: ConfigSnapshot) -> DatabaseSync:
+        """Builds the syncer for a configuration snapshot."""
+        tables_to_sync = self.table_plan.tables()
+        site_dependent_tables = ["ITMFACILIT", "FACILITY"]
+
+        parameters = {
+            "sites": list(snapshot.site_emails.keys()),
+            "site_dependent_tables": site_dependent_tables,
+            "site_keys_column": {"ITMFACILIT": "STOFCY_0", "FACILITY": "FCY_0"},
+            "primary_key_column": "AUUID_0", 
+            "all_tables": [t for t in tables_to_sync if t not in site_dependent_tables],  # Exclude site-dependent
+            "table_priorities": {entry.table: entry.priority for entry in reversed(self.table_plan.entries)},
+            'site_emails' : snapshot.site_emails,
+            'site_transports': snapshot.site_transports,
+            'delivery_folder': snapshot.delivery_folder
+        }
+
+        if snapshot.email_config:
+            logger.info("Email sender", extra={"from": snapshot.email_config['from_email']})
+        logger.info("Site configs", extra={"sites": snapshot.site_emails})
+
+        return DatabaseSync(
+                    snapshot.sql_config,
+                    tables_to_sync=tables_to_sync,
+                    local_db_path=rf"{LOCAL_DB_PATH}",
+                    zip_folder=ZIP_FOLDER,
+                    email_config=snapshot.email_config,
+                    parameters = parameters,
+                    memory=self.memory,
+                    tracer=self.tracer
+                )
 
 if __name__ == '__main__':
     win32serviceutil.HandleCommandLine(PythonService)
@@ -0,0 +1,343 @@
+# windowsService/snapshots.py
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+# Pages copied per backup step; the source is only locked while a step runs
+BACKUP_PAGES_PER_STEP = 1024
+# Pause between two steps, lets writers get the lock
+BACKUP_STEP_SLEEP = 0.005
+# Restarts caused by concurrent writes before the copy is finished in one step
+BACKUP_MAX_RESTARTS = 3
+# Incrementals written before the next full snapshot
+FULL_SNAPSHOT_EVERY = 20
+
+MANIFEST_NAME = "manifest.json"
+PAGES_NAME = "pages.bin"
+PAGE_DIGEST_SIZE = 16
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+def backup_database(
+    db_path: str,
+    target_path: str,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    sleep: float = BACKUP_STEP_SLEEP,
+    max_restarts: int = BACKUP_MAX_RESTARTS
+):
+    """
+    Copies a live SQLite database with the online backup API.
+
+    The copy is consistent: if another connection writes to the source while
+    the backup runs, SQLite restarts it from the updated pages. When writes keep
+    restarting it, the rest is copied in a single step under one read lock.
+    """
+    restarts = 0
+    remaining_before = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, remaining_before
+        if status == sqlite3.SQLITE_OK and remaining_before is not None and remaining > remaining_before:
+            restarts += 1
+            if restarts > max_restarts:
+                raise _BackupRestarted()
+        remaining_before = remaining
+
+    source = sqlite3.connect(db_path, timeout=30)
+    try:
+        target = sqlite3.connect(target_path)
+        try:
+            try:
+                source.backup(target, pages=pages, progress=progress, sleep=sleep)
+            except _BackupRestarted:
+                source.backup(target, pages=-1)
+        finally:
+            target.close()
+    finally:
+        source.close()
+
+
+def create_snapshot(
+    db_path: str,
+    zip_folder: str,
+    prefix: str = "database_backup",
+    keep: int = 5,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    incremental: bool = False,
+    full_every: int = FULL_SNAPSHOT_EVERY
+) -> str:
+    """
+    Writes a consistent, compressed snapshot of a SQLite database.
+
+    The database is backed up into a temp file next to the archives, which is
+    then streamed into `<prefix>_<timestamp>.zip`. The archive only appears
+    under its final name once complete.
+
+    With `incremental`, only the pages that changed since the previous snapshot
+    are archived (`<prefix>_<timestamp>_incrNNNN.zip`), found by comparing page
+    checksums with the ones kept for that snapshot. A full (base) snapshot is
+    written first, after `full_every` incrementals and whenever the chain is
+    broken. `restore_snapshot()` rebuilds the database from a base and its
+    incrementals.
+
+    :param keep: Number of base snapshots kept in zip_folder (with their incrementals)
+    :return: Path of the new zip
+    """
+    Path(zip_folder).mkdir(parents=True, exist_ok=True)
+    # Microseconds keep the names unique and in creation order, which pruning and restore rely on
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+    fd, temp_db = tempfile.mkstemp(prefix=f"{prefix}_", suffix=".db.tmp", dir=zip_folder)
+    os.close(fd)
+    partial_zip = None
+    try:
+        backup_database(db_path, temp_db, pages=pages)
+        db_name = os.path.basename(db_path)
+
+        if not incremental:
+            zip_path = os.path.join(zip_folder, f"{prefix}_{timestamp}.zip")
+            partial_zip = zip_path + ".part"
+            with zipfile.ZipFile(partial_zip, "w", zipfile.ZIP_DEFLATED) as zipf:
+                zipf.write(temp_db, arcname=db_name)
+            os.replace(partial_zip, zip_path)
+            # The next incremental must not chain across this snapshot
+            _clear_chain(zip_folder, prefix)
+        else:
+            page_size = _page_size(temp_db)
+            digests, db_sha256 = _scan_pages(temp_db, page_size)
+            chain = _load_chain(zip_folder, prefix, page_size)
+
+            manifest = {
+                "db_name": db_name,
+                "page_size": page_size,
+                "page_count": len(digests),
+                "db_sha256": db_sha256,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+            }
+            if chain is None or chain["generation"] >= full_every:
+                name = f"{prefix}_{timestamp}.zip"
+                manifest.update(kind="base", generation=0, base=name, parent=None)
+            else:
+                previous = chain["digests"]
+                name = f"{prefix}_{timestamp}_incr{chain['generation'] + 1:04d}.zip"
+                manifest.update(
+                    kind="incremental",
+                    generation=chain["generation"] + 1,
+                    base=chain["base"],
+                    parent=chain["archive"],
+                    pages=[
+                        number for number, digest in enumerate(digests)
+                        if number >= len(previous) or previous[number] != digest
+                    ],
+                )
+
+            zip_path = os.path.join(zip_folder, name)
+            partial_zip = zip_path + ".part"
+            with zipfile.ZipFile(partial_zip, "w", zipfile.ZIP_DEFLATED) as zipf:
+                if manifest["kind"] == "base":
+                    zipf.write(temp_db, arcname=db_name)
+                else:
+                    with open(temp_db, "rb") as db_file, zipf.open(PAGES_NAME, "w") as pages_file:
+                        for number in manifest["pages"]:
+                            db_file.seek(number * page_size)
+                            pages_file.write(db_file.read(page_size))
+                zipf.writestr(MANIFEST_NAME, json.dumps(manifest))
+            os.replace(partial_zip, zip_path)
+            _save_chain(zip_folder, prefix, manifest, name, digests)
+    finally:
+        for leftover in (temp_db, partial_zip):
+            if leftover and os.path.exists(leftover):
+                os.remove(leftover)
+
+    prune_snapshots(zip_folder, prefix, keep)
+    return zip_path
+
+
+def prune_snapshots(zip_folder: str, prefix: str, keep: int) -> List[str]:
+    """
+    Removes all but the newest `keep` base snapshots of a prefix, with the
+    incrementals that depend on them. Returns the removed paths.
+    """
+    archives = sorted(Path(zip_folder).glob(f"{prefix}_*.zip"), key=lambda path: path.name)
+    bases = [path for path in archives if not _is_incremental(path.name)]
+    if len(bases) <= max(1, keep):
+        return []
+
+    # Incrementals sort between their base and the next one
+    oldest_kept = bases[-max(1, keep)].name
+    removed = []
+    for path in archives:
+        if path.name >= oldest_kept:
+            break
+        try:
+            path.unlink()
+            removed.append(str(path))
+        except OSError:
+            pass
+    return removed
+
+
+def restore_snapshot(zip_folder: str, target_path: str, prefix: str = "database_backup", archive: Optional[str] = None) -> str:
+    """
+    Rebuilds a database from a base snapshot and the incrementals up to `archive`.
+
+    :param archive: File name of the snapshot to restore, the newest one by default
+    :return: target_path
+    :raises ValueError: if the chain is incomplete or the result does not match its checksum
+    """
+    archives = {path.name: path for path in Path(zip_folder).glob(f"{prefix}_*.zip")}
+    if not archives:
+        raise ValueError(f"No {prefix} snapshot in {zip_folder}")
+    name = archive or max(archives)
+
+    # Walk back to the base
+    chain = []
+    while name is not None:
+        if name not in archives:
+            raise ValueError(f"Snapshot {name} is missing, cannot restore")
+        manifest = _read_manifest(archives[name])
+        chain.append((archives[name], manifest))
+        name = manifest.get("parent")
+    chain.reverse()
+
+    partial = target_path + ".part"
+    try:
+        base_path, base_manifest = chain[0]
+        with zipfile.ZipFile(base_path) as zipf:
+            db_name = base_manifest.get("db_name") or next(n for n in zipf.namelist() if n != MANIFEST_NAME)
+            with zipf.open(db_name) as source, open(partial, "wb") as target:
+                shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+
+        with open(partial, "r+b") as target:
+            for path, manifest in chain[1:]:
+                page_size = manifest["page_size"]
+                with zipfile.ZipFile(path) as zipf, zipf.open(PAGES_NAME) as pages_file:
+                    for number in manifest["pages"]:
+                        target.seek(number * page_size)
+                        target.write(pages_file.read(page_size))
+                target.truncate(manifest["page_count"] * page_size)
+
+        expected = chain[-1][1].get("db_sha256")
+        if expected:
+            page_size = chain[-1][1]["page_size"]
+            if _scan_pages(partial, page_size)[1] != expected:
+                raise ValueError(f"Restored database does not match the checksum of {chain[-1][0].name}")
+        os.replace(partial, target_path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    return target_path
+
+
+def _is_incremental(name: str) -> bool:
+    return "_incr" in Path(name).stem
+
+
+def _read_manifest(path: Path) -> dict:
+    with zipfile.ZipFile(path) as zipf:
+        if MANIFEST_NAME in zipf.namelist():
+            return json.loads(zipf.read(MANIFEST_NAME))
+    # Full snapshot written without incremental mode
+    return {"kind": "base", "generation": 0, "parent": None}
+
+
+def _page_size(db_path: str) -> int:
+    with open(db_path, "rb") as db_file:
+        header = db_file.read(100)
+    size = int.from_bytes(header[16:18], "big")
+    return 65536 if size == 1 else size
+
+
+def _scan_pages(db_path: str, page_size: int) -> Tuple[List[bytes], str]:
+    """Checksum of every page, and the SHA-256 of the whole file."""
+    digests = []
+    whole = hashlib.sha256()
+    with open(db_path, "rb") as db_file:
+        while True:
+            page = db_file.read(page_size)
+            if not page:
+                break
+            whole.update(page)
+            digests.append(hashlib.blake2b(page, digest_size=PAGE_DIGEST_SIZE).digest())
+    return digests, whole.hexdigest()
+
+
+def _chain_paths(zip_folder: str, prefix: str) -> Tuple[str, str]:
+    return os.path.join(zip_folder, f"{prefix}.chain.json"), os.path.join(zip_folder, f"{prefix}.pages")
+
+
+def _load_chain(zip_folder: str, prefix: str, page_size: int) -> Optional[dict]:
+    """The snapshot the next incremental builds on, None if a base is needed."""
+    state_path, digests_path = _chain_paths(zip_folder, prefix)
+    try:
+        with open(state_path, encoding="utf-8") as state_file:
+            chain = json.load(state_file)
+        with open(digests_path, "rb") as digests_file:
+            data = digests_file.read()
+    except (OSError, ValueError):
+        return None
+
+    if chain.get("page_size") != page_size:
+        return None
+    # The chain is only usable while its base and last archive are still there
+    if not all(os.path.exists(os.path.join(zip_folder, chain.get(key) or "")) for key in ("base", "archive")):
+        return None
+    chain["digests"] = [data[i:i + PAGE_DIGEST_SIZE] for i in range(0, len(data), PAGE_DIGEST_SIZE)]
+    return chain
+
+
+def _save_chain(zip_folder: str, prefix: str, manifest: dict, archive: str, digests: List[bytes]):
+    state_path, digests_path = _chain_paths(zip_folder, prefix)
+    with open(digests_path + ".part", "wb") as digests_file:
+        digests_file.write(b"".join(digests))
+    os.replace(digests_path + ".part", digests_path)
+    with open(state_path + ".part", "w", encoding="utf-8") as state_file:
+        json.dump({
+            "base": manifest["base"],
+            "archive": archive,
+            "generation": manifest["generation"],
+            "page_size": manifest["page_size"],
+        }, state_file)
+    os.replace(state_path + ".part", state_path)
+
+
+def _clear_chain(zip_folder: str, prefix: str):
+    for path in _chain_paths(zip_folder, prefix):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild a SQLite database from its snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    restore = subparsers.add_parser("restore", help="Restore a base snapshot and its incrementals")
+    restore.add_argument("zip_folder")
+    restore.add_argument("target", help="Path of the database to write")
+    restore.add_argument("--prefix", default="database_backup")
+    restore.add_argument("--archive", help="Snapshot file name to restore up to (default: newest)")
+    args = parser.parse_args(argv)
+
+    try:
+        path = restore_snapshot(args.zip_folder, args.target, prefix=args.prefix, archive=args.archive)
+    except ValueError as e:
+        print(f"Restore failed: {e}", file=sys.stderr)
+        return 1
+    print(f"Restored {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+# windowsService/sync_plan.py
+import logging
+from collections import Counter
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+logger = logging.getLogger("WazaService")
+
+# Columns the incremental sync reads and writes back on the X3 tables
+TRACKING_COLUMNS = ("ZTRANSFERT_0", "ZTRANSDATE_0")
+DELTA_COLUMNS = TRACKING_COLUMNS + ("UPDDATTIM_0",)
+
+# Row count of a table from its heap / clustered index, no scan
+ESTIMATE_QUERY = """
+    SELECT SUM(p.rows) FROM sys.partitions p
+    WHERE p.object_id = OBJECT_ID(?) AND p.index_id IN (0, 1)
+"""
+
+
+class PlannedTable(NamedTuple):
+    table: str
+    full_name: Optional[str]     # [db].[schema].[table], None if it could not be resolved
+    columns: Tuple[str, ...]
+    pk_column: str               # row key, the tracking updates are keyed on it
+    site_column: Optional[str]   # set for site-dependent tables
+    priority: int                # lower runs first
+    estimated_rows: int
+    error: Optional[str]         # skipped everywhere
+    delta_error: Optional[str]   # exported by the bootstrap but not synced incrementally
+
+    @property
+    def has_tracking(self) -> bool:
+        return all(column in self.columns for column in TRACKING_COLUMNS)
+
+
+class SyncPlan:
+    """
+    The tables of a syncer, validated once.
+
+    Built from the table list and `parameters` when the syncer is built (that
+    is, again whenever the configuration changes) and reused by the bootstrap
+    and every cycle:
+
+    - duplicate tables are dropped, keeping their first (highest priority) entry
+    - each table is resolved to its schema, with its columns, PK / site key
+      column and estimated row count
+    - tables run by priority, then smallest first within a priority
+    - tables that cannot be synced are logged once here instead of failing
+      on every cycle
+    """
+
+    def __init__(self, tables: Sequence[str], parameters: Dict[str, Any]):
+        """
+        :param tables: Tables to sync, by priority (duplicates allowed)
+        :param parameters: Syncer parameters (site_dependent_tables, site_keys_column,
+                           primary_key_column and optional table_priorities)
+        """
+        self.parameters = parameters
+        self.tables: List[str] = list(dict.fromkeys(tables))
+        self.duplicates: List[str] = sorted(table for table, count in Counter(tables).items() if count > 1)
+        self.entries: List[PlannedTable] = []
+        self._by_table: Dict[str, PlannedTable] = {}
+
+    def compile(self, cursor, resolve: Callable[[Any, str], str]) -> "SyncPlan":
+        """
+        Resolves every table against SQL Server.
+
+        :param cursor: SQL Server cursor
+        :param resolve: (cursor, table) -> full table name, raising if the table is not found
+        :raises RuntimeError: if no table at all could be resolved (likely a connection problem)
+        """
+        if self.duplicates:
+            logger.warning("Duplicate tables in the sync list, synced once", extra={"tables": ",".join(self.duplicates)})
+
+        priorities = self.parameters.get("table_priorities") or {}
+        entries = [
+            self._plan_table(cursor, resolve, table, priorities.get(table, index))
+            for index, table in enumerate(self.tables)
+        ]
+        if entries and all(entry.error for entry in entries):
+            raise RuntimeError(f"No table of the sync plan could be resolved: {entries[0].error}")
+
+        self.entries = sorted(entries, key=lambda entry: (entry.priority, entry.estimated_rows))
+        self._by_table = {entry.table: entry for entry in self.entries}
+
+        for entry in self.entries:
+            if entry.error:
+                logger.error("Table left out of the sync", extra={"table": entry.table, "error": entry.error})
+            elif entry.delta_error:
+                logger.warning("Table exported by the bootstrap only", extra={"table": entry.table, "error": entry.delta_error})
+        logger.info("Sync plan compiled", extra=self.summary())
+        return self
+
+    def _plan_table(self, cursor, resolve, table: str, priority: int) -> PlannedTable:
+        site_column = None
+        if table in self.parameters.get("site_dependent_tables", []):
+            site_column = self.parameters.get("site_keys_column", {}).get(table)
+        # Tracking updates are keyed on the row key, site-dependent tables included
+        pk_column = self.parameters.get("primary_key_column", "AUUID_0")
+
+        def invalid(error: str, full_name: Optional[str] = None) -> PlannedTable:
+            return PlannedTable(table, full_name, (), pk_column, site_column, priority, 0, error, error)
+
+        try:
+            full_name = resolve(cursor, table)
+            cursor.execute(f"SELECT TOP 0 * FROM {full_name}")
+            columns = tuple(column[0] for column in cursor.description)
+        except Exception as e:
+            return invalid(f"Cannot resolve table: {type(e).__name__}: {e}")
+
+        if table in self.parameters.get("site_dependent_tables", []):
+            if not site_column:
+                return invalid("No site column defined", full_name)
+            if site_column not in columns:
+                return invalid(f"Site column {site_column} not found", full_name)
+
+        missing = [column for column in DELTA_COLUMNS + (pk_column,) if column not in columns]
+        delta_error = f"Missing columns for incremental sync: {', '.join(missing)}" if missing else None
+
+        return PlannedTable(
+            table, full_name, columns, pk_column, site_column, priority,
+            self._estimate_rows(cursor, full_name), None, delta_error
+        )
+
+    @staticmethod
+    def _estimate_rows(cursor, full_name: str) -> int:
+        try:
+            cursor.execute(ESTIMATE_QUERY, (full_name,))
+            row = cursor.fetchone()
+            return int(row[0] or 0) if row else 0
+        except Exception:
+            # No access to sys.partitions: order by priority only
+            return 0
+
+    def entry(self, table: str) -> Optional[PlannedTable]:
+        return self._by_table.get(table)
+
+    def bootstrap_entries(self) -> List[PlannedTable]:
+        """Every table in run order, invalid ones included so the bootstrap can record them."""
+        return list(self.entries)
+
+    def delta_entries(self, tables: Optional[Sequence[str]] = None) -> List[PlannedTable]:
+        """
+        Tables the incremental sync checks, in run order.
+
+        :param tables: Restrict to these tables (the ones due in the cycle)
+        """
+        wanted = None if tables is None else set(tables)
+        return [
+            entry for entry in self.entries
+            if not entry.error and not entry.delta_error and (wanted is None or entry.table in wanted)
+        ]
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "tables": len(self.entries),
+            "incremental": sum(1 for entry in self.entries if not entry.error and not entry.delta_error),
+            "bootstrap_only": sum(1 for entry in self.entries if not entry.error and entry.delta_error),
+            "invalid": sum(1 for entry in self.entries if entry.error),
+            "duplicates": len(self.duplicates),
+        }
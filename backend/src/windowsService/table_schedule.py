@@ -0,0 +1,84 @@
+# windowsService/table_schedule.py
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+# Enabled schedules with the interval of their class, read with the config.db snapshot (config_snapshot.py)
+SCHEDULE_QUERY = """
+    SELECT t.table_name, t.schedule_class, c.interval_seconds, t.priority
+    FROM table_schedules t
+    LEFT JOIN schedule_classes c ON c.name = t.schedule_class
+    WHERE t.enabled IS NULL OR t.enabled = 1
+"""
+
+class TableEntry(NamedTuple):
+    table: str
+    schedule_class: Optional[str]
+    interval: float  # seconds between two checks, 0 = every cycle
+    priority: int    # lower runs first
+
+
+class TableSchedulePlan:
+    """
+    Tells the sync loop which tables are due in the current cycle.
+
+    Schedules come from config.db (`table_schedules` joined with `schedule_classes`,
+    managed through /config/tables and /config/schedule-classes), read as part of
+    the configuration snapshot and handed to `apply()`. Hot tables such
+    as STOCK are checked every cycle while cold reference tables are only queried
+    once their class interval has elapsed. When config.db has no schedules, every
+    table of the fallback list is checked every cycle as before.
+
+    Last run times are kept in memory, so every table is due right after a restart.
+    """
+
+    def __init__(self):
+        self.entries: List[TableEntry] = []
+        self.last_run: Dict[str, float] = {}
+
+    def apply(self, rows: List[tuple], fallback_tables: List[str]):
+        """
+        Replaces the entries with rows of SCHEDULE_QUERY, keeping the last run times.
+
+        :param rows: (table_name, schedule_class, interval_seconds, priority) rows
+        :param fallback_tables: Tables checked every cycle when there are no rows
+        """
+        if rows:
+            self.set_entries([
+                TableEntry(table, schedule_class, float(interval or 0), priority if priority is not None else 100)
+                for table, schedule_class, interval, priority in rows
+            ])
+        else:
+            self.set_entries([
+                TableEntry(table, None, 0.0, index)
+                for index, table in enumerate(dict.fromkeys(fallback_tables))
+            ])
+
+    def set_entries(self, entries: List[TableEntry]):
+        self.entries = sorted(entries, key=lambda e: e.priority)
+
+    def tables(self) -> List[str]:
+        """All scheduled tables, by priority."""
+        return [entry.table for entry in self.entries]
+
+    def due_tables(self, now: Optional[float] = None) -> List[str]:
+        """Tables whose interval has elapsed, by priority."""
+        now = time.time() if now is None else now
+        return [
+            entry.table for entry in self.entries
+            if now - self.last_run.get(entry.table, float('-inf')) >= entry.interval
+        ]
+
+    def mark_run(self, tables: List[str], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        for table in tables:
+            self.last_run[table] = now
+
+    def seconds_until_next(self, now: Optional[float] = None) -> float:
+        """Time until the next table becomes due (0 if one is due already)."""
+        now = time.time() if now is None else now
+        if not self.entries:
+            return 0.0
+        return max(0.0, min(
+            self.last_run.get(entry.table, float('-inf')) + entry.interval - now
+            for entry in self.entries
+        ))
@@ -0,0 +1,137 @@
+# windowsService/tracing.py
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+class SpanTracer:
+    """
+    Nested timing spans of a sync cycle, written in the Chrome trace-event format.
+
+    Open the .json files in chrome://tracing or https://ui.perfetto.dev: each
+    job thread gets its own track, with spans nested as
+    cycle > table > resolve / query / fetch / tracking > site, and
+    delivery > site > export / email / folder. Spans of the delivery triggered
+    by a cycle land in that cycle's trace (see `hold()`), which shows what runs
+    concurrently and which tables serialize the cycle.
+
+    Tracing is opt-in (`trace_spans` in /config/profiling or WAZAPOS_TRACE);
+    when off, `span()` costs one attribute check.
+    """
+
+    def __init__(self, folder: str, keep_files: int = 20):
+        self.folder = folder
+        self.keep_files = keep_files
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._events: Optional[List[Dict[str, Any]]] = None  # None while no trace is being captured
+        self._holds = 0
+        self._threads: Dict[int, str] = {}
+        self._started_at: Optional[datetime] = None
+
+    def configure(self, settings: Optional[Dict[str, Any]]):
+        """
+        :param settings: {trace_spans, keep_files} or None to turn tracing off
+        """
+        settings = settings or {}
+        self.enabled = bool(settings.get("trace_spans"))
+        self.keep_files = max(1, int(settings.get("keep_files") or self.keep_files))
+
+    def begin(self) -> bool:
+        """Starts capturing a trace if tracing is on and none is in progress. Returns True if it did."""
+        with self._lock:
+            if not self.enabled or self._events is not None:
+                return False
+            self._events = []
+            self._threads = {}
+            self._holds = 1
+            self._started_at = datetime.now()
+            return True
+
+    def hold(self) -> bool:
+        """Keeps the current trace open until a matching `release()`. False if no trace is in progress."""
+        with self._lock:
+            if self._events is None:
+                return False
+            self._holds += 1
+            return True
+
+    def release(self) -> Optional[str]:
+        """
+        Drops one hold on the trace; the last one writes it.
+
+        :return: Path of the written trace file, None if the trace is still held or could not be written
+        """
+        with self._lock:
+            if self._events is None:
+                return None
+            self._holds -= 1
+            if self._holds > 0:
+                return None
+            events, self._events = self._events, None
+            threads, started_at = self._threads, self._started_at
+        return self._write(events, threads, started_at)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "sync", **args):
+        """Records the enclosed block as one complete ("X") event, with `args` shown in the viewer."""
+        events = self._events
+        if events is None:
+            yield
+            return
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            thread = threading.current_thread()
+            tid = thread.native_id or thread.ident or 0
+            if tid not in self._threads:
+                self._threads[tid] = thread.name
+            events.append({
+                "name": name,
+                "cat": cat,
+                "ph": "X",
+                "ts": round(start * 1_000_000, 1),
+                "dur": round((end - start) * 1_000_000, 1),
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {key: value for key, value in args.items() if value not in (None, "")},
+            })
+
+    def _write(self, events, threads, started_at) -> Optional[str]:
+        pid = os.getpid()
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": "WAZAPOS sync service"}}
+        ] + [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            path = os.path.join(self.folder, f"trace_{started_at.strftime('%Y%m%d_%H%M%S_%f')}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f, default=str)
+            self._prune()
+            return path
+        except OSError:
+            # Tracing is diagnostics only, never fail a cycle over it
+            return None
+
+    def _prune(self):
+        files = sorted(
+            (entry for entry in os.scandir(self.folder)
+             if entry.is_file() and entry.name.startswith("trace_") and entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        for entry in files[self.keep_files:]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
@@ -89,7 +89,6 @@ critical_deps = [
     ('win32service', 'pywin32'),
     ('win32event', 'pywin32'),
     ('servicemanager', 'pywin32'),
-    ('schedule', 'schedule'),
 ]
 
 optional_deps = [
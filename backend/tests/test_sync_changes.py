@@ -0,0 +1,89 @@
+# tests/test_sync_changes.py
+"""
+/sync/{site}/changes decoded the way a POS client does, through the HTTP client.
+
+Run from backend/: python -m pytest tests
+"""
+import gzip
+import json
+import os
+import sys
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.models import Base, ChangeSet  # noqa: E402
+from src.database.session import get_db  # noqa: E402
+from src.sync.controller import sync_router  # noqa: E402
+
+CHANGE_SETS = 5
+
+
+def make_client() -> TestClient:
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine, tables=[ChangeSet.__table__])
+    Session = sessionmaker(bind=engine)
+
+    db = Session()
+    # Stored as the service writes them (changelog.py): one gzip member per change set
+    for seq in range(1, CHANGE_SETS + 1):
+        document = {"seq": seq, "site": "S1", "tables": {"STOCK": {"rows": [[seq]]}}}
+        db.add(ChangeSet(
+            seq=seq, site="S1", created_at="2026-01-01T00:00:00", tables=json.dumps({"STOCK": 1}), row_count=1,
+            payload=gzip.compress((json.dumps(document) + "\n").encode("utf-8"))
+        ))
+    db.commit()
+    db.close()
+
+    def get_test_db():
+        session = Session()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app = FastAPI()
+    app.include_router(sync_router)
+    app.dependency_overrides[get_db] = get_test_db
+    return TestClient(app)
+
+
+def seqs(response) -> list:
+    return [json.loads(line)["seq"] for line in response.text.splitlines()]
+
+
+def test_gzip_page_decodes_every_change_set():
+    client = make_client()
+    response = client.get("/sync/S1/changes", params={"after": 0, "limit": 3}, headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert seqs(response) == [1, 2, 3]
+    assert response.headers["x-next-cursor"] == "3"
+    assert response.headers["x-has-more"] == "true"
+
+
+def test_cursor_walks_all_change_sets():
+    client = make_client()
+    after, received = 0, []
+    while True:
+        response = client.get("/sync/S1/changes", params={"after": after, "limit": 2}, headers={"Accept-Encoding": "gzip"})
+        received += seqs(response)
+        after = int(response.headers["x-next-cursor"])
+        if response.headers["x-has-more"] != "true":
+            break
+
+    assert received == list(range(1, CHANGE_SETS + 1))
+
+
+def test_plain_page_without_gzip():
+    client = make_client()
+    response = client.get("/sync/S1/changes", params={"after": 2}, headers={"Accept-Encoding": "identity"})
+
+    assert "content-encoding" not in response.headers
+    assert seqs(response) == [3, 4, 5]